@@ -0,0 +1,121 @@
+"""
+Micro-benchmark of the card page parser on fixture HTML.
+
+Compares the single-pass extractor used by scrape_card with the
+previous BeautifulSoup path, which searched the whole tree once per
+field. Run from the repository root:
+
+    python -m benchmarks.bench_parser
+"""
+
+
+# IMPORTING PACKAGES
+# -------------------------------------- #
+import argparse
+import glob
+import os
+from time import perf_counter
+from typing import Dict, List
+import numpy as np
+from bs4 import BeautifulSoup
+from utils import scraping as scr
+
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "cards")
+
+
+def legacy_parse_card(html: bytes) -> Dict:
+    """Parse a card page the way scrape_card used to, for reference."""
+    soup = BeautifulSoup(html, 'lxml')
+    title = soup.find("h1", {"class": "entry-title"}).text
+    general = soup.find("div", {"class": "card-content"}).text
+    general = general.split("Card Text")
+    summary = scr.clean_text(general[0])
+    text = scr.clean_text(general[1]) if len(general) > 1 else ""
+    for row in soup.find_all("div", {"class": "col-md-14"}):
+        cells = [i.text for i in row.find_all('li')]
+    details = dict(cell.split(": ") for cell in cells)
+    card_type = details["Type"]
+    # Each of these used to search the tree twice
+    if soup.find("div", {"class": "gdrts-rating-text"}) is not None:
+        node = soup.find("div", {"class": "gdrts-rating-text"})
+        rating = scr.parse_card_rating(node.text)
+    else:
+        rating = np.nan
+    if soup.find("div", {"class": "comments-title-wrap"}) is not None:
+        node = soup.find("div", {"class": "comments-title-wrap"})
+        num_comments = scr.parse_num_comments(node.text)
+    else:
+        num_comments = 0
+    if soup.find_all("li", {"itemtype": "//schema.org/Comment"}) is not None:
+        comment_section = soup.find_all(
+            "li", {"itemtype": "//schema.org/Comment"})
+        comments = scr.parse_comments([row.text for row in comment_section])
+    else:
+        comments = []
+    return {
+        "title": title,
+        "summary": summary,
+        "text": text,
+        "type": card_type,
+        "rating": float(rating),
+        "num_comments": float(num_comments),
+        "comments": comments
+    }
+
+
+def time_parser(parser, pages: List, repeat: int) -> float:
+    """Return the mean time in milliseconds to parse one page."""
+    start = perf_counter()
+    for _ in range(repeat):
+        for html in pages:
+            parser(html)
+
+    return (perf_counter() - start) * 1000 / (repeat * len(pages))
+
+
+def same_card(new: Dict, old: Dict) -> bool:
+    """Check that both parsers agree on the fields they share."""
+    for key, value in old.items():
+        if key == "comments":
+            if sorted(new[key]) != sorted(value):
+                return False
+        elif new[key] != value:
+            # Missing numbers are NaN, which never equals itself
+            if not (isinstance(value, float) and np.isnan(value)
+                    and np.isnan(new[key])):
+                return False
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.html")))
+    pages = {}
+    for path in paths:
+        with open(path, 'rb') as f:
+            html = f.read()
+        # Pages lacking a type cannot be parsed by the legacy path
+        try:
+            reference = legacy_parse_card(html)
+        except KeyError:
+            continue
+        if not same_card(scr.parse_card(html), reference):
+            raise AssertionError(f"Parsers disagree on {path}")
+        pages[os.path.basename(path)] = html
+
+    print(f"\n{'fixture':<32}{'legacy ms':>12}{'single-pass ms':>16}"
+          f"{'speedup':>10}")
+    for name, html in pages.items():
+        legacy = time_parser(legacy_parse_card, [html], args.repeat)
+        single = time_parser(scr.parse_card, [html], args.repeat)
+        print(f"{name:<32}{legacy:>12.2f}{single:>16.2f}"
+              f"{legacy / single:>9.1f}x")
+
+    legacy = time_parser(legacy_parse_card, list(pages.values()), args.repeat)
+    single = time_parser(scr.parse_card, list(pages.values()), args.repeat)
+    print(f"{'all':<32}{legacy:>12.2f}{single:>16.2f}"
+          f"{legacy / single:>9.1f}x")
@@ -0,0 +1,49 @@
+"""
+Check that a card dataset merges into its copy in another format as
+unchanged, whatever CSV and Parquet make of missing and blank values.
+
+The fixture cards are parsed, saved to both formats and each copy is
+merged into the other. Run from the repository root:
+
+    python -m benchmarks.check_merge
+"""
+
+
+# IMPORTING PACKAGES
+# -------------------------------------- #
+import glob
+import os
+import tempfile
+from utils import datasets as dts
+from utils import merging as mrg
+from utils import scraping as scr
+
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "cards")
+
+
+if __name__ == "__main__":
+    cards = []
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.html"))):
+        with open(path, 'rb') as f:
+            cards.append(scr.parse_card(f.read(), url=path))
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for file_format in ["csv", "parquet"]:
+            path = os.path.join(directory, f"cards.{file_format}")
+            writer = dts.open_writer(path, file_format=file_format)
+            for card in cards:
+                writer.write(card)
+            writer.close()
+            paths.append(path)
+
+        for inputs in [paths, paths[::-1]]:
+            counts = mrg.merge_datasets(
+                inputs, os.path.join(directory, "merged.csv"))
+            print(f"\n{os.path.basename(inputs[1])} into "
+                  f"{os.path.basename(inputs[0])}: {counts}")
+            if counts["unchanged"] != len(cards):
+                raise AssertionError(
+                    f"Only {counts['unchanged']} of {len(cards)} cards "
+                    "merged as unchanged")
@@ -0,0 +1,172 @@
+"""
+Offline benchmark suite for the scraping hot path.
+
+Every stage runs against the fixture pages, served by the local stand-in
+in benchmarks/stub_server.py when it needs HTTP, so nothing touches the
+live site. Each stage runs in its own process and reports pages per
+second, p50 and p99 latency per call, and the peak RSS of that process.
+Run from the repository root:
+
+    python -m benchmarks.run_benchmarks --pages 200 --json bench.json
+"""
+
+
+# IMPORTING PACKAGES
+# -------------------------------------- #
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import traceback
+from time import perf_counter
+from typing import Callable, Dict, List
+import numpy as np
+from benchmarks import stub_server as stub
+from utils import scraping as scr
+
+
+def time_calls(function: Callable, arguments: List) -> List:
+    """Call a function on each argument, returning the latencies."""
+    latencies = []
+    for argument in arguments:
+        start = perf_counter()
+        function(argument)
+        latencies.append(perf_counter() - start)
+
+    return latencies
+
+
+def card_slugs() -> List:
+    """Return the slugs of the card fixtures."""
+    pages = stub.load_fixtures(os.path.join(stub.FIXTURE_DIR, "cards"))
+
+    return list(pages)
+
+
+def cycle(items: List, n: int) -> List:
+    """Repeat the items until there are n of them."""
+    return [items[i % len(items)] for i in range(n)]
+
+
+def bench_make_soup(base_url: str, num_pages: int) -> List:
+    """Fetch and parse card pages into soups."""
+    urls = [f"{base_url}/cards/{s}/" for s in cycle(card_slugs(), num_pages)]
+    return [time_calls(scr.make_soup, urls), len(urls)]
+
+
+def bench_scrape_card(base_url: str, num_pages: int) -> List:
+    """Fetch and fully parse card pages."""
+    slugs = cycle(card_slugs(), num_pages)
+    urls = [f"{base_url}/cards/{s}/" for s in slugs]
+    return [time_calls(scr.scrape_card, urls), len(urls)]
+
+
+def bench_parse_card(base_url: str, num_pages: int) -> List:
+    """Parse card pages already in memory."""
+    pages = stub.load_fixtures(os.path.join(stub.FIXTURE_DIR, "cards"))
+    pages = [pages[s] for s in cycle(card_slugs(), num_pages)]
+    return [time_calls(scr.parse_card, pages), len(pages)]
+
+
+def bench_parse_comments(base_url: str, num_pages: int) -> List:
+    """Extract and parse the comments of card pages already in memory."""
+    pages = stub.load_fixtures(os.path.join(stub.FIXTURE_DIR, "cards"))
+    pages = [pages[s] for s in cycle(card_slugs(), num_pages)]
+    return [time_calls(
+        lambda html: scr.parse_card(html, fields=["comments"]), pages),
+        len(pages)]
+
+
+def bench_parse_query(base_url: str, num_pages: int) -> List:
+    """Discover every card URL of a query, one call per run."""
+    query_url = f"{base_url}/cards/?view=table"
+    num_listing_pages = scr.get_num_query_pages(query_url)
+    runs = max(num_pages // num_listing_pages, 1)
+    latencies = time_calls(
+        lambda url: scr.parse_query_and_fetch_links(url, 0, max_workers=4),
+        [query_url] * runs)
+    return [latencies, runs * num_listing_pages]
+
+
+STAGES = {
+    "make_soup": bench_make_soup,
+    "scrape_card": bench_scrape_card,
+    "parse_card": bench_parse_card,
+    "parse_comments": bench_parse_comments,
+    "parse_query_and_fetch_links": bench_parse_query
+}
+
+
+def run_stage(stage: str, base_url: str, num_pages: int, results):
+    """Run a stage in a child process and send back its measurements."""
+    try:
+        start = perf_counter()
+        latencies, pages = STAGES[stage](base_url, num_pages)
+        elapsed = perf_counter() - start
+    except Exception:
+        # Let the parent report the failure instead of waiting forever
+        results.put(traceback.format_exc())
+        return
+    # ru_maxrss is in kilobytes on Linux
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    results.put([latencies, pages, elapsed, peak_rss])
+
+
+def summarize(latencies: List, pages: int, elapsed: float, peak_rss: float):
+    """Reduce the measurements of a stage to the reported figures."""
+    latencies = np.array(latencies) * 1000
+    return {
+        "calls": len(latencies),
+        "pages": pages,
+        "pages_per_s": round(pages / elapsed, 1),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 2),
+        "peak_rss_mb": round(peak_rss, 1)
+    }
+
+
+def run_benchmarks(stages: List, num_pages: int, latency: float) -> Dict:
+    """Run the stages against a fresh stand-in server."""
+    server, base_url = stub.start_stub_server(latency=latency)
+    context = multiprocessing.get_context("fork")
+    report = {}
+    try:
+        for stage in stages:
+            results = context.Queue()
+            process = context.Process(
+                target=run_stage, args=(stage, base_url, num_pages, results))
+            process.start()
+            measurements = results.get()
+            process.join()
+            if isinstance(measurements, str):
+                raise RuntimeError(f"Stage {stage} failed:\n{measurements}")
+            report[stage] = summarize(*measurements)
+    finally:
+        server.shutdown()
+
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--pages", type=int, default=100, help="pages per stage")
+    parser.add_argument(
+        "--latency", type=float, default=0,
+        help="latency in ms added by the stand-in to every response")
+    parser.add_argument(
+        "--stages", nargs="+", choices=list(STAGES), default=list(STAGES))
+    parser.add_argument("--json", help="also write the report to this path")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.stages, args.pages, args.latency / 1000)
+
+    columns = ["pages_per_s", "p50_ms", "p99_ms", "peak_rss_mb"]
+    print(f"\n{'stage':<30}" + "".join(f"{c:>14}" for c in columns))
+    for stage, figures in report.items():
+        print(f"{stage:<30}" + "".join(f"{figures[c]:>14}" for c in columns))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=4)
@@ -0,0 +1,142 @@
+"""
+Local HTTP stand-in for hearthstonetopdecks.com serving fixture pages.
+
+Card pages are served at /cards/<slug>/ from fixtures/cards/<slug>.html.
+Slugs without a fixture (like the generated ones in the listings) get one
+of the fixtures, picked by a stable hash of the slug. The first result
+page of a query is served at /cards/ and the others at /cards/page/<n>/,
+from fixtures/listings/page-<n>.html. Links to the live site are rewritten
+to point at the stand-in.
+
+The server speaks keep-alive HTTP/1.1, compresses with gzip when asked,
+answers conditional requests with a 304, and can add latency to every
+response to mimic the network. Run it standalone with:
+
+    python -m benchmarks.stub_server --port 8000 --latency 50
+"""
+
+
+# IMPORTING PACKAGES
+# -------------------------------------- #
+import argparse
+import glob
+import gzip
+import hashlib
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import sleep
+from typing import List
+
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+LIVE_ROOT = "https://www.hearthstonetopdecks.com"
+
+
+def load_fixtures(directory: str) -> dict:
+    """Load every fixture page of a directory, keyed by file stem."""
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(directory, "*.html"))):
+        with open(path, 'rb') as f:
+            pages[os.path.splitext(os.path.basename(path))[0]] = f.read()
+
+    return pages
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Serve fixture pages the way the live site lays them out."""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes, which Nagle would delay
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def resolve(self, path: str) -> bytes:
+        """Return the fixture for a request path, or None."""
+        path = path.split("?")[0]
+        cards = self.server.card_pages
+        listings = self.server.listing_pages
+        page = re.fullmatch(r"/cards/(?:page/(\d+)/)?", path)
+        if page is not None:
+            return listings.get(f"page-{page.group(1) or 1}")
+        card = re.fullmatch(r"/cards/([^/]+)/", path)
+        if card is not None:
+            slug = card.group(1)
+            if slug in cards:
+                return cards[slug]
+            # Stand in for cards without a fixture of their own
+            names = sorted(cards)
+            digest = hashlib.md5(slug.encode('utf-8')).hexdigest()
+            return cards[names[int(digest, 16) % len(names)]]
+        return None
+
+    def do_GET(self):
+        if self.server.latency:
+            sleep(self.server.latency)
+        body = self.resolve(self.path)
+        if body is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        # Links point back at the stand-in
+        body = body.replace(LIVE_ROOT.encode(), self.server.base_url.encode())
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=UTF-8")
+        self.send_header("ETag", etag)
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_stub_server(
+    port: int = 0,
+    latency: float = 0,
+    fixture_dir: str = FIXTURE_DIR
+) -> List:
+    """
+    Start the stand-in on a background thread.
+
+    Returns the server, to be stopped with shutdown(), and its base URL.
+    Port 0 picks a free port.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    server.card_pages = load_fixtures(os.path.join(fixture_dir, "cards"))
+    server.listing_pages = load_fixtures(
+        os.path.join(fixture_dir, "listings"))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return [server, server.base_url]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--latency", type=float, default=0, help="added latency in ms")
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(args.port, args.latency / 1000)
+    print(f"Serving fixture pages at {base_url}/cards/ (Ctrl-C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,74 @@
+"""
+Build the feature matrix of the merged card dataset.
+
+Mechanics and classes are one-hot encoded, set, rarity, type and school
+turned into integer codes, and the stats kept as floats. The matrices
+are saved with their vocabulary to data/features and only rebuilt when
+the dataset changes. Load them with utils.features.load_features.
+"""
+
+
+# IMPORTING PACKAGES
+# -------------------------------------- #
+import argparse
+import os
+from time import time
+from utils import datasets as dts
+from utils import features as ftr
+from utils import miscelaneous as msc
+
+
+# MAIN METHOD
+# -------------------------------------- #
+if __name__ == "__main__":
+    # Keep track of runtime
+    runtime_start = time()
+
+    # Follow the output format of the card scraper
+    config_path = msc.parse_config_path("config/card_scraper_config.json")
+    config_options = msc.load_configuration_file(config_path)
+    chunk_size, output_format = msc.unpack_output_config(
+        config_options or {})
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--config",
+        default=config_path,
+        help="configuration file of the card scraper")
+    parser.add_argument(
+        "--input",
+        default=dts.with_format(
+            "data/hstd_all_cards_merged.csv", output_format),
+        help="card dataset to build the features of")
+    parser.add_argument(
+        "--output-dir",
+        default="data/features",
+        help="directory of the feature matrices and their vocabulary")
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="rebuild the features even if the dataset did not change")
+    parser.add_argument("--chunk-size", type=int, default=chunk_size)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"\nMissing card dataset {args.input}, run the scrapers "
+              "and merge_datasets.py first.")
+    else:
+        features, vocabulary, rebuilt = ftr.load_features(
+            args.input,
+            args.output_dir,
+            chunk_size=args.chunk_size,
+            force=args.force)
+
+        if rebuilt:
+            print(f"\nBuilt features of {vocabulary['num_cards']} cards "
+                  f"into {args.output_dir}...")
+        else:
+            print(f"\n{args.input} did not change, features are up to date...")
+        for name, matrix in features.items():
+            print(f"\t* {name}: {matrix.shape} {matrix.dtype}")
+
+    # Keeping track of runtime.
+    runtime_end = time()
+    print(f"\nFinished in {round(runtime_end-runtime_start,2):,}s...")
@@ -0,0 +1,99 @@
+"""
+Inspect the history of the cards kept by the card scraper.
+
+Every crawl appends the fields of the cards which changed to the
+history (HISTORY_PATH), which this script queries: the crawls so far,
+the cards as they were at a date, or the nerfs and buffs between two
+dates. Datasets of older crawls can be recorded into it, in order.
+"""
+
+
+# IMPORTING PACKAGES
+# -------------------------------------- #
+import argparse
+import os
+import sys
+from time import time
+import pandas as pd
+from utils import history as hst
+from utils import merging as mrg
+from utils import miscelaneous as msc
+
+
+# MAIN METHOD
+# -------------------------------------- #
+if __name__ == "__main__":
+    # Keep track of runtime
+    runtime_start = time()
+
+    config_path = msc.parse_config_path("config/card_scraper_config.json")
+    config_options = msc.load_configuration_file(config_path) or {}
+    history_path = msc.unpack_history_config(config_options) \
+        or "data/hstd_card_history.db"
+    chunk_size, _ = msc.unpack_output_config(config_options)
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--config",
+        default=config_path,
+        help="configuration file of the card scraper")
+    parser.add_argument("--history", default=history_path)
+    parser.add_argument(
+        "--record",
+        help="card dataset of a crawl to record into the history")
+    parser.add_argument(
+        "--crawled-at",
+        help="date of the recorded crawl, the modification time of the "
+             "dataset by default")
+    parser.add_argument(
+        "--as-of",
+        help="rebuild the cards as they were at this date, e.g. 2023-04-01")
+    parser.add_argument(
+        "--since",
+        help="report the nerfs and buffs from this date on")
+    parser.add_argument(
+        "--until",
+        help="end date of the report, the latest crawl by default")
+    parser.add_argument(
+        "--output",
+        help="save the cards or the report to this CSV or Parquet file")
+    args = parser.parse_args()
+
+    history = hst.HistoryStore(args.history)
+
+    if args.record is not None:
+        if not os.path.exists(args.record):
+            print(f"\nMissing card dataset {args.record}.")
+            sys.exit()
+        crawled_at = args.crawled_at or os.path.getmtime(args.record)
+        counts = history.record_crawl(
+            mrg.iter_records(args.record, chunk_size), crawled_at)
+        print(f"\nRecorded {counts['changes']} changes of "
+              f"{counts['cards']} cards ({counts['new_cards']} new)...")
+
+    if args.since is not None:
+        result = history.balance_report(args.since, args.until)
+        print(f"\n{result['url'].nunique()} cards changed, by verdict:")
+        print(result.drop_duplicates("url")["verdict"].value_counts())
+        with pd.option_context("display.max_colwidth", 40):
+            print(result[["title", "field", "before", "after", "change"]])
+    elif args.as_of is not None:
+        result = history.as_of(args.as_of)
+        print(f"\n{len(result)} cards as of {args.as_of}...")
+        print(result.head())
+    else:
+        result = None
+        print("\nCrawls recorded so far:")
+        print(history.crawls())
+    history.close()
+
+    if result is not None and args.output is not None:
+        if args.output.endswith(".parquet"):
+            result.to_parquet(args.output, index=False)
+        else:
+            result.to_csv(args.output, index=False)
+        print(f"\nSaved to {args.output}...")
+
+    # Keeping track of runtime.
+    runtime_end = time()
+    print(f"\nFinished in {round(runtime_end-runtime_start,2):,}s...")
@@ -0,0 +1,123 @@
+"""
+Scrape HearthstoneTopDecks cards with sharded workers.
+
+The URL frontier written by get_card_urls.py to the SQLite card store
+(DATABASE_PATH) is split into NUM_SHARDS shards by URL hash. Workers
+lease shards, scrape them into the same store and reclaim the shards of
+dead workers once their lease expires. Run it on as many machines as
+wanted, all pointing at the same database file on a filesystem with
+working locks.
+"""
+
+
+# IMPORTING PACKAGES
+# -------------------------------------- #
+import argparse
+import sys
+from time import time
+from utils import caching as cch
+from utils import database as db
+from utils import miscelaneous as msc
+from utils import session as ses
+from utils import sharding as shd
+from utils import throttling as thr
+
+
+CONFIG_PATH = "config/card_scraper_config.json"
+
+
+def configure_worker(config_options: dict, num_workers: int):
+    """Set up the HTTP session, rate limiter and cache of a worker."""
+    timeout, user_agent, \
+        max_connections_per_host = msc.unpack_session_config(config_options)
+    ses.configure_session(
+        timeout=timeout,
+        user_agent=user_agent,
+        max_connections_per_host=max_connections_per_host)
+    max_requests_per_second, min_requests_per_second, max_retries, \
+        retry_base_delay, \
+        retry_max_delay = msc.unpack_throttle_config(config_options)
+    # The local workers share the configured rate between them
+    rate = config_options.get("REQUESTS_PER_SECOND") or \
+        thr.rate_from_sleep_time(config_options["SLEEP_TIME"])
+    thr.configure_limiter(
+        rate=rate and rate / num_workers,
+        max_rate=max_requests_per_second and
+        max_requests_per_second / num_workers,
+        min_rate=min_requests_per_second)
+    thr.configure_retries(
+        max_retries=max_retries,
+        base_delay=retry_base_delay,
+        max_delay=retry_max_delay)
+    cache_dir, cache_ttl, cache_max_age, cache_max_bytes, \
+        offline = msc.unpack_cache_config(config_options)
+    cch.configure_cache(
+        cache_dir,
+        ttl=cache_ttl,
+        max_age=cache_max_age,
+        max_bytes=cache_max_bytes,
+        offline=offline)
+
+
+# MAIN METHOD
+# -------------------------------------- #
+if __name__ == "__main__":
+    # Keep track of runtime
+    runtime_start = time()
+    print("\nCommencing sharded card scraper...")
+
+    config_path = msc.parse_config_path(CONFIG_PATH)
+    config_options = msc.load_configuration_file(config_path)
+    _, _, _, _, concurrency_mode, max_workers, _, _, \
+        _ = msc.unpack_card_scraper_config(config_options)
+    database_path = msc.unpack_database_config(config_options)
+    num_shards, lease_seconds = msc.unpack_sharding_config(config_options)
+    chunk_size, _ = msc.unpack_output_config(config_options)
+    fields = msc.unpack_fields_config(config_options)
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--config",
+        default=config_path,
+        help="configuration file of the card scraper")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="worker processes to run on this machine")
+    parser.add_argument(
+        "--reset",
+        action="store_true",
+        help="split the frontier anew, e.g. after changing NUM_SHARDS")
+    args = parser.parse_args()
+
+    if database_path is None:
+        print("\nSharded crawls need a card store, set DATABASE_PATH.")
+        sys.exit()
+    if args.reset:
+        store = db.CardStore(database_path)
+        shd.reset_shards(store)
+        store.close()
+
+    # Only pipelined mode needs its own processes, threads do per shard
+    if concurrency_mode not in ["serial", "thread", "asyncio"]:
+        concurrency_mode = "thread"
+
+    summaries = shd.run_workers(
+        args.workers,
+        database_path,
+        initializer=configure_worker,
+        initargs=(config_options, args.workers),
+        num_shards=num_shards,
+        lease_seconds=lease_seconds,
+        mode=concurrency_mode,
+        max_workers=max_workers,
+        chunk_size=chunk_size,
+        fields=fields)
+
+    for name in ["shards", "cards", "failed"]:
+        print(f"\t* {name}: {sum(s[name] for s in summaries)}")
+
+    # Keeping track of runtime.
+    runtime_end = time()
+    print(f"\nFinished in {round(runtime_end-runtime_start,2):,}s...")
@@ -1,25 +1,47 @@
 # %%
 """Perform EDA on HSTD cards."""
 
-from IPython.display import display
-import pandas as pd
+import os
 import numpy as np
 from typing import List, Dict
-import ast
+from utils import database as db
+from utils import datasets as dts
+from utils import miscelaneous as msc
+from utils import profiling as prf
 
-# Load dataset
-INPUT_PATH = 'data/hstd_all_cards_merged.csv'
-cards_df = pd.read_csv(INPUT_PATH, encoding='iso-8859-1')
+# IPython is only there to display the frames nicely
+try:
+    from IPython.display import display
+except ImportError:
+    display = print
+
+# Load dataset, preferring the SQLite card store if the scraper uses one,
+# then the typed Parquet output
+config_options = msc.load_configuration_file(
+    msc.parse_config_path('config/card_scraper_config.json'))
+DATABASE_PATH = msc.unpack_database_config(config_options or {})
+INPUT_PATH = 'data/hstd_all_cards_merged.parquet'
+if DATABASE_PATH is not None and os.path.isfile(DATABASE_PATH):
+    INPUT_PATH = DATABASE_PATH
+elif not os.path.isfile(INPUT_PATH):
+    INPUT_PATH = dts.with_format(INPUT_PATH, 'csv')
 
 # Trim the columns; exclude NLP
-print("DataFrame loaded from: ")
+# Kicked columns are not even loaded
 kicked_cols = set([
     'summary',
     'text',
-    'comments'
+    'comments',
+    'url'
 ])
+kept_cols = [c for c in dts.CARD_COLUMNS if c not in kicked_cols]
+if INPUT_PATH == DATABASE_PATH:
+    cards_df = db.CardStore(INPUT_PATH).read_cards(kept_cols)
+else:
+    cards_df = dts.read_cards(INPUT_PATH, kept_cols)
+
+print("DataFrame loaded from: ", INPUT_PATH)
 
-cards_df = cards_df.drop(columns=kicked_cols, axis=1)
 kept_cols = set(cards_df.columns)
 
 # Establish categorical cols
@@ -64,95 +86,43 @@ print(cards_df.dtypes)
 # ---------------------------------- #
 print("\nInspecting categorical columns: ", cat_cols)
 
-# How many card cat?
-# ---------------------- #
-print()
-print(
-    f"{cards_df.type.nunique()} card types: ",
-    np.sort(cards_df.type.unique()))
-
-# How many rarity cat?
-# ---------------------- #
-print(
-    f"{cards_df.rarity.nunique()} card rarities: ",
-    np.sort(cards_df.rarity.unique()))
-
-
-# How many spell school cat?
-# ---------------------- #
-def nan_to_str(x) -> str:
-    """Change from np.nan to a str of choice."""
-    if isinstance(x, str):
-        return x
-    else:
-        return 'Not Spell'
-
-
-cards_df.school = cards_df.school.apply(lambda x: nan_to_str(x))
-
-print(
-    f"{cards_df.school.nunique()} spell schools: ",
-    np.sort(cards_df.school.unique()))
-
+# Normalize the columns as wholes and count their values in one pass;
+# spell-less cards get 'Not Spell', dual-class cards 'Priest/Warlock'
+# and set names lose their spaces and apostrophes
+cards_df = prf.normalize_cards(cards_df)
+profile = prf.profile_cards(cards_df, normalized=True)
+counts = profile["counts"]
 
-# How many card classes?
-# Account for dual-class cards
+# How many card cat, rarities, spell schools, classes and sets?
 # ---------------------- #
-def normalize_card_classes(x):
-    if len(x) > 1:
-        return x[0] + '/' + x[1]
-    else:
-        return x[0]
-
-
-# The name class conflicts with Python syntax
-cards_df = cards_df.rename({'class': 'card_class'}, axis=1)
-
-cards_df.card_class = cards_df.card_class.apply(lambda x: ast.literal_eval(x))
-res = [normalize_card_classes(x) for x in cards_df.card_class]
-
-# Apply the mapping
-cards_df.card_class = cards_df.card_class.apply(
-    lambda x: normalize_card_classes(x))
-
-print(
-    f"{cards_df.card_class.nunique()} card classes: ",
-    np.sort(cards_df.card_class.unique()))
-
-# How many card sets?
-# ---------------------- #
-cards_df.set = cards_df.set.apply(lambda x: x.replace(' ', ''))
-cards_df.set = cards_df.set.apply(lambda x: x.replace("'", ''))
-
-print(
-    f"{cards_df.set.nunique()} card sets: ",
-    np.sort(cards_df.set.unique()))
+print()
+for column, label in [
+        ('type', 'card types'),
+        ('rarity', 'card rarities'),
+        ('school', 'spell schools'),
+        ('card_class', 'card classes'),
+        ('set', 'card sets')]:
+    print(f"{len(counts[column])} {label}: ", np.sort(counts[column].index))
 
 # How many unique card mechanics combinations?
 # ---------------------- #
-print(f"{cards_df.mechanics.nunique()} unique card mechanics combinations.")
+print(
+    f"{len(counts['mechanics_combinations'])} "
+    "unique card mechanics combinations.")
 
 # How many card mechanics?
 # ---------------------- #
-cards_df.mechanics = cards_df.mechanics.apply(lambda x: ast.literal_eval(x))
-unique_card_mechanics = []
-
-for m in cards_df.mechanics:
-    for n in m:
-        if n not in set(unique_card_mechanics):
-            unique_card_mechanics.append(n)
-
 print(
-    f"{len(unique_card_mechanics)} unique card mechanics: ",
-    unique_card_mechanics)
+    f"{len(counts['mechanics'])} unique card mechanics: ",
+    list(counts['mechanics'].index))
 
 # NUMERICAL COLUMNS INSPECTION
 # ---------------------------------- #
 print("\nInspecting numerical columns: ", num_cols)
 
 try:
-    display(cards_df.describe())
+    display(profile["numerical"])
 except:
-    print(cards_df.describe())
+    print(profile["numerical"])
 
 # %%
@@ -0,0 +1,107 @@
+"""
+Find the cards most like some others.
+
+Cards are vectorized from their text, summary, mechanics and stats into
+a memory-mapped matrix, in SIMILARITY_DIR, which is brought up to date
+with the card dataset (or the card store) first: only the new and
+changed cards are vectorized again. Cards are given by URL or title.
+"""
+
+
+# IMPORTING PACKAGES
+# -------------------------------------- #
+import argparse
+import os
+from time import time
+import pandas as pd
+from utils import database as db
+from utils import datasets as dts
+from utils import miscelaneous as msc
+from utils import similarity as sim
+
+
+# MAIN METHOD
+# -------------------------------------- #
+if __name__ == "__main__":
+    # Keep track of runtime
+    runtime_start = time()
+
+    config_path = msc.parse_config_path("config/card_scraper_config.json")
+    config_options = msc.load_configuration_file(config_path) or {}
+    output_path = config_options.get(
+        "OUTPUT_PATH", "data/hstd_all_cards.csv")
+    chunk_size, output_format = msc.unpack_output_config(config_options)
+    database_path = msc.unpack_database_config(config_options)
+    similarity_dir = msc.unpack_similarity_config(config_options) \
+        or "data/similarity"
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--config",
+        default=config_path,
+        help="configuration file of the card scraper")
+    parser.add_argument(
+        "cards",
+        nargs="*",
+        help="URLs or titles of the cards to find similar ones to")
+    parser.add_argument(
+        "--input",
+        default=dts.with_format(output_path, output_format),
+        help="card dataset to vectorize, unless there is a card store")
+    parser.add_argument("--output-dir", default=similarity_dir)
+    parser.add_argument(
+        "--skip-build",
+        action="store_true",
+        help="use the vectors as they are")
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    index = sim.SimilarityIndex(args.output_dir)
+
+    # Bring the vectors up to date
+    # -------------------------------------- #
+    if not args.skip_build:
+        if database_path is not None:
+            store = db.CardStore(database_path)
+            cards = store.read_cards(
+                sim.SIMILARITY_COLUMNS).to_dict("records")
+            store.close()
+        elif os.path.exists(args.input):
+            names = dts.dataset_columns(args.input)
+            cards = (
+                record
+                for chunk in dts.iter_card_chunks(
+                    args.input,
+                    chunk_size,
+                    [c for c in sim.SIMILARITY_COLUMNS if c in names])
+                for record in chunk.to_dict("records"))
+        else:
+            print(f"\nMissing card dataset {args.input}, run the scrapers "
+                  "first.")
+            cards = None
+        if cards is not None:
+            counts = index.update(cards, complete=True)
+            print(f"\nVectorized {len(index)} cards into {args.output_dir}: "
+                  f"{counts}")
+
+    # Find the neighbours
+    # -------------------------------------- #
+    urls = []
+    for card in args.cards:
+        url = card if card in index.rows else index.find_url(card)
+        if url is None:
+            print(f"\nNo card {card} in the similarity index.")
+        else:
+            urls.append(url)
+    if urls:
+        query_start = time()
+        results = index.most_similar(urls, args.k)
+        print(f"\nFound the neighbours of {len(urls)} cards in "
+              f"{1000 * (time() - query_start):.1f}ms:")
+        with pd.option_context(
+                "display.width", 120, "display.max_columns", None):
+            print(results)
+
+    # Keeping track of runtime.
+    runtime_end = time()
+    print(f"\nFinished in {round(runtime_end-runtime_start,2):,}s...")
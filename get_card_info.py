@@ -3,12 +3,26 @@
 
 # IMPORTING PACKAGES
 # -------------------------------------- #
-import pandas as pd
+import argparse
 import pickle
 import os
+import sys
 from time import time
 from utils import miscelaneous as msc
 from utils import scraping as scr
+from utils import caching as cch
+from utils import comments as cmt
+from utils import database as db
+from utils import history as hst
+from utils import search as srch
+from utils import similarity as sim
+from utils import metrics as mtr
+from utils import session as ses
+from utils import throttling as thr
+from utils import pipeline as pipe
+from utils import incremental as inc
+from utils import journal as jrn
+from utils import datasets as dts
 
 
 # MAIN METHOD
@@ -18,35 +32,259 @@ if __name__ == "__main__":
     runtime_start = time()
     print("\nCommencing card scraper...")
 
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="skip the cards already scraped according to the journal")
+    parser.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help="only scrape the cards which failed in the previous crawls")
+    parser.add_argument(
+        "--config",
+        default="config/card_scraper_config.json",
+        help="configuration file of the card scraper")
+    args = parser.parse_args()
+
     # Unpack the configuration options
     # -------------------------------------- #
-    config_path = "config/card_scraper_config.json"
-    config_options = msc.load_configuration_file(config_path)
-    input_path, output_path, failed_output_path, \
-        sleep_time = msc.unpack_card_scraper_config(config_options)
+    config_options = msc.load_configuration_file(args.config)
+    input_path, output_path, failed_output_path, sleep_time, \
+        concurrency_mode, max_workers, requests_per_second, \
+        parse_workers, queue_size = msc.unpack_card_scraper_config(
+            config_options)
+    timeout, user_agent, \
+        max_connections_per_host = msc.unpack_session_config(config_options)
+    ses.configure_session(
+        timeout=timeout,
+        user_agent=user_agent,
+        max_connections_per_host=max_connections_per_host)
+    max_requests_per_second, min_requests_per_second, max_retries, \
+        retry_base_delay, \
+        retry_max_delay = msc.unpack_throttle_config(config_options)
+    # The shared adaptive limiter replaces the fixed sleep between pages
+    thr.configure_limiter(
+        rate=requests_per_second or thr.rate_from_sleep_time(sleep_time),
+        max_rate=max_requests_per_second,
+        min_rate=min_requests_per_second)
+    thr.configure_retries(
+        max_retries=max_retries,
+        base_delay=retry_base_delay,
+        max_delay=retry_max_delay)
+    cache_dir, cache_ttl, cache_max_age, cache_max_bytes, \
+        offline = msc.unpack_cache_config(config_options)
+    cch.configure_cache(
+        cache_dir,
+        ttl=cache_ttl,
+        max_age=cache_max_age,
+        max_bytes=cache_max_bytes,
+        offline=offline)
+    incremental, \
+        refresh_moved = msc.unpack_incremental_config(config_options)
+    journal_path = msc.unpack_journal_config(config_options)
+    chunk_size, output_format = msc.unpack_output_config(config_options)
+    # The extension of the output follows the configured format
+    output_path = dts.with_format(output_path, output_format)
+    comments_path = msc.unpack_comments_config(config_options)
+    database_path = msc.unpack_database_config(config_options)
+    metrics_path = msc.unpack_metrics_config(config_options)
+    fields = msc.unpack_fields_config(config_options)
+    history_path = msc.unpack_history_config(config_options)
+    search_index_path = msc.unpack_search_config(config_options)
+    similarity_dir = msc.unpack_similarity_config(config_options)
+    if fields is not None:
+        print(f"\nOnly scraping the fields {fields}...")
+    store = None
+    if database_path is not None:
+        store = db.CardStore(database_path, chunk_size)
 
     # Unpack list of URLs to parse
     # -------------------------------------- #
-    with open(input_path, 'rb') as fp:
-        card_url_list = pickle.load(fp)
+    if args.retry_failed:
+        card_url_list = []
+        if store is not None:
+            card_url_list = store.list_urls("failed")
+        elif os.path.isfile(failed_output_path):
+            with open(failed_output_path, 'rb') as fp:
+                card_url_list = pickle.load(fp)
+        print(f"\nRetrying {len(card_url_list)} failed cards...")
+        # The failed cards are all there is to scrape
+        incremental = False
+    elif store is not None:
+        card_url_list = store.list_urls()
+    else:
+        with open(input_path, 'rb') as fp:
+            card_url_list = pickle.load(fp)
+
+    # Only scrape new or changed cards if asked to
+    # -------------------------------------- #
+    existing_df = None
+    if incremental and store is not None:
+        existing_df = store.read_cards(["url", "rating", "num_comments"])
+    elif incremental and os.path.isfile(output_path):
+        # Only the columns needed to diff and detect moves are loaded
+        existing_df = dts.read_columns(
+            output_path, ["url", "rating", "num_comments"])
+        if "url" not in existing_df.columns:
+            print("\nExisting dataset has no URLs, scraping everything...")
+            existing_df = None
+
+    if existing_df is not None:
+        added, removed, kept = inc.diff_urls(
+            existing_df["url"].tolist(), card_url_list)
+        print(f"\n{len(added)} new, {len(removed)} removed "
+              f"and {len(kept)} known cards...")
+        card_url_list = added
+        if refresh_moved:
+            print("\nChecking known cards for rating and comment changes...")
+            moved = inc.find_moved_cards(
+                existing_df, kept, max_workers)
+            print(f"\n{len(moved)} known cards have moved...")
+            card_url_list = card_url_list + moved
+
+    # The cards are saved in the order of their URLs, resumed ones too
+    url_order = card_url_list
+
+    # Pick up where an interrupted crawl left off
+    # -------------------------------------- #
+    if args.resume:
+        done_urls = jrn.completed_urls(journal_path)
+        # Cards of another projection would be merged as if of this one
+        journaled_fields = jrn.journal_fields(journal_path)
+        if done_urls and journaled_fields != jrn.projection(fields):
+            print(f"\nThe journal holds cards of the fields "
+                  f"{journaled_fields or 'all'}, not {fields or 'all'}. "
+                  "Resume with the same FIELDS or start afresh.")
+            sys.exit()
+        card_url_list = [u for u in card_url_list if u not in done_urls]
+        print(f"\nResuming, {len(done_urls)} cards already journaled...")
+    journal = jrn.CardJournal(journal_path, resume=args.resume, fields=fields)
 
     # Scrape main page for URL list to parse
     # -------------------------------------- #
     print("\nExtracting card information...")
-    card_list, failed_card_list = scr.scrape_multiple_cards(card_url_list, sleep_time)
-    df = pd.DataFrame.from_records(card_list)
+    if concurrency_mode == "pipeline":
+        _, failed_card_list, stats = pipe.run_pipeline(
+            card_url_list,
+            fetch_workers=max_workers,
+            parse_workers=parse_workers,
+            queue_size=queue_size,
+            journal=journal,
+            keep_cards=False,
+            fields=fields)
+        print(f"\nPipeline stats: {stats.summary()}")
+    else:
+        # Cards only go to the journal, so memory stays flat
+        failed_card_list = []
+        for url, card in scr.iter_scrape_cards(
+                card_url_list,
+                0,
+                mode=concurrency_mode,
+                max_workers=max_workers,
+                journal=journal,
+                fields=fields):
+            if card is None:
+                failed_card_list.append(url)
+    journal.close()
+
+    # The journal holds the cards of this run and of any resumed ones,
+    # in the order they completed
+    cards = jrn.iter_cards(journal_path, url_order)
+
+    if store is not None:
+        # Cards are upserted in place, so there is nothing to merge
+        print(f"\nSaving cards to {database_path}...")
+        for card in cards:
+            store.write(card)
+        store.mark_urls(failed_card_list, "failed")
+        store.close()
+        print(f"\nSaved {store.num_records} cards...")
+    else:
+        # Partial and retried cards update the existing ones, whether
+        # incremental or not
+        partial = fields is not None and os.path.isfile(output_path)
+        retried = args.retry_failed and os.path.isfile(output_path)
+        if existing_df is not None or partial or retried:
+            cards = inc.iter_merged_cards(
+                output_path,
+                jrn.completed_urls(journal_path),
+                cards,
+                chunk_size,
+                partial)
+
+        # Stream the cards to disk in chunks
+        print("\nSaving cards...")
+
+        if not os.path.exists("data"):
+            os.makedirs("data")
+
+        # Write next to the output, as it may be read by the merge
+        tmp_output_path = output_path + ".tmp"
+        writer = dts.open_writer(tmp_output_path, chunk_size, output_format)
+        # Comments are split off the cards into their own store
+        comment_store = cmt.CommentStore(
+            comments_path, chunk_size, output_format)
+        for card in cards:
+            writer.write(card)
+            comment_store.add(card)
+        writer.close()
+        comment_store.close()
+        os.replace(tmp_output_path, output_path)
+        print(f"\nSaved {writer.num_records} cards "
+              f"and {comment_store.num_records} new comments...")
+
+        # Earlier failures stay listed until they succeed, even through
+        # runs which did not retry them, like incremental ones
+        previous_failed = []
+        if os.path.isfile(failed_output_path):
+            with open(failed_output_path, 'rb') as fp:
+                previous_failed = pickle.load(fp)
+        attempted_urls = jrn.completed_urls(journal_path) \
+            | set(failed_card_list)
+        failed_card_list = [
+            u for u in previous_failed if u not in attempted_urls
+        ] + failed_card_list
+        if len(failed_card_list) >= 1:
+            with open(failed_output_path, 'wb') as fp:
+                pickle.dump(failed_card_list, fp)
+        elif os.path.isfile(failed_output_path):
+            os.remove(failed_output_path)
 
-    # Serialize and save the list for later use
-    print("\nSaving cards in CSV...")
+    # Keep the changes of the cards since the previous crawl
+    if history_path is not None:
+        history = hst.HistoryStore(history_path)
+        counts = history.record_crawl(
+            jrn.iter_cards(journal_path), runtime_start)
+        history.close()
+        print(f"\nRecorded {counts['changes']} changes of "
+              f"{counts['cards']} cards ({counts['new_cards']} new) "
+              f"to {history_path}...")
 
-    if not os.path.exists("data"):
-        os.makedirs("data")
+    # Index the new and changed cards, with their comments; partial
+    # cards lack the texts the indexes are built from
+    if search_index_path is not None and fields is None:
+        index = srch.SearchIndex(search_index_path)
+        counts = index.add_cards(jrn.iter_cards(journal_path))
+        index.close()
+        print(f"\nIndexed {counts['added']} new and {counts['updated']} "
+              f"changed cards to {search_index_path}...")
+    if similarity_dir is not None and fields is None:
+        counts = sim.SimilarityIndex(similarity_dir).update(
+            jrn.iter_cards(journal_path))
+        print(f"\nVectorized {counts['added']} new and {counts['updated']} "
+              f"changed cards to {similarity_dir}...")
 
-    df.to_csv(output_path, index=False)
+    print(f"\nHTTP session stats: {ses.get_session().stats()}")
+    if cch.get_cache() is not None:
+        print(f"Evicted {cch.get_cache().evict()} cached pages...")
+        print(f"HTML cache stats: {cch.get_cache().stats()}")
 
-    if len(failed_card_list) >= 1:
-        with open(failed_output_path, 'wb') as fp:
-            pickle.dump(failed_card_list, fp)
+    # Report where the time went
+    mtr.print_report(mtr.get_metrics().report())
+    if metrics_path is not None:
+        mtr.save_report(metrics_path)
+        print(f"\nSaved metrics to {metrics_path}...")
 
     # Keeping track of runtime.
     runtime_end = time()
@@ -3,11 +3,17 @@
 
 # IMPORTING PACKAGES
 # -------------------------------------- #
+import argparse
 import pickle
 import os
 from time import time
 from utils import miscelaneous as msc
 from utils import scraping as scr
+from utils import caching as cch
+from utils import database as db
+from utils import metrics as mtr
+from utils import session as ses
+from utils import throttling as thr
 
 
 # MAIN METHOD
@@ -17,26 +23,82 @@ if __name__ == "__main__":
     runtime_start = time()
     print("\nCommencing url scraper...")
 
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--config",
+        default="config/url_scraper_config.json",
+        help="configuration file of the url scraper")
+    args = parser.parse_args()
+
     # Unpack the configuration options
     # -------------------------------------- #
-    config_path = "config/url_scraper_config.json"
-    config_options = msc.load_configuration_file(config_path)
-    main_url, output_path, \
-        sleep_time = msc.unpack_url_scraper_config(config_options)
+    config_options = msc.load_configuration_file(args.config)
+    main_url, output_path, sleep_time, max_workers, \
+        requests_per_second = msc.unpack_url_scraper_config(config_options)
+    timeout, user_agent, \
+        max_connections_per_host = msc.unpack_session_config(config_options)
+    ses.configure_session(
+        timeout=timeout,
+        user_agent=user_agent,
+        max_connections_per_host=max_connections_per_host)
+    max_requests_per_second, min_requests_per_second, max_retries, \
+        retry_base_delay, \
+        retry_max_delay = msc.unpack_throttle_config(config_options)
+    # The shared adaptive limiter replaces the fixed sleep between pages
+    thr.configure_limiter(
+        rate=requests_per_second or thr.rate_from_sleep_time(sleep_time),
+        max_rate=max_requests_per_second,
+        min_rate=min_requests_per_second)
+    thr.configure_retries(
+        max_retries=max_retries,
+        base_delay=retry_base_delay,
+        max_delay=retry_max_delay)
+    cache_dir, cache_ttl, cache_max_age, cache_max_bytes, \
+        offline = msc.unpack_cache_config(config_options)
+    cch.configure_cache(
+        cache_dir,
+        ttl=cache_ttl,
+        max_age=cache_max_age,
+        max_bytes=cache_max_bytes,
+        offline=offline)
+    database_path = msc.unpack_database_config(config_options)
+    metrics_path = msc.unpack_metrics_config(config_options)
 
     # Scrape main page for URL list to parse
     # -------------------------------------- #
     print("\nExtracting links to cards...")
-    url_list = scr.parse_query_and_fetch_links(main_url, sleep_time)
+    url_list = scr.parse_query_and_fetch_links(
+        main_url,
+        0,
+        max_workers=max_workers)
+
+    if database_path is not None:
+        # The URLs go to the frontier of the card store instead
+        store = db.CardStore(database_path)
+        num_new_urls = store.add_urls(url_list)
+        store.close()
+        print(f"\nAdded {num_new_urls} of {len(url_list)} scraped URLs "
+              f"to {database_path}...")
+    else:
+        # Serialize and save the list for later use
+        print(f"\nSaving list of {len(url_list)} scraped URLs...")
+
+        if not os.path.exists("data"):
+            os.makedirs("data")
 
-    # Serialize and save the list for later use
-    print(f"\nSaving list of {len(url_list)} scraped URLs...")
+        with open(output_path, 'wb') as fp:
+            pickle.dump(url_list, fp)
 
-    if not os.path.exists("data"):
-        os.makedirs("data")
+    print(f"\nHTTP session stats: {ses.get_session().stats()}")
+    if cch.get_cache() is not None:
+        print(f"Evicted {cch.get_cache().evict()} cached pages...")
+        print(f"HTML cache stats: {cch.get_cache().stats()}")
 
-    with open(output_path, 'wb') as fp:
-        pickle.dump(url_list, fp)
+    # Report where the time went
+    mtr.print_report(mtr.get_metrics().report())
+    if metrics_path is not None:
+        mtr.save_report(metrics_path)
+        print(f"\nSaved metrics to {metrics_path}...")
 
     # Keeping track of runtime.
     runtime_end = time()
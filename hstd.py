@@ -0,0 +1,231 @@
+"""
+Run the scrapers and the other scripts of the repo from one command.
+
+Each subcommand runs one of the scripts, which is only imported then, so
+the commands which need none of pandas, numpy or the scraping libraries
+(status, config-check and the help) start in a few milliseconds. The
+arguments after a script subcommand are those of the script, e.g.
+`python hstd.py cards --resume` or `python hstd.py merge -h`.
+"""
+
+
+# IMPORTING PACKAGES
+# -------------------------------------- #
+import argparse
+import os
+import pickle
+import runpy
+import sqlite3
+import sys
+from datetime import datetime
+from utils import miscelaneous as msc
+
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+CARD_CONFIG_PATH = "config/card_scraper_config.json"
+URL_CONFIG_PATH = "config/url_scraper_config.json"
+# Subcommand: script, arguments always passed to it and help
+SCRIPTS = {
+    "urls": ["get_card_urls.py", [], "scrape the card URLs of the query"],
+    "cards": ["get_card_info.py", [], "scrape the cards of the URLs"],
+    "retry-failed": [
+        "get_card_info.py",
+        ["--retry-failed"],
+        "scrape the cards which failed again"],
+    "crawl": ["crawl_shards.py", [], "scrape the cards with shard workers"],
+    "merge": ["merge_datasets.py", [], "merge card datasets"],
+    "profile": ["eda.py", [], "profile the merged card dataset"],
+    "features": ["build_features.py", [], "build the feature matrices"],
+    "history": ["card_history.py", [], "inspect the history of the cards"],
+    "search": ["search_cards.py", [], "search the cards and comments"],
+    "similar": ["find_similar_cards.py", [], "find similar cards"],
+}
+
+
+def load_config(path: str) -> list:
+    """Read a configuration file, with what prevents it if it can't be."""
+    if not os.path.isfile(path):
+        return [None, "missing file"]
+    try:
+        return [msc.read_json_local(path), None]
+    except ValueError as e:
+        return [None, f"invalid JSON: {e}"]
+
+
+def run_script(script: str, arguments: list):
+    """Run a script of the repo as if it was called on its own."""
+    path = os.path.join(REPO_DIR, script)
+    sys.argv = [path] + arguments
+    runpy.run_path(path, run_name="__main__")
+
+
+def describe_file(path: str) -> str:
+    """Describe the size and age of a file or directory."""
+    if path is None:
+        return "not kept"
+    if not os.path.exists(path):
+        return f"{path}, missing"
+    if os.path.isdir(path):
+        size = sum(
+            os.path.getsize(os.path.join(root, name))
+            for root, _, names in os.walk(path)
+            for name in names)
+    else:
+        size = os.path.getsize(path)
+    modified = datetime.fromtimestamp(os.path.getmtime(path))
+
+    return f"{path}, {size / 1e6:,.1f} MB, " \
+        f"modified {modified:%Y-%m-%d %H:%M}"
+
+
+def count_pickled(path: str) -> int:
+    """Count the items of a pickled list, None if it is missing."""
+    if not os.path.isfile(path):
+        return None
+    with open(path, 'rb') as fp:
+        return len(pickle.load(fp))
+
+
+def count_lines(path: str) -> int:
+    """Count the lines of a file without decoding it."""
+    num_lines = 0
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            num_lines += block.count(b"\n")
+
+    return num_lines
+
+
+def query_database(path: str, query: str) -> list:
+    """
+    Run a query against an SQLite file, read-only so that it is never
+    created nor locked for writing; None if it is missing or unfit.
+    """
+    if path is None or not os.path.isfile(path):
+        return None
+    try:
+        connection = sqlite3.connect(
+            f"file:{path}?mode=ro", uri=True, timeout=60)
+        try:
+            return connection.execute(query).fetchall()
+        finally:
+            connection.close()
+    except sqlite3.Error:
+        return None
+
+
+def show_status(config_options: dict, url_config_options: dict):
+    """Print what the scrapers have produced so far."""
+    input_path = config_options.get("INPUT_PATH")
+    output_path = config_options.get("OUTPUT_PATH")
+    failed_output_path = config_options.get("FAILED_OUTPUT_PATH")
+    _, output_format = msc.unpack_output_config(config_options)
+    if output_path is not None:
+        # As datasets.with_format, which would import pandas
+        output_path = os.path.splitext(output_path)[0] + "." + output_format
+    database_path = msc.unpack_database_config(config_options)
+    journal_path = msc.unpack_journal_config(config_options)
+
+    print("\nScraped so far:")
+    print("# -------------------------------------- #")
+    if database_path is not None:
+        print(f"\t* card store: {describe_file(database_path)}")
+        statuses = query_database(
+            database_path, "SELECT status, COUNT(*) FROM urls GROUP BY 1")
+        cards = query_database(database_path, "SELECT COUNT(*) FROM cards")
+        if statuses is not None:
+            print(f"\t* URLs: {dict(statuses)}")
+        if cards is not None:
+            print(f"\t* cards: {cards[0][0]:,}")
+    else:
+        num_urls = count_pickled(input_path) if input_path else None
+        print(f"\t* URLs: {describe_file(input_path)}"
+              + ("" if num_urls is None else f", {num_urls:,} URLs"))
+        print(f"\t* cards: {describe_file(output_path)}")
+        num_failed = count_pickled(failed_output_path) \
+            if failed_output_path else None
+        print(f"\t* failed cards: {num_failed or 0:,}")
+    if os.path.isfile(journal_path):
+        print(f"\t* journal: {describe_file(journal_path)}, "
+              f"{count_lines(journal_path):,} entries")
+
+    crawls = query_database(
+        msc.unpack_history_config(config_options),
+        "SELECT COUNT(*), MAX(crawled_at) FROM crawls")
+    if crawls is not None and crawls[0][0]:
+        last_crawl = datetime.fromtimestamp(crawls[0][1])
+        print(f"\t* history: {crawls[0][0]:,} crawls, "
+              f"the last on {last_crawl:%Y-%m-%d %H:%M}")
+    docs = query_database(
+        msc.unpack_search_config(config_options),
+        "SELECT COUNT(*) FROM docs")
+    if docs is not None:
+        print(f"\t* search index: {docs[0][0]:,} cards")
+    print("\t* similarity index: "
+          f"{describe_file(msc.unpack_similarity_config(config_options))}")
+    for name, options in [
+            ("url", url_config_options), ("card", config_options)]:
+        metrics_path = msc.unpack_metrics_config(options)
+        if metrics_path is not None:
+            print(f"\t* {name} scraper metrics: "
+                  f"{describe_file(metrics_path)}")
+
+
+# MAIN METHOD
+# -------------------------------------- #
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--config",
+        help=f"configuration file of the card scraper, {CARD_CONFIG_PATH} "
+             "by default")
+    parser.add_argument(
+        "--url-config",
+        help=f"configuration file of the url scraper, {URL_CONFIG_PATH} "
+             "by default")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser(
+        "status", help="show what the scrapers have produced so far")
+    subparsers.add_parser(
+        "config-check", help="check the options of the configuration files")
+    for command, (_, _, description) in SCRIPTS.items():
+        # The help of the script is shown instead
+        subparsers.add_parser(command, help=description, add_help=False)
+    args, arguments = parser.parse_known_args()
+
+    if args.command in SCRIPTS:
+        script, extra_arguments, _ = SCRIPTS[args.command]
+        config_path = args.url_config if args.command == "urls" \
+            else args.config
+        if config_path is not None:
+            extra_arguments = extra_arguments + ["--config", config_path]
+        run_script(script, extra_arguments + arguments)
+        sys.exit()
+
+    if arguments:
+        parser.error(f"unrecognized arguments: {' '.join(arguments)}")
+    config_paths = {
+        "url": args.url_config or URL_CONFIG_PATH,
+        "card": args.config or CARD_CONFIG_PATH,
+    }
+    configs = {
+        name: load_config(path) for name, path in config_paths.items()}
+
+    if args.command == "config-check":
+        num_problems = 0
+        for name, (config_options, error) in configs.items():
+            problems = [error] if config_options is None \
+                else msc.check_config(config_options, name)
+            num_problems += len(problems)
+            print(f"\n{config_paths[name]}: "
+                  + ("OK" if not problems else "problems found"))
+            for problem in problems:
+                print(f"\t* {problem}")
+        # A non-zero exit status lets cron jobs stop on a broken config
+        sys.exit(1 if num_problems else 0)
+
+    config_options, error = configs["card"]
+    if config_options is None:
+        print(f"\n{config_paths['card']}: {error}")
+        sys.exit(1)
+    show_status(config_options, configs["url"][0] or {})
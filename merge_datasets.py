@@ -1,19 +1,67 @@
-"""Merges multiple dataframes and saves to CSV."""
+"""
+Merges card datasets into one, by card key, and saves to CSV or Parquet.
 
+Any number of datasets can be merged, like those of separate crawls, the
+first being the base the others are upserted into. By default, the main
+dataset is deduplicated into the merged one.
+"""
 
-import pandas as pd
+
+import argparse
+from time import time
+from utils import datasets as dts
+from utils import merging as mrg
+from utils import miscelaneous as msc
 
 if __name__ == "__main__":
-    df1 = pd.read_csv("data/hstd_all_cards.csv")
-    df2 = pd.read_csv("data/hstd_failed_cards.csv")
+    runtime_start = time()
 
-    frames = [df1, df2]
+    # Follow the output format of the card scraper
+    config_path = msc.parse_config_path("config/card_scraper_config.json")
+    config_options = msc.load_configuration_file(config_path)
+    chunk_size, output_format = msc.unpack_output_config(
+        config_options or {})
 
-    for df in frames:
-        print(df.shape)
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--config",
+        default=config_path,
+        help="configuration file of the card scraper")
+    parser.add_argument(
+        "inputs",
+        nargs="*",
+        default=[dts.with_format("data/hstd_all_cards.csv", output_format)],
+        help="datasets to merge, in increasing order of priority")
+    parser.add_argument(
+        "--output",
+        default=dts.with_format(
+            "data/hstd_all_cards_merged.csv", output_format),
+        help="path of the merged dataset")
+    parser.add_argument(
+        "--key",
+        choices=list(mrg.KEY_COLUMNS),
+        default="url",
+        help="card key; url falls back to the title for cards without one")
+    parser.add_argument(
+        "--keep",
+        choices=["last", "first"],
+        default="last",
+        help="which dataset wins for a card found in several")
+    parser.add_argument("--chunk-size", type=int, default=chunk_size)
+    args = parser.parse_args()
 
-    df = pd.concat(frames)
+    print(f"\nMerging {len(args.inputs)} datasets into {args.output}...")
+    counts = mrg.merge_datasets(
+        args.inputs,
+        args.output,
+        key=args.key,
+        keep=args.keep,
+        chunk_size=args.chunk_size)
 
-    print(df.shape)
+    print(f"\n{counts['added']} added, {counts['updated']} updated "
+          f"and {counts['unchanged']} unchanged cards, "
+          f"{counts['unkeyed']} without a key...")
+    print(f"Saved {counts['records']} cards...")
 
-    df.to_csv("data/hstd_all_cards_merged.csv", index=False)
+    runtime_end = time()
+    print(f"\nFinished in {round(runtime_end-runtime_start,2):,}s...")
@@ -0,0 +1,125 @@
+"""
+Build the full-text search index of the cards and query it.
+
+The cards of the scraper output (or of the card store) and the comments
+of the comment store are added to the index, at SEARCH_INDEX_PATH, in
+place: only new or changed cards and new comments are indexed. The card
+scraper keeps the index up to date itself, after each crawl. A query,
+if given, is then run against the index.
+"""
+
+
+# IMPORTING PACKAGES
+# -------------------------------------- #
+import argparse
+import os
+from time import time
+from utils import comments as cmt
+from utils import database as db
+from utils import datasets as dts
+from utils import miscelaneous as msc
+from utils import search as srch
+
+
+INDEXED_COLUMNS = ["url"] + [
+    c for c in list(srch.TEXT_FIELDS) + srch.FACET_FIELDS if c != "comments"]
+
+
+# MAIN METHOD
+# -------------------------------------- #
+if __name__ == "__main__":
+    # Keep track of runtime
+    runtime_start = time()
+
+    config_path = msc.parse_config_path("config/card_scraper_config.json")
+    config_options = msc.load_configuration_file(config_path) or {}
+    output_path = config_options.get(
+        "OUTPUT_PATH", "data/hstd_all_cards.csv")
+    chunk_size, output_format = msc.unpack_output_config(config_options)
+    database_path = msc.unpack_database_config(config_options)
+    comments_path = msc.unpack_comments_config(config_options)
+    search_index_path = msc.unpack_search_config(config_options) \
+        or "data/hstd_search_index.db"
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--config",
+        default=config_path,
+        help="configuration file of the card scraper")
+    parser.add_argument(
+        "--input",
+        default=dts.with_format(output_path, output_format),
+        help="card dataset to index, unless there is a card store")
+    parser.add_argument(
+        "--comments",
+        default=dts.with_format(comments_path, output_format),
+        help="comment store to index, unless there is a card store")
+    parser.add_argument("--index", default=search_index_path)
+    parser.add_argument(
+        "--skip-build",
+        action="store_true",
+        help="only query the index as it is")
+    parser.add_argument("--query", help="words to search the cards for")
+    parser.add_argument(
+        "--fields",
+        nargs="+",
+        choices=list(srch.TEXT_FIELDS),
+        help="only search these text fields, e.g. comments")
+    parser.add_argument(
+        "--facet",
+        action="append",
+        default=[],
+        help="only search cards with this facet value, e.g. class=Mage")
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    index = srch.SearchIndex(args.index)
+
+    # Update the index
+    # -------------------------------------- #
+    if not args.skip_build:
+        print(f"\nIndexing cards into {args.index}...")
+        if database_path is not None:
+            store = db.CardStore(database_path)
+            cards = store.read_cards(INDEXED_COLUMNS).to_dict("records")
+            comments = store.connection.execute(
+                "SELECT url, comment_hash, text FROM comments").fetchall()
+            store.close()
+            comments = (
+                {"url": u, "comment_hash": h, "text": t}
+                for u, h, t in comments)
+        elif not os.path.exists(args.input):
+            print(f"\nMissing card dataset {args.input}, run the scrapers "
+                  "first.")
+            cards, comments = [], []
+        else:
+            names = dts.dataset_columns(args.input)
+            cards = (
+                record
+                for chunk in dts.iter_card_chunks(
+                    args.input,
+                    chunk_size,
+                    [c for c in INDEXED_COLUMNS if c in names])
+                for record in chunk.to_dict("records"))
+            comments = []
+            if os.path.exists(args.comments):
+                comments = cmt.iter_comments(args.comments, chunk_size)
+        counts = index.add_cards(cards)
+        num_comments = index.add_comments(comments)
+        print(f"\t* cards: {counts}")
+        print(f"\t* new comments: {num_comments}")
+
+    # Run the query
+    # -------------------------------------- #
+    if args.query is not None:
+        facets = dict(f.split("=", 1) for f in args.facet)
+        query_start = time()
+        results = index.search(args.query, args.fields, facets, args.limit)
+        print(f"\n{len(results)} cards found in "
+              f"{1000 * (time() - query_start):.1f}ms:")
+        print(results)
+    index.close()
+
+    # Keeping track of runtime.
+    runtime_end = time()
+    print(f"\nFinished in {round(runtime_end-runtime_start,2):,}s...")
@@ -0,0 +1,226 @@
+"""Methods related to the on-disk HTML cache."""
+
+
+# IMPORTING PACKAGES
+# -------------------------------------- #
+import hashlib
+import json
+import os
+import threading
+from time import time
+from typing import Dict
+from utils import session as ses
+
+
+class CacheMissError(Exception):
+    """Raised in offline mode when a page was never cached."""
+
+
+def sha256(data: bytes) -> str:
+    """Return the hex SHA-256 digest of some bytes."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def write_atomically(path: str, data: bytes):
+    """Write a file so that readers never see it half written."""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class HtmlCache:
+    """
+    Content-addressed store of fetched HTML, indexed by URL.
+
+    Bodies live under objects/ named by the hash of their content, so
+    identical pages are only stored once, while index/ holds one small
+    JSON entry per URL with the validators sent back by the server.
+    Entries younger than ttl seconds are served without any request;
+    older ones are revalidated with a conditional GET, so an unchanged
+    page only costs a 304. In offline mode pages are served purely from
+    the cache and misses raise CacheMissError.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        ttl: float = 86400,
+        max_age: float = None,
+        max_bytes: int = None,
+        offline: bool = False
+    ):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        os.makedirs(os.path.join(directory, "index"), exist_ok=True)
+        os.makedirs(os.path.join(directory, "objects"), exist_ok=True)
+
+    def _index_path(self, url: str) -> str:
+        return os.path.join(
+            self.directory, "index", sha256(url.encode('utf-8')) + ".json")
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.directory, "objects", digest)
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def lookup(self, url: str) -> Dict:
+        """Return the index entry of an URL, or None if not cached."""
+        try:
+            with open(self._index_path(url), 'r') as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if not os.path.isfile(self._object_path(entry["object"])):
+            return None
+
+        return entry
+
+    def read(self, entry: Dict) -> bytes:
+        """Return the cached body of an index entry."""
+        with open(self._object_path(entry["object"]), 'rb') as f:
+            return f.read()
+
+    def _write_entry(self, entry: Dict):
+        write_atomically(
+            self._index_path(entry["url"]),
+            json.dumps(entry).encode('utf-8'))
+
+    def store(self, url: str, body: bytes, headers: Dict) -> Dict:
+        """Store a body together with the validators of its response."""
+        digest = sha256(body)
+        object_path = self._object_path(digest)
+        if not os.path.isfile(object_path):
+            write_atomically(object_path, body)
+        entry = {
+            "url": url,
+            "object": digest,
+            "size": len(body),
+            "etag": headers.get("etag"),
+            "last_modified": headers.get("last-modified"),
+            "fetched_at": time()
+        }
+        self._write_entry(entry)
+
+        return entry
+
+    def is_fresh(self, entry: Dict) -> bool:
+        """Check whether an entry can be served without revalidation."""
+        return self.ttl is not None and time() - entry["fetched_at"] < self.ttl
+
+    def fetch(self, url: str, session: ses.HttpSession) -> bytes:
+        """Return the body of an URL, going to the network only if needed."""
+        entry = self.lookup(url)
+        if entry is not None and (self.offline or self.is_fresh(entry)):
+            self._count("hits")
+            return self.read(entry)
+        if self.offline:
+            raise CacheMissError(f"URL not in cache: {url}")
+
+        # Ask the server whether our copy is still valid
+        headers = {}
+        if entry is not None:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+        response = session.request(url, headers)
+
+        if response.status == 304 and entry is not None:
+            self._count("revalidated")
+            entry["fetched_at"] = time()
+            self._write_entry(entry)
+            return self.read(entry)
+        # A 304 to an unconditional request has no body to cache
+        if response.status == 304 or response.status >= 400:
+            raise ses.HttpError(url, response.status, response.headers)
+
+        self._count("misses")
+        self.store(url, response.body, response.headers)
+
+        return response.body
+
+    def evict(self) -> int:
+        """
+        Drop entries older than max_age, then the least recently
+        validated ones until the cache fits in max_bytes.
+
+        Returns the number of evicted entries.
+        """
+        entries = []
+        for name in os.listdir(os.path.join(self.directory, "index")):
+            path = os.path.join(self.directory, "index", name)
+            try:
+                with open(path, 'r') as f:
+                    entries.append([path, json.load(f)])
+            except (FileNotFoundError, ValueError):
+                continue
+
+        # Oldest first
+        entries.sort(key=lambda item: item[1]["fetched_at"])
+        now = time()
+        object_sizes = {e["object"]: e["size"] for _, e in entries}
+        total_bytes = sum(object_sizes.values())
+        references = {}
+        for _, entry in entries:
+            digest = entry["object"]
+            references[digest] = references.get(digest, 0) + 1
+
+        evicted = 0
+        for path, entry in entries:
+            too_old = self.max_age is not None and \
+                now - entry["fetched_at"] > self.max_age
+            too_big = self.max_bytes is not None and \
+                total_bytes > self.max_bytes
+            if not too_old and not too_big:
+                break
+            os.remove(path)
+            evicted += 1
+            # Objects are shared, so only drop them with their last entry
+            references[entry["object"]] -= 1
+            if references[entry["object"]] == 0:
+                total_bytes -= object_sizes[entry["object"]]
+                try:
+                    os.remove(self._object_path(entry["object"]))
+                except FileNotFoundError:
+                    pass
+
+        return evicted
+
+    def stats(self) -> Dict:
+        """Summarize how pages were served."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "revalidated": self.revalidated,
+                "misses": self.misses
+            }
+
+
+# The cache shared by every fetch, disabled unless configured
+_cache = None
+
+
+def configure_cache(directory: str, **kwargs) -> HtmlCache:
+    """Enable the shared cache, or disable it if directory is None."""
+    global _cache
+    if directory is None:
+        _cache = None
+    else:
+        _cache = HtmlCache(directory, **kwargs)
+
+    return _cache
+
+
+def get_cache() -> HtmlCache:
+    """Return the shared cache, or None if caching is disabled."""
+    return _cache
@@ -0,0 +1,109 @@
+"""Methods related to the comments store."""
+
+
+# IMPORTING PACKAGES
+# -------------------------------------- #
+import os
+from typing import Dict, Iterator
+from utils import datasets as dts
+from utils import miscelaneous as msc
+
+
+# Columns of a comment record; the URL joins it to its card
+COMMENT_COLUMNS = [
+    "url",
+    "position",
+    "comment_hash",
+    "text"
+]
+
+
+def comment_schema():
+    """Return the Arrow schema of a comment record."""
+    dts.require_pyarrow()
+    return dts.pa.schema([
+        ("url", dts.pa.string()),
+        ("position", dts.pa.int32()),
+        ("comment_hash", dts.pa.string()),
+        ("text", dts.pa.string())
+    ])
+
+
+def iter_comment_records(card: Dict) -> Iterator[Dict]:
+    """
+    Yield a record per comment of a card, in the order of the page.
+
+    Cards loaded back from a dataset have no list of comments, and
+    yield nothing.
+    """
+    comments = card.get("comments")
+    if not isinstance(comments, list):
+        return
+    hashes = msc.encode_list(comments)
+    for position, (comment_hash, text) in enumerate(zip(hashes, comments)):
+        yield {
+            "url": card["url"],
+            "position": position,
+            "comment_hash": comment_hash,
+            "text": text
+        }
+
+
+class CommentStore:
+    """
+    Append-only table of card comments, one row per comment.
+
+    A comment already stored for a card, recognized by the hash of its
+    text, is not stored again, so re-scraping a card only appends the
+    comments left since. CSV stores grow in place, Parquet stores are a
+    directory with a part file per run.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        chunk_size: int = 500,
+        file_format: str = "csv"
+    ):
+        self.path = dts.with_format(path, file_format)
+        self.num_skipped = 0
+        # Only the keys of the stored comments are loaded
+        self._stored = set()
+        if os.path.exists(self.path):
+            stored = dts.read_columns(self.path, ["url", "comment_hash"])
+            self._stored = set(
+                zip(stored["url"], stored["comment_hash"]))
+        self._writer = dts.open_writer(
+            self.path,
+            chunk_size,
+            file_format,
+            columns=COMMENT_COLUMNS,
+            schema=comment_schema() if file_format == "parquet" else None,
+            append=True)
+
+    @property
+    def num_records(self) -> int:
+        return self._writer.num_records
+
+    def add(self, card: Dict):
+        """Store the comments of a card which are not stored yet."""
+        for record in iter_comment_records(card):
+            key = (record["url"], record["comment_hash"])
+            if key in self._stored:
+                self.num_skipped += 1
+                continue
+            self._stored.add(key)
+            self._writer.write(record)
+
+    def close(self):
+        """Flush the comments left and close the store."""
+        self._writer.close()
+        # A run without new comments leaves no empty part behind
+        if self.num_records == 0 and self._writer.path != self.path:
+            os.remove(self._writer.path)
+
+
+def iter_comments(path: str, chunk_size: int = 500) -> Iterator[Dict]:
+    """Stream the comments of a store, without loading it whole."""
+    for chunk in dts.iter_chunks(path, chunk_size):
+        yield from chunk.to_dict("records")
@@ -0,0 +1,281 @@
+"""Methods related to the SQLite card store."""
+
+
+# IMPORTING PACKAGES
+# -------------------------------------- #
+import os
+import sqlite3
+from time import time
+from typing import Dict, Iterable, List
+import pandas as pd
+from utils import comments as cmt
+
+
+# Card fields stored in the cards table, and the SQL column of each;
+# set is an SQL keyword, and class and mechanics get their own tables
+CARD_FIELDS = {
+    "url": "url",
+    "title": "title",
+    "summary": "summary",
+    "text": "text",
+    "type": "type",
+    "cost": "cost",
+    "rarity": "rarity",
+    "set": "card_set",
+    "rating": "rating",
+    "num_comments": "num_comments",
+    "attack": "attack",
+    "health": "health",
+    "school": "school",
+    "durability": "durability"
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    url TEXT PRIMARY KEY,
+    position INTEGER,
+    status TEXT NOT NULL DEFAULT 'pending',
+    updated_at REAL
+);
+CREATE TABLE IF NOT EXISTS cards (
+    url TEXT PRIMARY KEY,
+    title TEXT,
+    summary TEXT,
+    text TEXT,
+    type TEXT,
+    cost REAL,
+    rarity TEXT,
+    card_set TEXT,
+    rating REAL,
+    num_comments REAL,
+    attack REAL,
+    health REAL,
+    school TEXT,
+    durability REAL,
+    scraped_at REAL
+);
+CREATE TABLE IF NOT EXISTS card_classes (
+    url TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    card_class TEXT NOT NULL,
+    PRIMARY KEY (url, position)
+);
+CREATE TABLE IF NOT EXISTS card_mechanics (
+    url TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    mechanic TEXT NOT NULL,
+    PRIMARY KEY (url, position)
+);
+CREATE TABLE IF NOT EXISTS comments (
+    url TEXT NOT NULL,
+    position INTEGER,
+    comment_hash TEXT NOT NULL,
+    text TEXT,
+    PRIMARY KEY (url, comment_hash)
+);
+CREATE INDEX IF NOT EXISTS urls_status ON urls (status);
+CREATE INDEX IF NOT EXISTS cards_set ON cards (card_set);
+CREATE INDEX IF NOT EXISTS cards_type ON cards (type);
+CREATE INDEX IF NOT EXISTS cards_cost ON cards (cost);
+CREATE INDEX IF NOT EXISTS card_classes_class
+    ON card_classes (card_class, url);
+"""
+
+
+class CardStore:
+    """
+    SQLite database holding the URL frontier, cards and comments.
+
+    Cards are keyed by URL and upserted, so a store is updated in place
+    run after run. Writes are buffered and committed in batches of
+    chunk_size cards, each batch in a single transaction. The store has
+    the write, flush and close methods of the dataset writers.
+    """
+
+    def __init__(self, path: str, chunk_size: int = 500):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.num_records = 0
+        self._buffer = []
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        # Writers of other processes are waited for instead of failing
+        self.connection = sqlite3.connect(path, timeout=60)
+        # Readers are not blocked while a batch is written
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+
+    # URL frontier
+    # -------------------------------------- #
+    def add_urls(self, url_list: List) -> int:
+        """Add newly discovered URLs to the frontier, returning how many."""
+        start = self.connection.execute(
+            "SELECT COALESCE(MAX(position) + 1, 0) FROM urls").fetchone()[0]
+        with self.connection:
+            before = self.connection.total_changes
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO urls (url, position, updated_at) "
+                "VALUES (?, ?, ?)",
+                [(url, start + i, time()) for i, url in enumerate(url_list)])
+
+            return self.connection.total_changes - before
+
+    def list_urls(self, status: str = None) -> List:
+        """Return the URLs of the frontier in discovery order."""
+        if status is None:
+            rows = self.connection.execute(
+                "SELECT url FROM urls ORDER BY position")
+        else:
+            rows = self.connection.execute(
+                "SELECT url FROM urls WHERE status = ? ORDER BY position",
+                (status,))
+
+        return [row[0] for row in rows]
+
+    def mark_urls(self, url_list: List, status: str):
+        """Set the status of URLs of the frontier."""
+        with self.connection:
+            self.connection.executemany(
+                "UPDATE urls SET status = ?, updated_at = ? WHERE url = ?",
+                [(status, time(), url) for url in url_list])
+
+    # Cards
+    # -------------------------------------- #
+    def write(self, card: Dict):
+        """Buffer a card, flushing the batch once it is full."""
+        self._buffer.append(card)
+        if len(self._buffer) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Upsert the buffered cards and their comments in one go."""
+        if not self._buffer:
+            return
+        with self.connection:
+            self.write_cards(self._buffer)
+        self.num_records += len(self._buffer)
+        self._buffer = []
+
+    def write_cards(self, cards: Iterable[Dict]):
+        """
+        Upsert cards, within the transaction of the caller.
+
+        Only the fields a card has are written, so cards scraped with a
+        field projection update those fields and leave the others be.
+        """
+        now = time()
+        for card in cards:
+            url = card["url"]
+            fields = [f for f in CARD_FIELDS if f in card]
+            columns = [CARD_FIELDS[f] for f in fields] + ["scraped_at"]
+            # Upserting keeps the row, and so the order, of a known card
+            self.connection.execute(
+                f"INSERT INTO cards ({', '.join(columns)}) "
+                f"VALUES ({', '.join('?' * len(columns))}) "
+                "ON CONFLICT (url) DO UPDATE SET "
+                + ", ".join(
+                    f"{c} = excluded.{c}" for c in columns if c != "url"),
+                [card[field] for field in fields] + [now])
+            # Lists are replaced whole, keeping their order
+            for table, column, field in [
+                    ("card_classes", "card_class", "class"),
+                    ("card_mechanics", "mechanic", "mechanics")]:
+                if field not in card:
+                    continue
+                self.connection.execute(
+                    f"DELETE FROM {table} WHERE url = ?", (url,))
+                self.connection.executemany(
+                    f"INSERT INTO {table} (url, position, {column}) "
+                    "VALUES (?, ?, ?)",
+                    [(url, i, v) for i, v in enumerate(card.get(field) or [])])
+            # Comments already stored are kept as they are
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO comments "
+                "(url, position, comment_hash, text) "
+                "VALUES (:url, :position, :comment_hash, :text)",
+                list(cmt.iter_comment_records(card)))
+            self.connection.execute(
+                "INSERT INTO urls (url, status, updated_at) "
+                "VALUES (?, 'done', ?) "
+                "ON CONFLICT (url) DO UPDATE SET "
+                "status = 'done', updated_at = excluded.updated_at",
+                (url, now))
+
+    def read_cards(self, columns: List = None) -> pd.DataFrame:
+        """
+        Load the cards in the shape of a card dataset.
+
+        Only the given card fields are loaded, if any, with class and
+        mechanics back as lists.
+        """
+        if columns is None:
+            columns = list(CARD_FIELDS) + ["class", "mechanics"]
+        fields = [f for f in columns if f in CARD_FIELDS]
+        # The URL is needed to attach the lists
+        selected = ["url"] + [CARD_FIELDS[f] for f in fields if f != "url"]
+        df = pd.read_sql_query(
+            f"SELECT {', '.join(selected)} FROM cards ORDER BY rowid",
+            self.connection)
+        df = df.rename(columns={"card_set": "set"})
+
+        for table, column, field in [
+                ("card_classes", "card_class", "class"),
+                ("card_mechanics", "mechanic", "mechanics")]:
+            if field not in columns:
+                continue
+            values = pd.read_sql_query(
+                f"SELECT url, {column} FROM {table} ORDER BY url, position",
+                self.connection)
+            values = values.groupby("url", sort=False)[column].agg(list)
+            df[field] = df["url"].map(values).map(
+                lambda v: v if isinstance(v, list) else [])
+
+        return df[[c for c in columns if c in df.columns]]
+
+    def select_cards(
+        self,
+        card_set: str = None,
+        card_class: str = None,
+        card_type: str = None,
+        cost: float = None
+    ) -> pd.DataFrame:
+        """Slice the cards by set, class, type or cost, using the indexes."""
+        conditions = []
+        parameters = []
+        for column, value in [
+                ("card_set", card_set), ("type", card_type), ("cost", cost)]:
+            if value is not None:
+                conditions.append(f"cards.{column} = ?")
+                parameters.append(value)
+        if card_class is not None:
+            conditions.append(
+                "cards.url IN "
+                "(SELECT url FROM card_classes WHERE card_class = ?)")
+            parameters.append(card_class)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        return pd.read_sql_query(
+            f"SELECT * FROM cards {where} ORDER BY rowid",
+            self.connection,
+            params=parameters).rename(columns={"card_set": "set"})
+
+    def count_by(self, field: str) -> pd.Series:
+        """Count the cards per value of an indexed field."""
+        if field == "class":
+            query = ("SELECT card_class, COUNT(*) FROM card_classes "
+                     "GROUP BY card_class")
+        elif field in ["set", "type", "cost"]:
+            column = CARD_FIELDS[field]
+            query = f"SELECT {column}, COUNT(*) FROM cards GROUP BY {column}"
+        else:
+            raise ValueError(f"Cannot count cards by {field}")
+        rows = self.connection.execute(query).fetchall()
+
+        return pd.Series(dict(rows), name=field)
+
+    def close(self):
+        """Commit the buffered cards and close the database."""
+        self.flush()
+        self.connection.close()
@@ -0,0 +1,312 @@
+"""Methods related to reading and writing card datasets."""
+
+
+# IMPORTING PACKAGES
+# -------------------------------------- #
+import ast
+import os
+from typing import Dict, Iterator, List
+import numpy as np
+import pandas as pd
+
+try:  # Parquet output is optional
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    ds = None
+    pq = None
+
+
+# Columns of a card record, in the order produced by scrape_card
+# The comments go to their own store, see utils/comments.py
+CARD_COLUMNS = [
+    "title",
+    "summary",
+    "text",
+    "type",
+    "cost",
+    "rarity",
+    "class",
+    "set",
+    "mechanics",
+    "rating",
+    "num_comments",
+    "attack",
+    "health",
+    "school",
+    "durability",
+    "url"
+]
+
+# Columns holding lists, stringified when written to CSV
+LIST_COLUMNS = ["class", "mechanics"]
+
+# Columns with few distinct values, dictionary-encoded in Parquet
+CATEGORY_COLUMNS = ["type", "rarity", "set", "school"]
+
+# Supported output formats and their file extensions
+FORMATS = {
+    "csv": ".csv",
+    "parquet": ".parquet"
+}
+
+
+def is_parquet(path: str) -> bool:
+    """Check whether a dataset path points to a Parquet file."""
+    return path.endswith(".parquet")
+
+
+def with_format(path: str, file_format: str) -> str:
+    """Swap the extension of a dataset path for the one of a format."""
+    if file_format not in FORMATS:
+        raise ValueError(
+            f"Unknown output format {file_format}, "
+            f"expected one of {list(FORMATS)}")
+    return os.path.splitext(path)[0] + FORMATS[file_format]
+
+
+def require_pyarrow():
+    """Fail early with a readable message when pyarrow is missing."""
+    if pa is None:
+        raise ImportError(
+            "Parquet datasets require pyarrow: pip install pyarrow")
+
+
+def card_schema():
+    """
+    Return the Arrow schema of a card record.
+
+    Lists keep their type instead of being stringified, and the columns
+    with few distinct values are dictionary-encoded, so they load back
+    as pandas categoricals.
+    """
+    require_pyarrow()
+    string_list = pa.list_(pa.string())
+    category = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ("title", pa.string()),
+        ("summary", pa.string()),
+        ("text", pa.string()),
+        ("type", category),
+        ("cost", pa.float64()),
+        ("rarity", category),
+        ("class", string_list),
+        ("set", category),
+        ("mechanics", string_list),
+        ("rating", pa.float64()),
+        ("num_comments", pa.float64()),
+        ("attack", pa.float64()),
+        ("health", pa.float64()),
+        ("school", category),
+        ("durability", pa.float64()),
+        ("url", pa.string())
+    ])
+
+
+class ChunkedCsvWriter:
+    """Write records to a CSV file in batches of chunk_size."""
+
+    def __init__(
+        self,
+        path: str,
+        chunk_size: int = 500,
+        columns: List = CARD_COLUMNS,
+        append: bool = False
+    ):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.columns = columns
+        self.num_records = 0
+        self._buffer = []
+        # Appending to an existing file keeps its header
+        self._header_written = append and os.path.isfile(path)
+
+    def write(self, record: Dict):
+        """Buffer a record, flushing the batch once it is full."""
+        self._buffer.append(record)
+        if len(self._buffer) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Append the buffered records to the file."""
+        if not self._buffer and self._header_written:
+            return
+        df = pd.DataFrame.from_records(self._buffer, columns=self.columns)
+        # Lists read from Parquet are arrays, which print without commas
+        for column in LIST_COLUMNS:
+            if column in df.columns:
+                df[column] = df[column].map(
+                    lambda v: v.tolist() if isinstance(v, np.ndarray) else v)
+        df.to_csv(
+            self.path,
+            mode='a' if self._header_written else 'w',
+            header=not self._header_written,
+            index=False)
+        self.num_records += len(self._buffer)
+        self._header_written = True
+        self._buffer = []
+
+    def close(self):
+        """Flush what is left, writing at least the header."""
+        self.flush()
+
+
+class ChunkedParquetWriter:
+    """Write records to a Parquet file, one row group per chunk_size."""
+
+    def __init__(self, path: str, chunk_size: int = 500, schema=None):
+        require_pyarrow()
+        self.path = path
+        self.chunk_size = chunk_size
+        self.schema = schema if schema is not None else card_schema()
+        self.num_records = 0
+        self._buffer = []
+        self._writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, record: Dict):
+        """Buffer a record, flushing the batch once it is full."""
+        self._buffer.append(record)
+        if len(self._buffer) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered records as a row group."""
+        if not self._buffer:
+            return
+        df = pd.DataFrame.from_records(
+            self._buffer, columns=self.schema.names)
+        # A column left empty by every record of a batch comes out as
+        # floats, which Arrow will not turn into strings
+        for field in self.schema:
+            if not pa.types.is_floating(field.type):
+                df[field.name] = df[field.name].astype(object)
+        table = pa.Table.from_pandas(
+            df, schema=self.schema, preserve_index=False)
+        self._writer.write_table(table)
+        self.num_records += len(self._buffer)
+        self._buffer = []
+
+    def close(self):
+        """Flush what is left and finalize the file."""
+        self.flush()
+        self._writer.close()
+
+
+def next_part_path(directory: str) -> str:
+    """Return the path of the next part file of a Parquet directory."""
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+    num_parts = len(
+        [f for f in os.listdir(directory) if f.endswith(".parquet")])
+
+    return os.path.join(directory, f"part-{num_parts:05d}.parquet")
+
+
+def open_writer(
+    path: str,
+    chunk_size: int = 500,
+    file_format: str = None,
+    columns: List = CARD_COLUMNS,
+    schema=None,
+    append: bool = False
+):
+    """
+    Open a chunked writer for a dataset.
+
+    The format is picked from the extension of the path, unless given,
+    like for a temporary file. Parquet files cannot be appended to, so
+    an appendable Parquet dataset is a directory of part files, one more
+    per writer.
+    """
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    if file_format is None:
+        file_format = "parquet" if is_parquet(path) else "csv"
+    if file_format == "parquet":
+        if append:
+            path = next_part_path(path)
+        return ChunkedParquetWriter(path, chunk_size, schema)
+    else:
+        return ChunkedCsvWriter(path, chunk_size, columns, append)
+
+
+def iter_chunks(
+    path: str,
+    chunk_size: int = 500,
+    columns: List = None
+) -> Iterator[pd.DataFrame]:
+    """Yield a dataset as DataFrames of at most chunk_size rows."""
+    if is_parquet(path):
+        require_pyarrow()
+        # Reads a single file as well as a directory of part files
+        dataset = ds.dataset(path, format="parquet")
+        for batch in dataset.to_batches(
+                batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size, usecols=columns)
+
+
+def dataset_columns(path: str) -> List:
+    """Return the column names of a dataset, without reading its rows."""
+    if is_parquet(path):
+        require_pyarrow()
+        return pq.ParquetDataset(path).schema.names
+    else:
+        return pd.read_csv(path, nrows=0).columns.tolist()
+
+
+def read_columns(path: str, columns: List) -> pd.DataFrame:
+    """Load only some columns of a dataset, skipping missing ones."""
+    if is_parquet(path):
+        names = dataset_columns(path)
+        return pd.read_parquet(
+            path, columns=[c for c in columns if c in names])
+    else:
+        return pd.read_csv(path, usecols=lambda c: c in columns)
+
+
+def parse_list(value):
+    """Turn a list stringified in a CSV back into a list."""
+    if isinstance(value, str) and value.startswith("["):
+        return ast.literal_eval(value)
+    else:
+        return value
+
+
+def parse_list_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Parse the lists of a chunk read from CSV back into lists."""
+    for column in LIST_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].map(parse_list)
+
+    return df
+
+
+def iter_card_chunks(
+    path: str,
+    chunk_size: int = 500,
+    columns: List = None
+) -> Iterator[pd.DataFrame]:
+    """Yield the cards of a dataset in chunks, with their lists parsed."""
+    for chunk in iter_chunks(path, chunk_size, columns):
+        if not is_parquet(path):
+            chunk = parse_list_columns(chunk)
+        yield chunk
+
+
+def read_cards(path: str, columns: List = None) -> pd.DataFrame:
+    """
+    Load a card dataset, optionally only some of its columns.
+
+    Parquet columns come back typed. CSV files, which hold the lists as
+    text, get them parsed back, so both formats read the same.
+    """
+    if is_parquet(path):
+        require_pyarrow()
+        return pd.read_parquet(path, columns=columns)
+
+    return parse_list_columns(pd.read_csv(path, usecols=columns))
@@ -0,0 +1,104 @@
+"""Methods related to extracting nodes from card pages."""
+
+
+# IMPORTING PACKAGES
+# -------------------------------------- #
+from typing import Dict, Set
+import lxml.html
+from utils import metrics as mtr
+
+
+COMMENT_ITEMTYPE = "//schema.org/Comment"
+
+# Start of the comment section, which holds most of the markup of a page
+COMMENTS_MARKER = 'id="comments"'
+
+
+def has_class(element, name: str) -> bool:
+    """Check whether an element carries a CSS class."""
+    return name in element.get("class", "").split()
+
+
+def cut_comments(html):
+    """
+    Cut a card page right before its comment section.
+
+    The page is left whole if it has no comment section. The tags left
+    open are closed by the parser.
+    """
+    marker, opening = COMMENTS_MARKER, "<"
+    if isinstance(html, bytes):
+        marker, opening = marker.encode(), opening.encode()
+    end = html.find(marker)
+    if end == -1:
+        return html
+
+    # Cut at the start of the tag carrying the marker
+    return html[:html.rfind(opening, 0, end)]
+
+
+@mtr.timed("extract_card_nodes")
+def extract_card_nodes(html: str, nodes: Set[str] = None) -> Dict:
+    """
+    Collect the text of every node scrape_card needs in a single pass.
+
+    The page is parsed by lxml straight into its C tree and walked once,
+    looking only at the h1, div and li elements, instead of running a
+    separate BeautifulSoup search per field. The selectors are the ones
+    the soup-based helpers use: the first match wins, except for the
+    card details where the last col-md-14 block wins. Missing nodes are
+    returned as None, and the comments as a list of texts.
+
+    Only the given nodes are collected, if any, the others being left
+    empty. Without the comments and their title, the comment section is
+    not even parsed.
+    """
+    wanted = nodes
+    if wanted is not None \
+            and not {"comments", "comments_title"} & set(wanted):
+        html = cut_comments(html)
+    root = lxml.html.fromstring(html)
+
+    # Initialize output
+    nodes = {
+        "title": None,
+        "content": None,
+        "details": None,
+        "rating": None,
+        "comments_title": None,
+        "comments": []
+    }
+    details = None
+
+    def wants(name):
+        return wanted is None or name in wanted
+
+    # Without the comments, list items are not even looked at
+    tags = ["h1", "div"] + (["li"] if wants("comments") else [])
+    for element in root.iter(*tags):
+        if element.tag == "li":
+            if element.get("itemtype") == COMMENT_ITEMTYPE:
+                nodes["comments"].append(element.text_content())
+        elif element.tag == "h1":
+            if nodes["title"] is None and wants("title") \
+                    and has_class(element, "entry-title"):
+                nodes["title"] = element.text_content()
+        elif "class" in element.attrib:
+            if has_class(element, "col-md-14"):
+                details = element
+            elif nodes["content"] is None and wants("content") \
+                    and has_class(element, "card-content"):
+                nodes["content"] = element.text_content()
+            elif nodes["rating"] is None and wants("rating") \
+                    and has_class(element, "gdrts-rating-text"):
+                nodes["rating"] = element.text_content()
+            elif nodes["comments_title"] is None \
+                    and wants("comments_title") \
+                    and has_class(element, "comments-title-wrap"):
+                nodes["comments_title"] = element.text_content()
+
+    # The details table is the list inside the last block
+    if details is not None and wants("details"):
+        nodes["details"] = [li.text_content() for li in details.iter("li")]
+
+    return nodes
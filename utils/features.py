@@ -0,0 +1,204 @@
+"""Methods related to the card feature matrix."""
+
+
+# IMPORTING PACKAGES
+# -------------------------------------- #
+import hashlib
+import json
+import os
+from typing import Dict, List
+import numpy as np
+import pandas as pd
+from utils import datasets as dts
+
+
+# Bumped whenever the layout of the features changes, to rebuild caches
+FEATURES_VERSION = 1
+
+# List columns turned into multi-hot blocks, one column per value
+MULTI_HOT_COLUMNS = ["mechanics", "class"]
+
+# Columns turned into integer codes, -1 when missing
+CODE_COLUMNS = ["set", "rarity", "type", "school"]
+
+# Columns kept as numbers, NaN when missing
+NUMERIC_COLUMNS = [
+    "cost",
+    "attack",
+    "health",
+    "durability",
+    "rating",
+    "num_comments"
+]
+
+FEATURE_COLUMNS = ["url", "title"] + MULTI_HOT_COLUMNS + CODE_COLUMNS \
+    + NUMERIC_COLUMNS
+
+
+def file_digest(path: str) -> str:
+    """Return the SHA-256 of a file, or of the part files of a directory."""
+    digest = hashlib.sha256(f"features-v{FEATURES_VERSION}".encode())
+    if os.path.isdir(path):
+        paths = sorted(
+            os.path.join(path, f) for f in os.listdir(path)
+            if f.endswith(".parquet"))
+    else:
+        paths = [path]
+    for part_path in paths:
+        with open(part_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+
+    return digest.hexdigest()
+
+
+def iter_feature_chunks(path: str, chunk_size: int = 500):
+    """Yield the columns of a dataset needed for the features."""
+    names = dts.dataset_columns(path)
+    columns = [c for c in FEATURE_COLUMNS if c in names]
+    yield from dts.iter_card_chunks(path, chunk_size, columns)
+
+
+def build_vocabulary(path: str, chunk_size: int = 500) -> Dict:
+    """
+    Collect the sorted distinct values of the list and code columns.
+
+    The number of cards is returned with them, under num_cards, so the
+    matrices can be allocated before they are filled.
+    """
+    values = {c: set() for c in MULTI_HOT_COLUMNS + CODE_COLUMNS}
+    num_cards = 0
+    for chunk in iter_feature_chunks(path, chunk_size):
+        num_cards += len(chunk)
+        for column in MULTI_HOT_COLUMNS:
+            if column in chunk.columns:
+                values[column].update(chunk[column].explode().dropna())
+        for column in CODE_COLUMNS:
+            if column in chunk.columns:
+                values[column].update(chunk[column].dropna())
+    vocabulary = {c: sorted(map(str, v)) for c, v in values.items()}
+    vocabulary["num_cards"] = num_cards
+
+    return vocabulary
+
+
+def multi_hot(series: pd.Series, vocabulary: List) -> np.ndarray:
+    """Turn a column of lists into a 0/1 matrix, one column per value."""
+    matrix = np.zeros((len(series), len(vocabulary)), dtype=np.uint8)
+    exploded = series.reset_index(drop=True).explode().dropna()
+    index = pd.Index(vocabulary)
+    columns = index.get_indexer(exploded.astype(str))
+    known = columns >= 0
+    matrix[exploded.index.to_numpy()[known], columns[known]] = 1
+
+    return matrix
+
+
+def build_features(path: str, chunk_size: int = 500) -> List:
+    """
+    Turn a card dataset into feature matrices.
+
+    Mechanics and classes become multi-hot blocks, set, rarity, type and
+    school integer codes, and the stats a float block. The dataset is
+    streamed twice, once for the vocabulary and once for the values, which
+    are written into preallocated arrays.
+    """
+    vocabulary = build_vocabulary(path, chunk_size)
+    num_cards = vocabulary["num_cards"]
+    features = {
+        "url": np.full(num_cards, "", dtype=object),
+        "title": np.full(num_cards, "", dtype=object),
+        "codes": np.full(
+            (num_cards, len(CODE_COLUMNS)), -1, dtype=np.int16),
+        "numeric": np.full(
+            (num_cards, len(NUMERIC_COLUMNS)), np.nan, dtype=np.float32)
+    }
+    for column in MULTI_HOT_COLUMNS:
+        features[column] = np.zeros(
+            (num_cards, len(vocabulary[column])), dtype=np.uint8)
+
+    start = 0
+    for chunk in iter_feature_chunks(path, chunk_size):
+        rows = slice(start, start + len(chunk))
+        for column in ["url", "title"]:
+            if column in chunk.columns:
+                features[column][rows] = chunk[column].fillna("").to_numpy()
+        for column in MULTI_HOT_COLUMNS:
+            if column in chunk.columns:
+                features[column][rows] = multi_hot(
+                    chunk[column], vocabulary[column])
+        for i, column in enumerate(CODE_COLUMNS):
+            if column in chunk.columns:
+                values = chunk[column].astype(object)
+                codes = pd.Index(vocabulary[column]).get_indexer(
+                    values.where(values.notna(), None))
+                features["codes"][rows, i] = codes
+        for i, column in enumerate(NUMERIC_COLUMNS):
+            if column in chunk.columns:
+                features["numeric"][rows, i] = pd.to_numeric(
+                    chunk[column], errors="coerce").to_numpy(np.float32)
+        start += len(chunk)
+
+    # Strings are saved as fixed-width unicode, which loads without pickle
+    for column in ["url", "title"]:
+        features[column] = features[column].astype(str)
+
+    return [features, vocabulary]
+
+
+def save_features(
+    features: Dict,
+    vocabulary: Dict,
+    directory: str,
+    source_hash: str
+):
+    """
+    Save the matrices and the vocabulary, stamped with the source hash.
+
+    Returns the vocabulary as saved.
+    """
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+    np.savez_compressed(os.path.join(directory, "features.npz"), **features)
+    vocabulary = dict(
+        vocabulary,
+        source_hash=source_hash,
+        code_columns=CODE_COLUMNS,
+        numeric_columns=NUMERIC_COLUMNS)
+    # The vocabulary goes last: it marks the cache as complete
+    with open(os.path.join(directory, "vocabulary.json"), 'w') as f:
+        json.dump(vocabulary, f, indent=4)
+
+    return vocabulary
+
+
+def load_features(
+    path: str,
+    directory: str = "data/features",
+    chunk_size: int = 500,
+    force: bool = False
+) -> List:
+    """
+    Load the features of a card dataset, building them if needed.
+
+    The cache in directory is reused as long as the dataset hashes the
+    same, and rebuilt otherwise. Returns a dict of arrays, the
+    vocabulary, and whether the features were rebuilt.
+    """
+    source_hash = file_digest(path)
+    vocabulary_path = os.path.join(directory, "vocabulary.json")
+    if not force and os.path.isfile(vocabulary_path):
+        with open(vocabulary_path, 'r') as f:
+            vocabulary = json.load(f)
+        if vocabulary.get("source_hash") == source_hash:
+            with np.load(os.path.join(directory, "features.npz")) as data:
+                features = {name: data[name] for name in data.files}
+            return [features, vocabulary, False]
+
+    # Drop the stale vocabulary first, so a failed build is not reused
+    if os.path.isfile(vocabulary_path):
+        os.remove(vocabulary_path)
+    features, vocabulary = build_features(path, chunk_size)
+    vocabulary = save_features(features, vocabulary, directory, source_hash)
+
+    return [features, vocabulary, True]
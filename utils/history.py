@@ -0,0 +1,304 @@
+"""Methods related to the history of the cards across crawls."""
+
+
+# IMPORTING PACKAGES
+# -------------------------------------- #
+import os
+import sqlite3
+from time import time
+from typing import Dict, Iterable, List
+import pandas as pd
+from utils import merging as mrg
+
+
+# Fields whose changes are kept, crawl after crawl
+HISTORY_FIELDS = [
+    "title",
+    "cost",
+    "attack",
+    "health",
+    "durability",
+    "text",
+    "rating",
+    "num_comments"
+]
+
+# Balance changes, and whether an increase makes the card stronger;
+# text changes are reworks, neither a nerf nor a buff
+BALANCE_FIELDS = {
+    "cost": False,
+    "attack": True,
+    "health": True,
+    "durability": True,
+    "text": None
+}
+
+# Values have no declared type, so numbers and texts keep theirs
+HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS crawls (
+    crawl_id INTEGER PRIMARY KEY,
+    crawled_at REAL NOT NULL,
+    num_cards INTEGER,
+    num_changes INTEGER
+);
+CREATE TABLE IF NOT EXISTS card_changes (
+    url TEXT NOT NULL,
+    field TEXT NOT NULL,
+    crawl_id INTEGER NOT NULL,
+    value,
+    PRIMARY KEY (url, field, crawl_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS card_changes_crawl ON card_changes (crawl_id);
+"""
+
+
+def to_timestamp(when) -> float:
+    """Turn a date, like '2023-04-01', or a datetime into a timestamp."""
+    if when is None:
+        return time()
+    if isinstance(when, (int, float)):
+        return float(when)
+    when = pd.Timestamp(when)
+    if when.tzinfo is None:
+        when = when.tz_localize("UTC")
+
+    return when.timestamp()
+
+
+class HistoryStore:
+    """
+    SQLite database of the changes of every card, crawl after crawl.
+
+    A crawl only appends the fields which changed since the previous
+    one, keyed by card URL, field and crawl, so a run where nothing
+    moved costs a single row. The state of the cards as of any date is
+    rebuilt from the last change of every field up to that date, which
+    the primary key serves directly.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.connection = sqlite3.connect(path, timeout=60)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(HISTORY_SCHEMA)
+
+    def crawls(self) -> pd.DataFrame:
+        """List the recorded crawls, oldest first."""
+        df = pd.read_sql_query(
+            "SELECT * FROM crawls ORDER BY crawl_id", self.connection)
+        df["crawled_at"] = pd.to_datetime(df["crawled_at"], unit="s")
+
+        return df
+
+    def crawl_as_of(self, when=None) -> int:
+        """Return the last crawl up to a date, None if there is none."""
+        row = self.connection.execute(
+            "SELECT MAX(crawl_id) FROM crawls WHERE crawled_at <= ?",
+            (to_timestamp(when),)).fetchone()
+
+        return row[0]
+
+    def _state(self, crawl_id: int, fields: List = None) -> Dict:
+        """Return the value of every field of every card at a crawl."""
+        if crawl_id is None:
+            return {}
+        where = "crawl_id <= ?"
+        parameters = [crawl_id]
+        if fields is not None:
+            where += f" AND field IN ({', '.join('?' * len(fields))})"
+            parameters += list(fields)
+        # SQLite takes the bare value from the row of the MAX, so this is
+        # a single pass over the primary key
+        rows = self.connection.execute(
+            f"SELECT url, field, value, MAX(crawl_id) FROM card_changes "
+            f"WHERE {where} GROUP BY url, field",
+            parameters)
+        state = {}
+        for url, field, value, _ in rows:
+            state[(url, field)] = value
+
+        return state
+
+    def record_crawl(
+        self,
+        cards: Iterable[Dict],
+        crawled_at=None,
+        fields: List = HISTORY_FIELDS,
+        chunk_size: int = 500
+    ) -> Dict:
+        """
+        Append the fields of the cards of a crawl which changed.
+
+        Cards are compared with their last recorded state and streamed
+        in, their changes being written in batches of chunk_size. Fields
+        a card lacks, like those left out of a projection, are not
+        recorded; missing values are. Crawls must come in order of date.
+
+        Returns the number of cards seen, new cards and changes.
+        """
+        crawled_at = to_timestamp(crawled_at)
+        last_crawl_id, last = self.connection.execute(
+            "SELECT MAX(crawl_id), MAX(crawled_at) FROM crawls").fetchone()
+        if last is not None and crawled_at < last:
+            raise ValueError(
+                "Crawls must be recorded in order, the last one is more "
+                "recent than this one")
+        state = self._state(last_crawl_id, fields)
+        known_urls = {url for url, _ in state}
+
+        counts = {"cards": 0, "new_cards": 0, "changes": 0}
+        with self.connection:
+            crawl_id = self.connection.execute(
+                "INSERT INTO crawls (crawled_at) VALUES (?)",
+                (crawled_at,)).lastrowid
+            changes = []
+            for card in cards:
+                # Cards of old datasets may have no URL to key them by
+                url = mrg.normalize_value(card.get("url"))
+                if url is None:
+                    continue
+                counts["cards"] += 1
+                if url not in known_urls:
+                    counts["new_cards"] += 1
+                for field in fields:
+                    if field not in card:
+                        continue
+                    value = mrg.normalize_value(card[field])
+                    # Fields never set are missing already
+                    if state.get((url, field)) == value:
+                        continue
+                    changes.append((url, field, crawl_id, value))
+                if len(changes) >= chunk_size:
+                    self._write_changes(changes)
+                    counts["changes"] += len(changes)
+                    changes = []
+            self._write_changes(changes)
+            counts["changes"] += len(changes)
+            self.connection.execute(
+                "UPDATE crawls SET num_cards = ?, num_changes = ? "
+                "WHERE crawl_id = ?",
+                (counts["cards"], counts["changes"], crawl_id))
+
+        return counts
+
+    def _write_changes(self, changes: List):
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO card_changes "
+            "(url, field, crawl_id, value) VALUES (?, ?, ?, ?)",
+            changes)
+
+    def as_of(self, when=None, fields: List = None) -> pd.DataFrame:
+        """
+        Rebuild the cards as they were at a date, the latest by default.
+
+        Returns one row per card and one column per field, or per given
+        field, with the URL first.
+        """
+        state = self._state(self.crawl_as_of(when), fields)
+        if not state:
+            return pd.DataFrame(columns=["url"] + list(fields or []))
+        long = pd.DataFrame(
+            [(url, field, value) for (url, field), value in state.items()],
+            columns=["url", "field", "value"])
+        df = long.pivot(
+            index="url", columns="field", values="value").infer_objects()
+        columns = [f for f in (fields or HISTORY_FIELDS) if f in df.columns]
+        df = df[columns + [c for c in df.columns if c not in columns]]
+
+        return df.reset_index().rename_axis(columns=None)
+
+    def card_history(self, url: str) -> pd.DataFrame:
+        """List the changes of a card, oldest first, with their dates."""
+        df = pd.read_sql_query(
+            "SELECT crawled_at, field, value FROM card_changes "
+            "JOIN crawls USING (crawl_id) WHERE url = ? "
+            "ORDER BY crawl_id, field",
+            self.connection,
+            params=[url])
+        df["crawled_at"] = pd.to_datetime(df["crawled_at"], unit="s")
+
+        return df
+
+    def field_changes(
+        self,
+        since,
+        until=None,
+        fields: List = None
+    ) -> pd.DataFrame:
+        """
+        List the fields which changed between two dates.
+
+        Only cards which existed at both dates are compared, with their
+        value before and after. Fields are those of the balance report,
+        unless given.
+        """
+        fields = list(fields or BALANCE_FIELDS)
+        before = self._state(self.crawl_as_of(since), fields + ["title"])
+        after = self._state(self.crawl_as_of(until), fields + ["title"])
+        known_urls = {url for url, _ in before}
+        rows = []
+        for (url, field), value in after.items():
+            if field == "title" or url not in known_urls:
+                continue
+            previous = before.get((url, field))
+            if previous != value:
+                rows.append({
+                    "url": url,
+                    "title": after.get((url, "title")),
+                    "field": field,
+                    "before": previous,
+                    "after": value
+                })
+
+        return pd.DataFrame(
+            rows, columns=["url", "title", "field", "before", "after"])
+
+    def balance_report(self, since, until=None) -> pd.DataFrame:
+        """
+        Tell the nerfs and buffs between two dates, card by card.
+
+        Every balance change is labelled a buff or a nerf by the field
+        it moved (a higher cost is a nerf, higher stats a buff, a new
+        text a rework). Each card then gets the verdict of its changes,
+        'mixed' when they disagree.
+        """
+        df = self.field_changes(since, until, list(BALANCE_FIELDS))
+        df["change"] = [
+            change_direction(field, before, after)
+            for field, before, after in zip(
+                df["field"], df["before"], df["after"])]
+        verdicts = df.groupby("url")["change"].agg(card_verdict)
+        df["verdict"] = df["url"].map(verdicts)
+
+        return df.sort_values(["verdict", "title", "field"]).reset_index(
+            drop=True)
+
+    def close(self):
+        """Close the database."""
+        self.connection.close()
+
+
+def change_direction(field: str, before, after) -> str:
+    """Label the change of a field as a buff, a nerf or a rework."""
+    stronger_when_higher = BALANCE_FIELDS.get(field)
+    if stronger_when_higher is None or before is None or after is None:
+        return "rework"
+    if (after > before) == stronger_when_higher:
+        return "buff"
+
+    return "nerf"
+
+
+def card_verdict(changes: pd.Series) -> str:
+    """Sum up the changes of a card into a single verdict."""
+    directions = set(changes) - {"rework"}
+    if len(directions) == 1:
+        return directions.pop()
+    if not directions:
+        return "rework"
+
+    return "mixed"
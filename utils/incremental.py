@@ -0,0 +1,107 @@
+"""Methods related to incremental re-crawls."""
+
+
+# IMPORTING PACKAGES
+# -------------------------------------- #
+import math
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Set
+import pandas as pd
+from tqdm import tqdm
+from utils import datasets as dts
+from utils import scraping as scr
+from utils import throttling as thr
+
+
+def diff_urls(previous_urls: List, current_urls: List) -> List:
+    """
+    Compare the URLs of the previous run with the fresh ones.
+
+    Returns the added, removed and kept URLs, each in the order
+    in which they were collected.
+    """
+    previous = set(previous_urls)
+    current = set(current_urls)
+    added = [url for url in current_urls if url not in previous]
+    removed = [url for url in previous_urls if url not in current]
+    kept = [url for url in current_urls if url in previous]
+
+    return [added, removed, kept]
+
+
+def same_value(a: float, b: float) -> bool:
+    """Compare two numbers, treating missing values as equal."""
+    if isinstance(a, float) and isinstance(b, float) \
+            and math.isnan(a) and math.isnan(b):
+        return True
+
+    return a == b
+
+
+def find_moved_cards(
+    existing_df: pd.DataFrame,
+    url_list: List,
+    max_workers: int = 8,
+    requests_per_second: float = None
+) -> List:
+    """
+    Find the cards whose rating or number of comments moved.
+
+    Only the rating and comment count are parsed, and with the HTML
+    cache enabled unchanged pages are answered with a 304.
+    """
+    thr.seed_limiter(requests_per_second)
+    previous = existing_df.drop_duplicates("url", keep="last")
+    previous = previous.set_index("url")[["rating", "num_comments"]]
+
+    def has_moved(url):
+        try:
+            rating, num_comments = scr.parse_card_activity(
+                scr.fetch_html(url))
+        except Exception:
+            print(f"\nScript failed at URL {url}")
+            print(traceback.format_exc())
+            return False
+        old_rating, old_num_comments = previous.loc[url]
+        return not same_value(rating, float(old_rating)) or \
+            not same_value(num_comments, float(old_num_comments))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        moved = list(tqdm(
+            executor.map(has_moved, url_list), total=len(url_list)))
+
+    return [url for url, flag in zip(url_list, moved) if flag]
+
+
+def iter_merged_cards(
+    existing_path: str,
+    new_urls: Set[str],
+    new_cards: Iterable[Dict],
+    chunk_size: int = 500,
+    partial: bool = False
+) -> Iterator[Dict]:
+    """
+    Upsert freshly scraped cards into the existing dataset by URL.
+
+    The existing dataset is streamed in chunks, dropping the cards
+    which were scraped again, and followed by the new cards. Partial
+    cards, scraped with a field projection, instead update the fields
+    they have of the existing cards, in place; they are held in memory
+    meanwhile, which their few fields allow.
+    """
+    if not partial:
+        for chunk in dts.iter_chunks(existing_path, chunk_size):
+            chunk = chunk[~chunk["url"].isin(new_urls)]
+            yield from chunk.to_dict("records")
+        yield from new_cards
+        return
+
+    updates = {card["url"]: card for card in new_cards}
+    for chunk in dts.iter_chunks(existing_path, chunk_size):
+        for record in chunk.to_dict("records"):
+            update = updates.pop(record.get("url"), None)
+            if update is not None:
+                record.update(update)
+            yield record
+    yield from updates.values()
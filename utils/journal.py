@@ -0,0 +1,143 @@
+"""Methods related to the card progress journal."""
+
+
+# IMPORTING PACKAGES
+# -------------------------------------- #
+import json
+import os
+import threading
+from itertools import chain
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+
+class CardJournal:
+    """
+    Append-only JSONL journal of finished card scrapes.
+
+    Every card is written and flushed to disk as soon as it completes,
+    one line per URL, so an interrupted crawl loses at most the cards
+    which were still in flight. A first line names the fields the cards
+    are projected to, so a resume can tell partial cards from whole
+    ones. The journal is safe to share between threads.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        resume: bool = False,
+        fields: List = None
+    ):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        # A fresh crawl starts a fresh journal
+        self._file = open(path, 'a' if resume else 'w', encoding='utf-8')
+        # Terminate a line torn by a crash so new entries stay readable
+        if resume and self._file.tell() > 0:
+            with open(path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    self._file.write("\n")
+        # A new journal starts with the fields its cards are projected to
+        if self._file.tell() == 0:
+            self._write({"fields": projection(fields)})
+
+    def record(self, url: str, card: Dict = None):
+        """Journal a scraped card, or a failure if card is None."""
+        if card is None:
+            entry = {"url": url, "failed": True}
+        else:
+            entry = {"url": url, "card": card}
+        self._write(entry)
+
+    def _write(self, entry: Dict):
+        """Append an entry to the journal, flushed to disk at once."""
+        line = json.dumps(entry) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        """Close the journal file."""
+        self._file.close()
+
+
+def projection(fields: List = None) -> Optional[List]:
+    """Return the fields of a projection in a comparable order."""
+    return None if fields is None else sorted(fields)
+
+
+def journal_fields(path: str) -> Optional[List]:
+    """
+    Return the fields the cards of a journal are projected to, None for
+    whole cards, as are those of journals older than the header.
+    """
+    for entry in iter_journal(path):
+        return entry["fields"] if "url" not in entry else None
+
+
+def iter_journal(path: str) -> Iterator[Dict]:
+    """Yield the entries of a journal, skipping a torn last line."""
+    if not os.path.isfile(path):
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def completed_urls(path: str) -> Set[str]:
+    """Return the URLs which were scraped successfully."""
+    return {e["url"] for e in iter_journal(path) if "card" in e}
+
+
+def card_offsets(path: str) -> Dict[str, int]:
+    """Index the first scraped card of every URL by its byte offset."""
+    offsets = {}
+    if not os.path.isfile(path):
+        return offsets
+    with open(path, 'rb') as f:
+        offset = 0
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                entry = {}
+            if "card" in entry and entry["url"] not in offsets:
+                offsets[entry["url"]] = offset
+            offset += len(line)
+
+    return offsets
+
+
+def iter_cards(path: str, urls: Iterable = None) -> Iterator[Dict]:
+    """
+    Yield every successfully scraped card once, in journal order.
+
+    Cards are journaled as they complete, in no set order when scraped
+    concurrently. Given URLs, their cards are yielded in that order
+    instead, followed by any others in journal order, so the outputs of
+    two runs can be compared. Only the offsets of the cards are held.
+    """
+    if urls is None:
+        seen = set()
+        for entry in iter_journal(path):
+            if "card" in entry and entry["url"] not in seen:
+                seen.add(entry["url"])
+                yield entry["card"]
+        return
+
+    offsets = card_offsets(path)
+    if not offsets:
+        return
+    with open(path, 'rb') as f:
+        for url in chain(urls, list(offsets)):
+            offset = offsets.pop(url, None)
+            if offset is not None:
+                f.seek(offset)
+                yield json.loads(f.readline())["card"]
@@ -0,0 +1,147 @@
+"""Methods related to merging card datasets."""
+
+
+# IMPORTING PACKAGES
+# -------------------------------------- #
+import hashlib
+import json
+from typing import Dict, Iterator, List
+import numpy as np
+import pandas as pd
+from utils import datasets as dts
+
+
+# Columns tried in turn to key a card; older datasets have no URLs
+KEY_COLUMNS = {
+    "url": ["url", "title"],
+    "title": ["title"]
+}
+
+
+def normalize_value(value):
+    """Make a value comparable across formats, with None if missing."""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (list, dict)):
+        return value
+    if pd.isna(value):
+        return None
+    # Blank strings, like the school of a minion, read back as missing
+    # from CSV but not from Parquet
+    if isinstance(value, str) and not value.strip():
+        return None
+    if isinstance(value, np.generic):
+        value = value.item()
+    # Integer columns turn to floats as soon as a value is missing
+    if isinstance(value, int) and not isinstance(value, bool):
+        return float(value)
+    return value
+
+
+def record_key(record: Dict, key_columns: List) -> str:
+    """Return the key of a card, or None if it has none."""
+    for column in key_columns:
+        value = normalize_value(record.get(column))
+        if value is not None:
+            return f"{column}:{value}"
+    return None
+
+
+def record_digest(record: Dict) -> str:
+    """Hash the content of a card, ignoring its missing fields."""
+    content = {}
+    for column, value in record.items():
+        value = normalize_value(value)
+        if value is not None:
+            content[column] = value
+    content = json.dumps(content, sort_keys=True, default=str)
+
+    return hashlib.md5(content.encode('utf-8')).hexdigest()
+
+
+def iter_records(path: str, chunk_size: int = 500) -> Iterator[Dict]:
+    """Stream the cards of a dataset one record at a time."""
+    for chunk in dts.iter_card_chunks(path, chunk_size):
+        yield from chunk.to_dict("records")
+
+
+def find_winners(
+    paths: List,
+    key_columns: List,
+    keep: str = "last",
+    chunk_size: int = 500
+) -> List:
+    """
+    Pick the record kept for every card key, without loading any data.
+
+    Returns the winning (shard, row, digest) per key, and the digest of
+    every key of the first dataset, which the others are merged into.
+    """
+    winners = {}
+    base = {}
+    for shard, path in enumerate(paths):
+        for row, record in enumerate(iter_records(path, chunk_size)):
+            key = record_key(record, key_columns)
+            if key is None:
+                continue
+            # Later records win ties unless the first one is kept
+            if keep == "last" or key not in winners:
+                digest = record_digest(record)
+                winners[key] = (shard, row, digest)
+                if shard == 0:
+                    base[key] = digest
+
+    return [winners, base]
+
+
+def merge_datasets(
+    paths: List,
+    output_path: str,
+    key: str = "url",
+    keep: str = "last",
+    chunk_size: int = 500,
+    file_format: str = None
+) -> Dict:
+    """
+    Upsert any number of card datasets into one, by card key.
+
+    The first dataset is the base the others are merged into, in order.
+    A card found in several datasets is kept once: from the last one it
+    appears in if keep is "last", or the first one if keep is "first".
+    Datasets are streamed twice in chunks, first to pick the winning
+    record of each key and then to write it, so memory holds only the
+    keys. Cards without a key are all kept.
+
+    Returns the number of added, updated, unchanged and unkeyed cards,
+    with respect to the base, and of the records written.
+    """
+    if key not in KEY_COLUMNS:
+        raise ValueError(
+            f"Unknown merge key {key}, expected one of {list(KEY_COLUMNS)}")
+    if keep not in ["last", "first"]:
+        raise ValueError(f"Unknown priority {keep}, expected last or first")
+    key_columns = KEY_COLUMNS[key]
+
+    winners, base = find_winners(paths, key_columns, keep, chunk_size)
+    counts = {"added": 0, "updated": 0, "unchanged": 0, "unkeyed": 0}
+    for card_key, (_, _, digest) in winners.items():
+        if card_key not in base:
+            counts["added"] += 1
+        elif base[card_key] != digest:
+            counts["updated"] += 1
+        else:
+            counts["unchanged"] += 1
+
+    writer = dts.open_writer(output_path, chunk_size, file_format)
+    for shard, path in enumerate(paths):
+        for row, record in enumerate(iter_records(path, chunk_size)):
+            card_key = record_key(record, key_columns)
+            if card_key is None:
+                counts["unkeyed"] += 1
+                writer.write(record)
+            elif winners[card_key][:2] == (shard, row):
+                writer.write(record)
+    writer.close()
+    counts["records"] = writer.num_records
+
+    return counts
@@ -0,0 +1,322 @@
+"""Methods related to timing the scraper and reporting its metrics."""
+
+
+# IMPORTING PACKAGES
+# -------------------------------------- #
+import functools
+import json
+import os
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from time import perf_counter, time
+from typing import Callable, Dict, List
+
+
+# Upper bounds of the latency buckets, in seconds, from 50us to 60s
+LATENCY_BUCKETS = [
+    0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5,
+    1, 2.5, 5,
+    10, 30, 60
+]
+
+# Prefix of the metric names in the Prometheus export
+PROMETHEUS_PREFIX = "hstd_"
+
+# Help texts of the metrics recorded by the scraper
+DESCRIPTIONS = {
+    "stage_seconds": "Latency of the instrumented scraper stages.",
+    "stage_errors": "Errors raised by the scraper stages, by class.",
+    "http_bytes_received": "Bytes received over HTTP, before decompression.",
+    "http_responses": "HTTP responses received, by status.",
+    "http_retries": "Requests retried after an error or overload."
+}
+
+
+class Histogram:
+    """Counts of observations in fixed buckets, with their sum and range."""
+
+    def __init__(self, buckets: List = None):
+        self.buckets = list(buckets or LATENCY_BUCKETS)
+        # The last count is of observations above every bound
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value: float):
+        """Record an observation."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate a quantile by interpolating within its bucket.
+
+        The estimate is clamped to the observed range, so it is exact
+        for a single observation and never beyond the maximum.
+        """
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) \
+                    else self.max
+                value = lower + (upper - lower) * (rank - seen) / count
+                return min(max(value, self.min), self.max)
+            seen += count
+
+        return self.max
+
+    def to_dict(self) -> Dict:
+        """Summarize the histogram, with cumulative bucket counts."""
+        cumulative = []
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            cumulative.append([bound, seen])
+
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min,
+            "max": self.max,
+            "mean": self.sum / self.count if self.count else None,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "buckets": cumulative
+        }
+
+
+def label_key(labels: Dict) -> tuple:
+    """Turn labels into a hashable key, independent of their order."""
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class MetricsRegistry:
+    """
+    Thread-safe histograms and counters, keyed by name and labels.
+
+    Every stage of the scraper records into the shared registry, which
+    is reported as JSON or in the Prometheus text format. Recording can
+    be switched off, leaving only the cost of a flag check.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.started = time()
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+
+    def observe(self, name: str, value: float, **labels):
+        """Record a value in the histogram of a metric."""
+        if not self.enabled:
+            return
+        key = (name, label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def count(self, name: str, value: float = 1, **labels):
+        """Add to the counter of a metric."""
+        if not self.enabled:
+            return
+        key = (name, label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    @contextmanager
+    def timer(self, stage: str):
+        """Time a block of code as a stage, counting its errors by class."""
+        if not self.enabled:
+            yield
+            return
+        start = perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self.count("stage_errors", stage=stage, error=type(e).__name__)
+            raise
+        finally:
+            self.observe("stage_seconds", perf_counter() - start, stage=stage)
+
+    def reset(self):
+        """Forget everything recorded so far."""
+        with self._lock:
+            self.started = time()
+            self._histograms = {}
+            self._counters = {}
+
+    def report(self) -> Dict:
+        """
+        Summarize the metrics into a JSON-serializable dict.
+
+        Stages nest, e.g. parse_card includes parse_comments, so their
+        times add up to more than the elapsed time.
+        """
+        with self._lock:
+            histograms = {}
+            for (name, labels), histogram in sorted(
+                    self._histograms.items()):
+                histograms.setdefault(name, []).append(
+                    dict(labels=dict(labels), **histogram.to_dict()))
+            counters = {}
+            for (name, labels), value in sorted(self._counters.items()):
+                counters.setdefault(name, []).append(
+                    {"labels": dict(labels), "value": value})
+
+            return {
+                "started_at": self.started,
+                "elapsed_s": time() - self.started,
+                "histograms": histograms,
+                "counters": counters
+            }
+
+    def to_prometheus(self) -> str:
+        """Export the metrics in the Prometheus text format."""
+        report = self.report()
+        lines = []
+        for name, series in report["histograms"].items():
+            full_name = PROMETHEUS_PREFIX + name
+            lines += prometheus_header(full_name, name, "histogram")
+            for entry in series:
+                labels = entry["labels"]
+                for bound, count in entry["buckets"]:
+                    lines.append(
+                        f"{full_name}_bucket"
+                        f"{format_labels(labels, le=bound)} {count}")
+                lines.append(
+                    f"{full_name}_bucket"
+                    f"{format_labels(labels, le='+Inf')} {entry['count']}")
+                lines.append(
+                    f"{full_name}_sum{format_labels(labels)} {entry['sum']}")
+                lines.append(
+                    f"{full_name}_count{format_labels(labels)} "
+                    f"{entry['count']}")
+        for name, series in report["counters"].items():
+            full_name = PROMETHEUS_PREFIX + name + "_total"
+            lines += prometheus_header(full_name, name, "counter")
+            for entry in series:
+                lines.append(
+                    f"{full_name}{format_labels(entry['labels'])} "
+                    f"{entry['value']}")
+
+        return "\n".join(lines) + "\n"
+
+
+def prometheus_header(full_name: str, name: str, kind: str) -> List:
+    """Return the HELP and TYPE lines of a Prometheus metric."""
+    lines = []
+    if name in DESCRIPTIONS:
+        lines.append(f"# HELP {full_name} {DESCRIPTIONS[name]}")
+    lines.append(f"# TYPE {full_name} {kind}")
+
+    return lines
+
+
+def format_labels(labels: Dict, **extra) -> str:
+    """Format labels the Prometheus way, like {stage="fetch"}."""
+    labels = dict(labels, **extra)
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"')
+        pairs.append(f'{key}="{value}"')
+
+    return "{" + ",".join(pairs) + "}"
+
+
+def stage_table(report: Dict) -> List:
+    """Return the latency of every stage, slowest in total first."""
+    errors = {}
+    for entry in report["counters"].get("stage_errors", []):
+        stage = entry["labels"]["stage"]
+        errors[stage] = errors.get(stage, 0) + entry["value"]
+    rows = []
+    for entry in report["histograms"].get("stage_seconds", []):
+        stage = entry["labels"]["stage"]
+        rows.append({
+            "stage": stage,
+            "calls": entry["count"],
+            "errors": errors.get(stage, 0),
+            "total_s": entry["sum"],
+            "mean_ms": 1000 * entry["mean"],
+            "p50_ms": 1000 * entry["p50"],
+            "p99_ms": 1000 * entry["p99"]
+        })
+
+    return sorted(rows, key=lambda row: -row["total_s"])
+
+
+def print_report(report: Dict):
+    """Print where the time went, stage by stage."""
+    print(f"\n{'stage':<24}{'calls':>8}{'errors':>8}{'total_s':>10}"
+          f"{'mean_ms':>10}{'p50_ms':>10}{'p99_ms':>10}")
+    for row in stage_table(report):
+        print(f"{row['stage']:<24}{row['calls']:>8}{row['errors']:>8}"
+              f"{row['total_s']:>10.2f}{row['mean_ms']:>10.2f}"
+              f"{row['p50_ms']:>10.2f}{row['p99_ms']:>10.2f}")
+
+
+def save_report(path: str, registry: "MetricsRegistry" = None):
+    """
+    Save the metrics to a file.
+
+    Paths ending in .prom get the Prometheus text format, any other the
+    JSON report.
+    """
+    registry = registry or get_metrics()
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    with open(path, 'w') as f:
+        if path.endswith(".prom"):
+            f.write(registry.to_prometheus())
+        else:
+            json.dump(registry.report(), f, indent=4)
+
+
+# The registry shared by every stage
+_metrics = MetricsRegistry()
+
+
+def configure_metrics(enabled: bool = True) -> MetricsRegistry:
+    """Replace the shared registry, switching recording on or off."""
+    global _metrics
+    _metrics = MetricsRegistry(enabled)
+
+    return _metrics
+
+
+def get_metrics() -> MetricsRegistry:
+    """Return the shared registry."""
+    return _metrics
+
+
+def timed(stage: str) -> Callable:
+    """Decorate a function to time its calls as a stage."""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with _metrics.timer(stage):
+                return function(*args, **kwargs)
+        return wrapper
+
+    return decorator
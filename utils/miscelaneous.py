@@ -1,6 +1,8 @@
 """Miscelaneous functions."""
 
 
+import argparse
+import difflib
 import json
 import os
 import sys
@@ -8,6 +10,64 @@ from typing import Dict, List
 import hashlib
 
 
+# The options of the configuration files and the types of their values
+NUMBER = (int, float)
+OPTIONAL = type(None)
+SCRAPER_OPTIONS = {
+    "SLEEP_TIME": NUMBER,
+    "MAX_WORKERS": (int,),
+    "REQUESTS_PER_SECOND": NUMBER + (OPTIONAL,),
+    "MAX_REQUESTS_PER_SECOND": NUMBER + (OPTIONAL,),
+    "MIN_REQUESTS_PER_SECOND": NUMBER,
+    "MAX_RETRIES": (int,),
+    "RETRY_BASE_DELAY": NUMBER,
+    "RETRY_MAX_DELAY": NUMBER,
+    "TIMEOUT": NUMBER,
+    "USER_AGENT": (str, OPTIONAL),
+    "MAX_CONNECTIONS_PER_HOST": (int,),
+    "CACHE_DIR": (str, OPTIONAL),
+    "CACHE_TTL": NUMBER,
+    "CACHE_MAX_AGE": NUMBER + (OPTIONAL,),
+    "CACHE_MAX_BYTES": (int, OPTIONAL),
+    "OFFLINE": (bool,),
+    "DATABASE_PATH": (str, OPTIONAL),
+    "METRICS_PATH": (str, OPTIONAL),
+}
+URL_SCRAPER_OPTIONS = dict(
+    SCRAPER_OPTIONS,
+    MAIN_URL=(str,),
+    OUTPUT_PATH=(str,))
+CARD_SCRAPER_OPTIONS = dict(
+    SCRAPER_OPTIONS,
+    INPUT_PATH=(str,),
+    OUTPUT_PATH=(str,),
+    FAILED_OUTPUT_PATH=(str,),
+    CONCURRENCY_MODE=(str,),
+    PARSE_WORKERS=(int, OPTIONAL),
+    QUEUE_SIZE=(int,),
+    INCREMENTAL=(bool,),
+    REFRESH_MOVED=(bool,),
+    JOURNAL_PATH=(str,),
+    CHUNK_SIZE=(int,),
+    OUTPUT_FORMAT=(str,),
+    COMMENTS_OUTPUT_PATH=(str,),
+    NUM_SHARDS=(int,),
+    LEASE_SECONDS=NUMBER,
+    FIELDS=(list, OPTIONAL),
+    HISTORY_PATH=(str, OPTIONAL),
+    SEARCH_INDEX_PATH=(str, OPTIONAL),
+    SIMILARITY_DIR=(str, OPTIONAL))
+# Options read without a default by the unpacking methods
+REQUIRED_OPTIONS = {
+    "url": ["MAIN_URL", "OUTPUT_PATH", "SLEEP_TIME"],
+    "card": ["INPUT_PATH", "OUTPUT_PATH", "FAILED_OUTPUT_PATH", "SLEEP_TIME"],
+}
+OPTION_CHOICES = {
+    "CONCURRENCY_MODE": ["serial", "thread", "asyncio", "pipeline"],
+    "OUTPUT_FORMAT": ["csv", "parquet"],
+}
+
+
 def read_json_local(path: str):
     """Read JSON from local path."""
     with open(path, 'r') as f:
@@ -32,6 +92,50 @@ def load_configuration_file(optionsPath: str):
         return False
 
 
+def parse_config_path(default: str) -> str:
+    """
+    Pick the --config option out of the command line, for the scripts
+    which read the configuration file before parsing their arguments.
+    """
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--config", default=default)
+
+    return parser.parse_known_args()[0].config
+
+
+def check_config(config_options: Dict, scraper: str) -> List:
+    """
+    Check the options of a url or card scraper configuration, returning
+    what is wrong with them: missing, misspelt, mistyped or invalid.
+    """
+    options = URL_SCRAPER_OPTIONS if scraper == "url" \
+        else CARD_SCRAPER_OPTIONS
+    problems = [
+        f"missing option {option}"
+        for option in REQUIRED_OPTIONS[scraper]
+        if option not in config_options]
+    for option, value in config_options.items():
+        if option not in options:
+            close = difflib.get_close_matches(option, options, n=1)
+            hint = f", did you mean {close[0]}?" if close else ""
+            problems.append(f"unknown option {option}{hint}")
+        # Booleans are integers too, but not the other way around
+        elif not isinstance(value, options[option]) or (
+                isinstance(value, bool) and bool not in options[option]):
+            expected = "/".join(
+                "null" if t is OPTIONAL else t.__name__
+                for t in options[option])
+            problems.append(
+                f"option {option} is {value!r}, expected {expected}")
+        elif option in OPTION_CHOICES \
+                and value not in OPTION_CHOICES[option]:
+            problems.append(
+                f"option {option} is {value!r}, expected one of "
+                f"{OPTION_CHOICES[option]}")
+
+    return problems
+
+
 def unpack_url_scraper_config(config_options: Dict) -> List:
     """Unpack url scraper configuration."""
     if config_options is False:
@@ -47,8 +151,12 @@ def unpack_url_scraper_config(config_options: Dict) -> List:
         main_url = config_options["MAIN_URL"]
         output_path = config_options["OUTPUT_PATH"]
         sleep_time = config_options["SLEEP_TIME"]
+        # Concurrency options are optional for older config files
+        max_workers = config_options.get("MAX_WORKERS", 1)
+        requests_per_second = config_options.get("REQUESTS_PER_SECOND")
 
-    return [main_url, output_path, sleep_time]
+    return [main_url, output_path, sleep_time,
+            max_workers, requests_per_second]
 
 
 def unpack_card_scraper_config(config_options: Dict) -> List:
@@ -67,8 +175,116 @@ def unpack_card_scraper_config(config_options: Dict) -> List:
         output_path = config_options["OUTPUT_PATH"]
         failed_output_path = config_options["FAILED_OUTPUT_PATH"]
         sleep_time = config_options["SLEEP_TIME"]
+        # Concurrency options are optional for older config files
+        concurrency_mode = config_options.get("CONCURRENCY_MODE", "serial")
+        max_workers = config_options.get("MAX_WORKERS", 8)
+        requests_per_second = config_options.get("REQUESTS_PER_SECOND")
+        # Only used by the staged pipeline
+        parse_workers = config_options.get("PARSE_WORKERS")
+        queue_size = config_options.get("QUEUE_SIZE", 64)
+
+    return [input_path, output_path, failed_output_path, sleep_time,
+            concurrency_mode, max_workers, requests_per_second,
+            parse_workers, queue_size]
+
+
+def unpack_session_config(config_options: Dict) -> List:
+    """Unpack the HTTP session options shared by the scrapers."""
+    timeout = config_options.get("TIMEOUT", 30)
+    user_agent = config_options.get("USER_AGENT")
+    max_connections_per_host = config_options.get(
+        "MAX_CONNECTIONS_PER_HOST", 8)
+
+    return [timeout, user_agent, max_connections_per_host]
+
+
+def unpack_cache_config(config_options: Dict) -> List:
+    """Unpack the HTML cache options shared by the scrapers."""
+    cache_dir = config_options.get("CACHE_DIR")
+    cache_ttl = config_options.get("CACHE_TTL", 86400)
+    cache_max_age = config_options.get("CACHE_MAX_AGE")
+    cache_max_bytes = config_options.get("CACHE_MAX_BYTES")
+    offline = config_options.get("OFFLINE", False)
+
+    return [cache_dir, cache_ttl, cache_max_age, cache_max_bytes, offline]
+
+
+def unpack_incremental_config(config_options: Dict) -> List:
+    """Unpack the incremental re-crawl options of the card scraper."""
+    incremental = config_options.get("INCREMENTAL", False)
+    refresh_moved = config_options.get("REFRESH_MOVED", False)
+
+    return [incremental, refresh_moved]
+
+
+def unpack_journal_config(config_options: Dict) -> str:
+    """Unpack the path of the card scraper progress journal."""
+    return config_options.get("JOURNAL_PATH", "data/hstd_card_journal.jsonl")
+
+
+def unpack_database_config(config_options: Dict) -> str:
+    """Unpack the path of the SQLite card store, None if not used."""
+    return config_options.get("DATABASE_PATH")
+
+
+def unpack_sharding_config(config_options: Dict) -> List:
+    """Unpack the options of sharded crawls."""
+    num_shards = config_options.get("NUM_SHARDS", 16)
+    lease_seconds = config_options.get("LEASE_SECONDS", 60)
+
+    return [num_shards, lease_seconds]
+
+
+def unpack_similarity_config(config_options: Dict) -> str:
+    """Unpack the directory of the card vectors, None to keep none."""
+    return config_options.get("SIMILARITY_DIR")
+
+
+def unpack_search_config(config_options: Dict) -> str:
+    """Unpack the path of the search index, None to keep none."""
+    return config_options.get("SEARCH_INDEX_PATH")
+
+
+def unpack_history_config(config_options: Dict) -> str:
+    """Unpack the path of the card history, None to keep none."""
+    return config_options.get("HISTORY_PATH")
+
+
+def unpack_fields_config(config_options: Dict) -> List:
+    """Unpack the card fields to scrape, None for all of them."""
+    return config_options.get("FIELDS")
+
+
+def unpack_metrics_config(config_options: Dict) -> str:
+    """Unpack the path of the metrics report, None to not save it."""
+    return config_options.get("METRICS_PATH")
+
+
+def unpack_comments_config(config_options: Dict) -> str:
+    """Unpack the path of the comments store."""
+    return config_options.get(
+        "COMMENTS_OUTPUT_PATH", "data/hstd_all_comments.csv")
+
+
+def unpack_output_config(config_options: Dict) -> List:
+    """Unpack the output format and the records written at once."""
+    chunk_size = config_options.get("CHUNK_SIZE", 500)
+    output_format = config_options.get("OUTPUT_FORMAT", "csv")
+
+    return [chunk_size, output_format]
+
+
+def unpack_throttle_config(config_options: Dict) -> List:
+    """Unpack the adaptive rate limiting and retry options."""
+    max_requests_per_second = config_options.get("MAX_REQUESTS_PER_SECOND")
+    min_requests_per_second = config_options.get(
+        "MIN_REQUESTS_PER_SECOND", 0.5)
+    max_retries = config_options.get("MAX_RETRIES", 3)
+    retry_base_delay = config_options.get("RETRY_BASE_DELAY", 1)
+    retry_max_delay = config_options.get("RETRY_MAX_DELAY", 60)
 
-    return [input_path, output_path, failed_output_path, sleep_time]
+    return [max_requests_per_second, min_requests_per_second, max_retries,
+            retry_base_delay, retry_max_delay]
 
 
 def encode_list(lis: str) -> List:
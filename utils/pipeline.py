@@ -0,0 +1,207 @@
+"""Methods related to the staged fetch and parse pipeline."""
+
+
+# IMPORTING PACKAGES
+# -------------------------------------- #
+import os
+import queue
+import threading
+import traceback
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait
+)
+from time import monotonic
+from typing import Callable, Dict, List
+from tqdm import tqdm
+from utils import journal as jrn
+from utils import scraping as scr
+from utils import throttling as thr
+
+
+class PipelineStats:
+    """Thread-safe counters describing the state of each pipeline stage."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = monotonic()
+        self.fetched = 0
+        self.fetch_failed = 0
+        self.bytes_fetched = 0
+        self.parsed = 0
+        self.parse_failed = 0
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+
+    def record_fetch(self, num_bytes: int, queue_depth: int):
+        """Count a page handed over to the raw HTML queue."""
+        with self._lock:
+            self.fetched += 1
+            self.bytes_fetched += num_bytes
+            self.queue_depth = queue_depth
+            self.max_queue_depth = max(self.max_queue_depth, queue_depth)
+
+    def record_fetch_failure(self):
+        """Count a page which could not be fetched."""
+        with self._lock:
+            self.fetch_failed += 1
+
+    def record_parse(self, failed: bool, queue_depth: int):
+        """Count a page which left the parse stage."""
+        with self._lock:
+            if failed:
+                self.parse_failed += 1
+            else:
+                self.parsed += 1
+            self.queue_depth = queue_depth
+
+    def summary(self) -> Dict:
+        """Summarize queue depth and per-stage throughput."""
+        with self._lock:
+            elapsed = max(monotonic() - self.started, 1e-9)
+            return {
+                "elapsed_s": round(elapsed, 3),
+                "fetched": self.fetched,
+                "fetch_failed": self.fetch_failed,
+                "bytes_fetched": self.bytes_fetched,
+                "fetch_pages_per_s": round(self.fetched / elapsed, 2),
+                "parsed": self.parsed,
+                "parse_failed": self.parse_failed,
+                "parse_pages_per_s": round(self.parsed / elapsed, 2),
+                "queue_depth": self.queue_depth,
+                "max_queue_depth": self.max_queue_depth
+            }
+
+
+def parse_html_safely(
+    parse_function: Callable,
+    index: int,
+    url: str,
+    html: bytes,
+    parse_kwargs: Dict
+) -> List:
+    """Parse a page in a worker process, reporting failures as text."""
+    try:
+        card = parse_function(html, url=url, **parse_kwargs)
+        return [index, url, card, None]
+    except Exception:
+        return [index, url, None, traceback.format_exc()]
+
+
+def run_pipeline(
+    url_list: List,
+    parse_function: Callable = scr.parse_card,
+    parse_kwargs: Dict = None,
+    fetch_workers: int = 8,
+    parse_workers: int = None,
+    queue_size: int = 64,
+    requests_per_second: float = None,
+    sink: Callable = None,
+    journal: jrn.CardJournal = None,
+    keep_cards: bool = True,
+    fields: List = None
+) -> List:
+    """
+    Scrape cards with fetching and parsing running as separate stages.
+
+    Fetch threads download raw HTML into a bounded queue, from which
+    pages are parsed on a pool of processes so that parsing scales
+    across cores while the network stays busy. The parse function
+    receives the HTML plus any keyword arguments found for its URL in
+    parse_kwargs, so parse functions taking extra options can be used.
+    Every parsed card is also handed to sink, and every finished URL
+    written to the journal, if given. With keep_cards off, cards are
+    not collected in memory and only reach the sink and the journal.
+    Fields, if given, are passed on to the parse function, to parse only
+    those fields of the cards.
+
+    Returns the cards (in URL order), the failed URLs and the stats.
+    """
+    # Initialize output
+    parse_kwargs = parse_kwargs or {}
+    parse_workers = parse_workers or os.cpu_count()
+    thr.seed_limiter(requests_per_second)
+    raw_queue = queue.Queue(maxsize=queue_size)
+    stats = PipelineStats()
+    cards = {}
+    failed_card_list = []
+    progress = tqdm(total=len(url_list))
+
+    def fetch(index, url):
+        # The put blocks while the parse stage is behind
+        try:
+            html = scr.fetch_html(url)
+        except Exception:
+            print(f"\nScript failed at URL {url}")
+            print(traceback.format_exc())
+            stats.record_fetch_failure()
+            failed_card_list.append(url)
+            if journal is not None:
+                journal.record(url)
+            progress.update(1)
+            return
+        raw_queue.put([index, url, html])
+        stats.record_fetch(len(html), raw_queue.qsize())
+
+    def collect(done):
+        for future in done:
+            index, url, card, error = future.result()
+            stats.record_parse(error is not None, raw_queue.qsize())
+            if journal is not None:
+                journal.record(url, card)
+            if error is None:
+                if keep_cards:
+                    cards[index] = card
+                if sink is not None:
+                    sink(card)
+            else:
+                print(f"\nScript failed at URL {url}")
+                print(error)
+                failed_card_list.append(url)
+            progress.update(1)
+            progress.set_postfix(queue=stats.queue_depth)
+
+    with ThreadPoolExecutor(max_workers=fetch_workers) as fetch_pool, \
+            ProcessPoolExecutor(max_workers=parse_workers) as parse_pool:
+        # Fetch stage
+        fetches = [
+            fetch_pool.submit(fetch, i, url) for i, url in enumerate(url_list)]
+
+        # Signal the end of the stream once every fetch is done
+        def close_stream():
+            wait(fetches)
+            raw_queue.put(None)
+        threading.Thread(target=close_stream, daemon=True).start()
+
+        # Parse stage, keeping a bounded number of pages in flight
+        pending = set()
+        while True:
+            item = raw_queue.get()
+            if item is None:
+                break
+            index, url, html = item
+            kwargs = parse_kwargs.get(url, {})
+            if fields is not None:
+                kwargs = dict(kwargs, fields=fields)
+            pending.add(parse_pool.submit(
+                parse_html_safely,
+                parse_function,
+                index,
+                url,
+                html,
+                kwargs))
+            if len(pending) >= 2 * parse_workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+        collect(wait(pending).done)
+
+        # Surface unexpected errors from the fetch stage
+        for future in fetches:
+            future.result()
+
+    progress.close()
+    card_list = [cards[i] for i in sorted(cards)]
+
+    return card_list, failed_card_list, stats
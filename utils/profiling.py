@@ -0,0 +1,139 @@
+"""Methods related to profiling card datasets."""
+
+
+# IMPORTING PACKAGES
+# -------------------------------------- #
+from typing import Dict, Iterable
+import pandas as pd
+from utils import datasets as dts
+
+
+# Columns summarized by their distinct values, after normalization
+CATEGORICAL_COLUMNS = ["type", "rarity", "school", "card_class", "set"]
+
+# Columns summarized by their statistics
+NUMERICAL_COLUMNS = [
+    "cost",
+    "attack",
+    "health",
+    "durability",
+    "rating",
+    "num_comments"
+]
+
+
+def normalize_cards(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Normalize the categorical columns of cards, column by column.
+
+    Cards without a spell school get 'Not Spell', the classes of a card
+    are joined into one, like 'Priest/Warlock', and the spaces and
+    apostrophes of the set names are dropped. The results are stored as
+    categoricals, so they are counted on their integer codes.
+    """
+    df = df.copy()
+    if "school" in df.columns:
+        # Empty schools read back as missing from CSV, but not Parquet
+        school = df["school"].astype(object)
+        df["school"] = school.where(school != "").fillna("Not Spell")
+    # The name class conflicts with Python syntax
+    if "class" in df.columns:
+        df = df.rename(columns={"class": "card_class"})
+        df["card_class"] = df["card_class"].str.join("/")
+    if "set" in df.columns:
+        df["set"] = df["set"].astype(object).str.replace(
+            r"[ ']", "", regex=True)
+    for column in CATEGORICAL_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype("category")
+
+    return df
+
+
+def add_counts(total: pd.Series, counts: pd.Series) -> pd.Series:
+    """Add up the value counts of two chunks."""
+    if total is None:
+        return counts
+    return total.add(counts, fill_value=0).astype("int64")
+
+
+def profile_chunks(
+        chunks: Iterable[pd.DataFrame], normalized: bool = False) -> Dict:
+    """
+    Profile a card dataset in one pass over its chunks.
+
+    Chunks are normalized, unless they already are, then reduced to
+    value counts of every categorical column, of the mechanics and of
+    their combinations, which are added up across chunks; only the
+    numerical columns are kept whole, for their quantiles. Memory does
+    not grow with the text columns, so long datasets can be streamed in.
+    """
+    counts = {}
+    numerical = []
+    num_cards = 0
+    for chunk in chunks:
+        num_cards += len(chunk)
+        if not normalized:
+            chunk = normalize_cards(chunk)
+        for column in CATEGORICAL_COLUMNS:
+            if column in chunk.columns:
+                counts[column] = add_counts(
+                    counts.get(column), chunk[column].value_counts())
+        if "mechanics" in chunk.columns:
+            mechanics = chunk["mechanics"]
+            counts["mechanics"] = add_counts(
+                counts.get("mechanics"),
+                mechanics.explode().dropna().value_counts())
+            # Lists are not hashable, their joined names are
+            counts["mechanics_combinations"] = add_counts(
+                counts.get("mechanics_combinations"),
+                mechanics.str.join(", ").value_counts())
+        numerical.append(
+            chunk[[c for c in NUMERICAL_COLUMNS if c in chunk.columns]])
+
+    numerical = pd.concat(numerical) if numerical else pd.DataFrame()
+    # Columns which are empty throughout are still described
+    numerical = numerical.apply(pd.to_numeric, errors="coerce")
+
+    return {
+        "num_cards": num_cards,
+        "counts": {c: v[v > 0] for c, v in counts.items()},
+        "numerical": numerical.describe()
+    }
+
+
+def profile_cards(df: pd.DataFrame, normalized: bool = False) -> Dict:
+    """Profile a card dataset already in memory."""
+    return profile_chunks([df], normalized)
+
+
+def profile_dataset(path: str, chunk_size: int = 500) -> Dict:
+    """Profile a card dataset on disk without loading it whole."""
+    columns = [
+        c for c in dts.CARD_COLUMNS if c not in ["summary", "text", "url"]]
+    return profile_chunks(dts.iter_card_chunks(path, chunk_size, columns))
+
+
+def print_profile(profile: Dict):
+    """Print the summary of a profile."""
+    counts = profile["counts"]
+    labels = {
+        "type": "card types",
+        "rarity": "card rarities",
+        "school": "spell schools",
+        "card_class": "card classes",
+        "set": "card sets"
+    }
+    print(f"\nInspecting {profile['num_cards']} cards...\n")
+    for column, label in labels.items():
+        if column in counts:
+            values = sorted(counts[column].index)
+            print(f"{len(values)} {label}: ", values)
+    if "mechanics" in counts:
+        print(f"{len(counts['mechanics_combinations'])} "
+              "unique card mechanics combinations.")
+        print(f"{len(counts['mechanics'])} unique card mechanics: ",
+              list(counts["mechanics"].index))
+    print("\nInspecting numerical columns: ",
+          list(profile["numerical"].columns))
+    print(profile["numerical"])
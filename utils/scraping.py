@@ -3,19 +3,112 @@
 
 # IMPORTING PACKAGES
 # -------------------------------------- #
-from urllib.request import urlopen
 from bs4 import BeautifulSoup
 import re
-from typing import Dict, List
+from typing import Dict, Iterable, Iterator, List, Optional, Set
 import numpy as np
 from tqdm import tqdm
-from time import sleep
-import traceback 
+import traceback
+import asyncio
+from collections import deque
+from itertools import chain
+from concurrent.futures import ThreadPoolExecutor
+from utils import caching as cch
+from utils import extraction as ext
+from utils import journal as jrn
+from utils import metrics as mtr
+from utils import session as ses
+from utils import throttling as thr
+
+
+# Types of cards, as named in the summaries of the card pages
+CARD_TYPES = ["Hero Power", "Minion", "Spell", "Weapon", "Hero", "Location"]
+
+# Races only minions have, named instead of the type in the summaries
+MINION_RACES = {
+    "All",
+    "Beast",
+    "Demon",
+    "Draenei",
+    "Dragon",
+    "Elemental",
+    "Mech",
+    "Murloc",
+    "Naga",
+    "Pirate",
+    "Quilboar",
+    "Totem",
+    "Undead"
+}
+
+# Mechanics only minions have
+MINION_KEYWORDS = {
+    "Charge",
+    "Divine Shield",
+    "Reborn",
+    "Rush",
+    "Stealth",
+    "Taunt",
+    "Windfury"
+}
+
+# Fields every card keeps, whatever the projection
+KEY_FIELDS = ["title", "url"]
+
+# Page nodes each card field is parsed from; the stats depend on the
+# type, which may be inferred from the summary in the content
+FIELD_NODES = {
+    "title": ["title"],
+    "summary": ["content"],
+    "text": ["content"],
+    "type": ["details", "content"],
+    "cost": ["details"],
+    "rarity": ["details"],
+    "class": ["details"],
+    "set": ["details"],
+    "mechanics": ["details"],
+    "rating": ["rating"],
+    "num_comments": ["comments_title"],
+    "comments": ["comments"],
+    "attack": ["details", "content"],
+    "health": ["details", "content"],
+    "school": ["details", "content"],
+    "durability": ["details", "content"],
+    "url": []
+}
+
+
+def card_nodes(fields: List = None) -> Optional[Set[str]]:
+    """
+    Return the page nodes needed for some card fields.
+
+    None stands for every field, and so every node.
+    """
+    if fields is None:
+        return None
+    unknown = [f for f in fields if f not in FIELD_NODES]
+    if unknown:
+        raise ValueError(
+            f"Unknown card fields {unknown}, expected some of "
+            f"{list(FIELD_NODES)}")
+
+    return {n for f in list(fields) + KEY_FIELDS for n in FIELD_NODES[f]}
+
+
+@mtr.timed("fetch_html")
+def fetch_html(url: str) -> bytes:
+    """Return the raw HTML body of an URL, using the shared session."""
+    cache = cch.get_cache()
+    if cache is None:
+        return ses.get_session().get(url)
+    else:
+        return cache.fetch(url, ses.get_session())
 
 
+@mtr.timed("make_soup")
 def make_soup(url: str) -> str:
     """Return an HTML body from an URL."""
-    html = urlopen(url).read()
+    html = fetch_html(url)
 
     return BeautifulSoup(html, 'lxml')
 
@@ -47,29 +140,13 @@ def get_class(details: Dict) -> List:
 
 
 def get_common_card_info(details: Dict) -> List:
-    """Gets the common field which all cards have."""
-    # Common information about all cards
-    card_type = details["Type"]
-    mana_cost = details["Mana Cost"]
-    rarity = details["Rarity"]
-    card_class = get_class(details)
-    card_set = details["Set"]
-    if "Mechanics" in details.keys():
-        mechanics = details["Mechanics"].split(", ")
-    else:
-        mechanics = []
-
-    return [card_type, mana_cost, rarity, card_class, card_set, mechanics]
-
-
-def get_common_card_info_specify_type(details: Dict, card_type: str) -> List:
     """
-    Gets the common field which all cards have, but specify type.
+    Gets the common field which all cards have.
 
-    This is due to the fact that some cards are lacking this field.
+    A few cards lack their type, which is then None; see infer_card_type.
     """
     # Common information about all cards
-    card_type = card_type
+    card_type = details.get("Type")
     mana_cost = details["Mana Cost"]
     rarity = details["Rarity"]
     card_class = get_class(details)
@@ -82,11 +159,44 @@ def get_common_card_info_specify_type(details: Dict, card_type: str) -> List:
     return [card_type, mana_cost, rarity, card_class, card_set, mechanics]
 
 
-def get_card_rating(soup: BeautifulSoup) -> str:
-    """Get the rating of the card."""
+@mtr.timed("infer_card_type")
+def infer_card_type(details: Dict, summary: str, mechanics: List) -> str:
+    """
+    Infer the type of a card whose details table lacks it.
+
+    The clues are tried from the most to the least reliable: the stats
+    which only some types have, the words before 'card from' in the
+    summary, which name the type or the race of a minion, a spell
+    school, and keywords only minions have.
+    """
+    if "Durability" in details.keys():
+        return "Weapon"
+    if "Health" in details.keys():
+        return "Minion"
+
+    # E.g. 'Siegebreaker is a 7 Mana Cost Rare Warlock Demon card from'
+    match = re.search(r"(\w+(?: \w+)?) card from", summary)
+    if match is not None:
+        words = match.group(1)
+        for card_type in CARD_TYPES:
+            if words.endswith(card_type):
+                return card_type
+        if words.split(" ")[-1] in MINION_RACES:
+            return "Minion"
+
+    if "School" in details.keys():
+        return "Spell"
+    if set(mechanics) & MINION_KEYWORDS:
+        return "Minion"
+
+    raise ValueError("Could not infer the type of the card")
+
+
+@mtr.timed("parse_card_rating")
+def parse_card_rating(rating: str) -> float:
+    """Parse the rating out of the text of the rating block."""
     # Not all cards have a rating
-    if soup.find("div", {"class": "gdrts-rating-text"}) is not None:
-        rating = soup.find("div", {"class": "gdrts-rating-text"}).text
+    if rating is not None:
         # The actual rating is hiding in unformatted text
         rating = rating.split("/")
         rating = rating[0].split("Rating: ")
@@ -98,12 +208,12 @@ def get_card_rating(soup: BeautifulSoup) -> str:
     return rating
 
 
-def get_num_comments(soup: BeautifulSoup) -> float:
-    """Get the number of comments left on a card."""
+@mtr.timed("parse_num_comments")
+def parse_num_comments(num_comments: str) -> float:
+    """Parse the number of comments out of the comments title."""
     # Not all cards have comments
-    if soup.find("div", {"class": "comments-title-wrap"}) is not None:
+    if num_comments is not None:
         # Number is hiding in unformatted text
-        num_comments = soup.find("div", {"class": "comments-title-wrap"}).text
         num_comments = clean_text(num_comments)
         num_comments = num_comments.split(" ")
         num_comments = num_comments[0]
@@ -115,54 +225,24 @@ def get_num_comments(soup: BeautifulSoup) -> float:
     return num_comments
 
 
-def get_info_by_type(card_type: str, details: Dict) -> List:
-    """Gets fields relevant to the type of card or initializes missing."""
-    # Based on the type of card, we need to extract
-    # some different type of fields
-    if card_type == "Minion":
-        attack = details["Attack"]
-        health = details["Health"]
-        school = ""
-        durability = np.nan
-    elif card_type == "Spell":
-        attack = np.nan
-        health = np.nan
-        if "School" in details.keys():  # Some spells have no type
-            school = details["School"]
-        else:
-            school = "No spell type"
-        durability = np.nan
-    elif card_type == "Hero":
-        attack = np.nan
-        health = np.nan
-        school = ""
-        durability = np.nan
-    elif card_type == "Weapon":
-        attack = details["Attack"]
-        health = np.nan
-        school = ""
-        durability = details["Durability"]
-    else:  # Technically shouldn't get these
-        attack = np.nan
-        health = np.nan
-        school = ""
-        durability = np.nan
+def parse_card_activity(html: str) -> List:
+    """Parse only the rating and number of comments of a card page."""
+    nodes = ext.extract_card_nodes(html, {"rating", "comments_title"})
+    rating = parse_card_rating(nodes["rating"])
+    num_comments = parse_num_comments(nodes["comments_title"])
 
-    return [attack, health, school, durability]
+    return [float(rating), float(num_comments)]
 
 
-def get_info_by_type_manually(
-    card_type: str,
-    details: Dict,
-    attack: int,
-    health: int
-) -> List:
+@mtr.timed("get_info_by_type")
+def get_info_by_type(card_type: str, details: Dict) -> List:
     """Gets fields relevant to the type of card or initializes missing."""
     # Based on the type of card, we need to extract
     # some different type of fields
     if card_type == "Minion":
-        attack = attack
-        health = health
+        # Inferred minions may lack their stats
+        attack = details.get("Attack", np.nan)
+        health = details.get("Health", np.nan)
         school = ""
         durability = np.nan
     elif card_type == "Spell":
@@ -179,10 +259,10 @@ def get_info_by_type_manually(
         school = ""
         durability = np.nan
     elif card_type == "Weapon":
-        attack = attack
+        attack = details.get("Attack", np.nan)
         health = np.nan
         school = ""
-        durability = details["Durability"]
+        durability = details.get("Durability", np.nan)
     else:  # Technically shouldn't get these
         attack = np.nan
         health = np.nan
@@ -192,21 +272,16 @@ def get_info_by_type_manually(
     return [attack, health, school, durability]
 
 
-def get_comments(soup: BeautifulSoup) -> List:
-    """Get the comment section as a list of strings."""
+@mtr.timed("parse_comments")
+def parse_comments(comment_section: List) -> List:
+    """Parse the full texts of the comments into clean comments."""
     # Not all cards have a comment section
-    if soup.find_all("li", {"itemtype": "//schema.org/Comment"}) is not None:
+    if comment_section is not None:
         # Initialize empty list for comments
         comments = []
 
-        # Retrieve the comment section
-        comment_section = soup.find_all(
-            "li", {"itemtype": "//schema.org/Comment"})
-
-        # Parse each comment div tag
-        for row in comment_section:
-            # Extract the full text from the HTML of each comment
-            comment = row.text
+        # Parse each comment
+        for comment in comment_section:
             # The comment is split into sections
             # using newline, which is very unstructured
             comment = comment.split("\n\n")
@@ -217,21 +292,65 @@ def get_comments(soup: BeautifulSoup) -> List:
             # Append the comment to the comment list
             comments.append(comment)
 
-        # Remove duplicate comments
-        if len(comments) > 0:
-            comments = list(set(comments))
-        else:
-            comments = []
+        # Remove duplicate comments, keeping the order of the page
+        comments = list(dict.fromkeys(comments))
     else:
         comments = []
 
     return comments
 
 
-def scrape_card(url: str) -> Dict:
+@mtr.timed("parse_card_page")
+def parse_card_page(html: str, nodes: Set[str] = None) -> List:
+    """
+    Parse the fields shared by every card page.
+
+    Returns the title, summary, text, details table, rating,
+    number of comments and comments of the card. Only the given nodes
+    are extracted, if any; the fields of the others come back empty.
+    """
+    nodes = ext.extract_card_nodes(html, nodes)
+
+    # Fetch card title
+    title = nodes["title"]
+    if title is None:
+        raise ValueError("No card title found on the page")
+
+    # Retrieve general card info
+    general = (nodes["content"] or "").split("Card Text")
+    summary = clean_text(general[0])
+    if len(general) > 1:  # Sometimes missing
+        text = clean_text(general[1])
+    else:
+        text = ""
+
+    # We will store fields in a dictionary
+    details = {}
+
+    # Parse the cells of the details table
+    for cell in nodes["details"] or []:
+        detail = cell.split(": ")
+        details[detail[0]] = detail[1]
+
+    # Get card rating
+    rating = parse_card_rating(nodes["rating"])
+
+    # Get number of comments
+    num_comments = parse_num_comments(nodes["comments_title"])
+
+    # Get comment section
+    comments = parse_comments(nodes["comments"])
+
+    return [title, summary, text, details, rating, num_comments, comments]
+
+
+def scrape_card(url: str, fields: List = None) -> Dict:
     """
     Scrape a Hearthstone card of card information.
 
+    Only the given fields are parsed, if any, plus the title and URL;
+    see parse_card.
+
     # Example: Spell
     url = "https://www.hearthstonetopdecks.com/cards/bloodlust/"
     scr.scrape_card(url)
@@ -248,67 +367,39 @@ def scrape_card(url: str) -> Dict:
     url = "https://www.hearthstonetopdecks.com/cards/runed-mithril-rod/"
     scr.scrape_card(url)
     """
-    # Fetch HTML
-    soup = make_soup(url)
-
-    # Fetch card title
-    title = soup.find("h1", {"class": "entry-title"}).text
-
-    # Retrieve general card info
-    general = soup.find("div", {"class": "card-content"}).text
-    general = general.split("Card Text")
-    summary = clean_text(general[0])
-    if len(general) > 1:  # Sometimes missing
-        text = clean_text(general[1])
-    else:
-        text = ""
-
-    # Retrieve card details
-    specific = soup.find_all("div", {"class": "col-md-14"})
-
-    # Get the text from the table
-    for row in specific:
-        cells = [i.text for i in row.find_all('li')]
+    return parse_card(fetch_html(url), url=url, fields=fields)
 
-    # We will store fields in a dictionary
-    details = {}
 
-    # Parse the cells
-    for cell in cells:
-        detail = cell.split(": ")
-        details[detail[0]] = detail[1]
+@mtr.timed("parse_card_details")
+def parse_card_details(
+    details: Dict,
+    summary: str,
+    infer_type: bool = True
+) -> Dict:
+    """
+    Parse the fields of a card found in its details table.
 
+    The type of the few cards without one is inferred, unless told not
+    to, when the summary it is inferred from was not extracted.
+    """
     # Get the common fields
     card_type, mana_cost, rarity, card_class, card_set, \
         mechanics = get_common_card_info(details)
 
-    # Get card rating
-    rating = get_card_rating(soup)
-
-    # Get number of comments
-    num_comments = get_num_comments(soup)
-
-    # Get comment section
-    comments = get_comments(soup)
+    # Classify the few cards without a type from the page in hand
+    if card_type is None and infer_type:
+        card_type = infer_card_type(details, summary, mechanics)
 
     # Get different fields according to the type of the card
     attack, health, school, durability = get_info_by_type(card_type, details)
 
-    # The output will be given in this format
-    card = {
-        # Common features
-        "title": title,
-        "summary": summary,
-        "text": text,
+    return {
         "type": card_type,
         "cost": float(mana_cost),
         "rarity": rarity,
         "class": card_class,
         "set": card_set,
         "mechanics": mechanics,
-        "rating": float(rating),
-        "num_comments": float(num_comments),
-        "comments": comments,
         # Minion specific features
         "attack": float(attack),
         "health": float(health),
@@ -318,113 +409,65 @@ def scrape_card(url: str) -> Dict:
         "durability": float(durability)
     }
 
-    return card
-
 
-def scrape_card_manually(
-    url: str,
-    card_type: str,
-    attack: int,
-    health: int
-) -> Dict:
+@mtr.timed("parse_card")
+def parse_card(html: str, url: str = None, fields: List = None) -> Dict:
     """
-    Scrape a Hearthstone card specifying its type manually.
-
-    A few cards have no specified type and attack/health and
-    they are of multiple actual types. Hence, if we want to
-    include everything we need to do so manually.
-
-    # Examples:
-    "https://www.hearthstonetopdecks.com/cards/siegebreaker/"
-    "https://www.hearthstonetopdecks.com/cards/subject-9/"
-    "https://www.hearthstonetopdecks.com/cards/breath-of-the-infinite/"
+    Parse the HTML of a card page into card information.
 
+    Only the given fields are kept, if any, plus the title and URL.
+    The page nodes of the other fields are never extracted, and when
+    neither the comments nor their number are asked for, the comment
+    section is cut off the page before it is parsed at all.
     """
-    # Fetch HTML
-    soup = make_soup(url)
-
-    # Fetch card title
-    title = soup.find("h1", {"class": "entry-title"}).text
-
-    # Retrieve general card info
-    general = soup.find("div", {"class": "card-content"}).text
-    general = general.split("Card Text")
-    summary = clean_text(general[0])
-    if len(general) > 1:  # Sometimes missing
-        text = clean_text(general[1])
-    else:
-        text = ""
-
-    # Retrieve card details
-    specific = soup.find_all("div", {"class": "col-md-14"})
-
-    # Get the text from the table
-    for row in specific:
-        cells = [i.text for i in row.find_all('li')]
-
-    # We will store fields in a dictionary
-    details = {}
-
-    # Parse the cells
-    for cell in cells:
-        detail = cell.split(": ")
-        details[detail[0]] = detail[1]
-
-    # Get the common fields
-    card_type, mana_cost, rarity, card_class, card_set, \
-        mechanics = get_common_card_info_specify_type(details, card_type)
-
-    # Get card rating
-    rating = get_card_rating(soup)
-
-    # Get number of comments
-    num_comments = get_num_comments(soup)
-
-    # Get comment section
-    comments = get_comments(soup)
-
-    # Get different fields according to the type of the card
-    attack, health, school, durability = get_info_by_type_manually(
-        card_type,
-        details,
-        attack,
-        health)
+    # Collect every node we need in a single pass
+    nodes = card_nodes(fields)
+    title, summary, text, details, rating, num_comments, \
+        comments = parse_card_page(html, nodes)
 
     # The output will be given in this format
     card = {
         # Common features
         "title": title,
         "summary": summary,
-        "text": text,
-        "type": card_type,
-        "cost": float(mana_cost),
-        "rarity": rarity,
-        "class": card_class,
-        "set": card_set,
-        "mechanics": mechanics,
+        "text": text
+    }
+    if nodes is None or "details" in nodes:
+        # Projections without the type or the stats leave the content
+        # out, and with it the inference of missing types
+        card.update(parse_card_details(
+            details, summary, nodes is None or "content" in nodes))
+    card.update({
         "rating": float(rating),
         "num_comments": float(num_comments),
         "comments": comments,
-        # Minion specific features
-        "attack": float(attack),
-        "health": float(health),
-        # Spell specific features
-        "school": school,
-        # Weapon specific features
-        "durability": float(durability)
-    }
+        # Stable key of the card
+        "url": url
+    })
+
+    if fields is not None:
+        card = {
+            k: v for k, v in card.items() if k in fields or k in KEY_FIELDS}
 
     return card
 
 
+@mtr.timed("get_num_query_pages")
 def get_num_query_pages(url: str) -> int:
     """Get the number of result pages from a query."""
     # Get html
     soup = make_soup(url)
 
-    # Fetch html tag
-    num_pages = soup.find("span", {"class": "page-link"}).text
-    num_pages = num_pages.split(" ")
+    return parse_num_query_pages(soup)
+
+
+def parse_num_query_pages(soup: BeautifulSoup) -> int:
+    """Parse the number of result pages from the first page of a query."""
+    # Fetch html tag, which is missing if there is a single page
+    page_link = soup.find("span", {"class": "page-link"})
+    if page_link is None:
+        return 1
+    num_pages = page_link.text.split(" ")
     num_pages = int(num_pages[2])
 
     return num_pages
@@ -433,7 +476,7 @@ def get_num_query_pages(url: str) -> int:
 def get_url_at_page_number(url: str, counter: int) -> str:
     """Retrieves the link to the next result page of a query."""
     # All result pages will start out like this
-    root_url = "https://www.hearthstonetopdecks.com/cards/"
+    root_url = url.split("/cards/")[0] + "/cards/"
 
     # Fhe first page of the query is followed by a string
     # describing your query options, like this
@@ -447,6 +490,21 @@ def get_url_at_page_number(url: str, counter: int) -> str:
     return root_url + next_url + query_url
 
 
+@mtr.timed("parse_page_card_urls")
+def parse_page_card_urls(soup: BeautifulSoup) -> List:
+    """Fetch all card URLs from the soup of a single result page."""
+    # Initialize output
+    card_url_list = []
+
+    # Parse the HTML a tag and fetch the hrefs
+    page_links = soup.find_all("a", {"class": "card-link"})
+    for link in page_links:
+        card_url_list.append(str(link["href"]))
+
+    return card_url_list
+
+
+@mtr.timed("get_page_card_urls")
 def get_page_card_urls(url: str) -> List:
     """
     Parse the website and fetch all card URLs
@@ -456,21 +514,62 @@ def get_page_card_urls(url: str) -> List:
     as a table. This is in order to show more cards
     on a single page, and also, for easier URL fetching.
     """
-    # Initialize output
-    card_url_list = []
-
     # Get html
     soup = make_soup(url)
 
-    # Parse the HTML a tag and fetch the hrefs
-    page_links = soup.find_all("a", {"class": "card-link"})
-    for link in page_links:
-        card_url_list.append(str(link["href"]))
+    return parse_page_card_urls(soup)
 
-    return card_url_list
 
+def iter_query_links(
+    url: str,
+    sleep_time: int,
+    max_workers: int = 1,
+    requests_per_second: float = None
+) -> Iterator[str]:
+    """
+    Parse all pages in a filtered query on HSTD,
+    yielding links to cards as soon as they are found.
 
-def parse_query_and_fetch_links(url: str, sleep_time: int) -> List:
+    All page URLs are known once the first page is parsed, so the
+    remaining pages are fetched concurrently by max_workers threads,
+    under the rate limit shared by every fetch, which requests_per_second
+    (or the legacy sleep_time) seeds if given. Links are yielded in page
+    order without duplicates, so a card scraper can consume them while
+    discovery goes on.
+
+    ATTENTION: Must select query to be displayed
+    as a table. This is in order to show more cards
+    on a single page, and also, for easier URL fetching.
+    """
+    thr.seed_limiter(requests_per_second, sleep_time)
+    seen = set()
+
+    def fetch_page(counter):
+        return get_page_card_urls(get_url_at_page_number(url, counter))
+
+    # The first page also tells the number of result pages
+    soup = make_soup(url)
+    num_pages = parse_num_query_pages(soup)
+    page_url_lists = [parse_page_card_urls(soup)]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Map keeps the pages in order and only runs max_workers at once
+        page_url_lists = chain(
+            page_url_lists, executor.map(fetch_page, range(2, num_pages+1)))
+        for current_url_list in tqdm(page_url_lists, total=num_pages):
+            # Just in case we have duplicates
+            for element in current_url_list:
+                if element not in seen:
+                    seen.add(element)
+                    yield element
+
+
+def parse_query_and_fetch_links(
+    url: str,
+    sleep_time: int,
+    max_workers: int = 1,
+    requests_per_second: float = None
+) -> List:
     """
     Parse all pages in a filtered query on
     HSTD and retrieves links to cards.
@@ -479,50 +578,164 @@ def parse_query_and_fetch_links(url: str, sleep_time: int) -> List:
     as a table. This is in order to show more cards
     on a single page, and also, for easier URL fetching.
     """
-    # Initialize output
-    complete_url_list = []
+    return list(iter_query_links(
+        url, sleep_time, max_workers, requests_per_second))
 
-    # Find out number of result pages to parse
-    num_pages = get_num_query_pages(url)
 
-    # Parse the pages from beginning to end
-    for i in tqdm(range(1, num_pages+1)):
-        current_page = get_url_at_page_number(url, i)
-
-        current_url_list = get_page_card_urls(current_page)
-
-        for element in current_url_list:
-            complete_url_list.append(element)
+def scrape_card_safely(
+    url: str,
+    journal: jrn.CardJournal = None,
+    fields: List = None
+) -> List:
+    """Scrape a card, reporting failures instead of raising them."""
+    try:
+        card = scrape_card(url, fields)
+    except Exception:
+        print(f"\nScript failed at URL {url}")
+        print(traceback.format_exc())
+        card = None
+
+    # Journal the card as soon as it is done
+    if journal is not None:
+        journal.record(url, card)
+
+    return [url, card]
+
+
+def scrape_cards_serially(
+    url_list: Iterable,
+    journal: jrn.CardJournal = None,
+    fields: List = None
+) -> Iterator[List]:
+    """Scrape cards one after another."""
+    for url in url_list:
+        yield scrape_card_safely(url, journal, fields)
+
+
+def scrape_cards_threaded(
+    url_list: Iterable,
+    max_workers: int,
+    journal: jrn.CardJournal = None,
+    fields: List = None
+) -> Iterator[List]:
+    """Scrape cards on a pool of worker threads."""
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Keep a bounded window of futures, yielded in URL order
+        pending = deque()
+        for url in url_list:
+            pending.append(executor.submit(
+                scrape_card_safely, url, journal, fields))
+            if len(pending) >= 2 * max_workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def scrape_cards_async(
+    url_list: Iterable,
+    max_workers: int,
+    journal: jrn.CardJournal = None,
+    fields: List = None
+) -> Iterator[List]:
+    """Scrape cards from an event loop, bounding the requests in flight."""
+    loop = asyncio.new_event_loop()
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    semaphore = asyncio.Semaphore(max_workers)
+
+    async def scrape_one(url):
+        async with semaphore:
+            # Fetching is blocking, rate limit included, so it runs on
+            # the executor
+            return await loop.run_in_executor(
+                executor, scrape_card_safely, url, journal, fields)
+
+    try:
+        # Running the oldest task lets the whole window progress
+        pending = deque()
+        for url in url_list:
+            pending.append(loop.create_task(scrape_one(url)))
+            if len(pending) >= 2 * max_workers:
+                yield loop.run_until_complete(pending.popleft())
+        while pending:
+            yield loop.run_until_complete(pending.popleft())
+    finally:
+        executor.shutdown()
+        loop.close()
+
+
+def iter_scrape_cards(
+    url_list: Iterable,
+    sleep_time: int,
+    mode: str = "serial",
+    max_workers: int = 8,
+    requests_per_second: float = None,
+    journal: jrn.CardJournal = None,
+    fields: List = None
+) -> Iterator[List]:
+    """
+    Scrape cards lazily, yielding [url, card] pairs in URL order.
 
-        # Optional, if we want to be ethical
-        # and not overload the targeted server
-        sleep(sleep_time)
+    The card is None when scraping failed. URLs are consumed as they
+    are needed and only a bounded window of cards is held at once, so
+    memory does not grow with the number of cards. See
+    scrape_multiple_cards for the meaning of the options.
+    """
+    thr.seed_limiter(requests_per_second, sleep_time)
 
-    # Just in case we have duplicates
-    complete_url_list = list(set(complete_url_list))
+    # Parse list of links
+    if mode == "serial":
+        results = scrape_cards_serially(url_list, journal, fields)
+    elif mode == "thread":
+        results = scrape_cards_threaded(
+            url_list, max_workers, journal, fields)
+    elif mode == "asyncio":
+        results = scrape_cards_async(url_list, max_workers, journal, fields)
+    else:
+        raise ValueError(f"Unknown concurrency mode: {mode}")
 
-    return complete_url_list
+    total = len(url_list) if hasattr(url_list, "__len__") else None
+    yield from tqdm(results, total=total)
 
 
-def scrape_multiple_cards(url_list: List, sleep_time: int) -> List:
-    """Scrape a list of URLs corresponding to cards."""
+def scrape_multiple_cards(
+    url_list: List,
+    sleep_time: int,
+    mode: str = "serial",
+    max_workers: int = 8,
+    requests_per_second: float = None,
+    journal: jrn.CardJournal = None,
+    fields: List = None
+) -> List:
+    """
+    Scrape a list of URLs corresponding to cards.
+
+    The mode is one of "serial", "thread" or "asyncio". At most
+    max_workers requests are in flight at once, and all of them
+    share the adaptive rate limit of every fetch, which starts from
+    requests_per_second, or the legacy sleep_time between cards, if
+    given.
+    Each finished card is also written to the journal, if given.
+    Only the given fields of the cards are parsed, if any, like the
+    stats alone for a refresh; see parse_card.
+    """
     # Initialize output
     card_list = []
 
-    # Initialize list of failed scrapes 
-    # for later debugging 
+    # Initialize list of failed scrapes
+    # for later debugging
     failed_card_list = []
 
-    # Parse list of links
-    for url in tqdm(url_list):
-        try:
-            card = scrape_card(url)
+    for url, card in iter_scrape_cards(
+            url_list,
+            sleep_time,
+            mode,
+            max_workers,
+            requests_per_second,
+            journal,
+            fields):
+        if card is not None:
             card_list.append(card)
-            sleep(sleep_time)
-        except Exception:
-            print(f"\nScript failed at URL {url}")
-            print(traceback.format_exc())
+        else:
             failed_card_list.append(url)
-            pass  # Not actually bad practice if we know the errors. ;)
 
     return card_list, failed_card_list
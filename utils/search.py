@@ -0,0 +1,389 @@
+"""Methods related to the full-text search index of the cards."""
+
+
+# IMPORTING PACKAGES
+# -------------------------------------- #
+import hashlib
+import json
+import math
+import os
+import re
+import sqlite3
+from collections import Counter
+from typing import Dict, Iterable, List
+import pandas as pd
+from utils import comments as cmt
+from utils import merging as mrg
+
+
+# Text fields of a card which are indexed, and the weight of a match
+TEXT_FIELDS = {
+    "title": 3.0,
+    "text": 2.0,
+    "summary": 1.0,
+    "comments": 0.5
+}
+
+# Card fields a search can be narrowed down by, lists or not
+FACET_FIELDS = ["mechanics", "class", "set", "type"]
+
+# Words too common to be worth a posting list
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has",
+    "in", "is", "it", "its", "of", "on", "or", "that", "the", "this",
+    "to", "was", "with"
+}
+
+# Parameters of the BM25 ranking
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+# Distinct (word, card) pairs of comments gathered before being written
+COMMENT_BATCH_SIZE = 50000
+
+SEARCH_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    doc_id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    title TEXT,
+    digest TEXT
+);
+CREATE TABLE IF NOT EXISTS field_lengths (
+    doc_id INTEGER NOT NULL,
+    field TEXT NOT NULL,
+    length INTEGER NOT NULL,
+    PRIMARY KEY (doc_id, field)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    field TEXT NOT NULL,
+    doc_id INTEGER NOT NULL,
+    tf INTEGER NOT NULL,
+    PRIMARY KEY (term, field, doc_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc_id, field);
+CREATE TABLE IF NOT EXISTS facets (
+    facet TEXT NOT NULL,
+    value TEXT NOT NULL,
+    doc_id INTEGER NOT NULL,
+    PRIMARY KEY (facet, value, doc_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS facets_doc ON facets (doc_id);
+CREATE TABLE IF NOT EXISTS field_stats (
+    field TEXT PRIMARY KEY,
+    total_length INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS indexed_comments (
+    url TEXT NOT NULL,
+    comment_hash TEXT NOT NULL,
+    PRIMARY KEY (url, comment_hash)
+) WITHOUT ROWID;
+"""
+
+
+def tokenize(text: str) -> List:
+    """Split a text into lowercase words, leaving out the stopwords."""
+    if not isinstance(text, str):
+        return []
+    return [
+        t for t in TOKEN_PATTERN.findall(text.lower())
+        if t not in STOPWORDS]
+
+
+def facet_values(value) -> List:
+    """Return the values of a facet of a card, as a list."""
+    value = mrg.normalize_value(value)
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return [str(v) for v in value]
+
+    return [str(value)]
+
+
+def card_digest(card: Dict) -> str:
+    """Hash the indexed fields of a card, but its comments."""
+    content = {
+        f: mrg.normalize_value(card.get(f))
+        for f in list(TEXT_FIELDS) + FACET_FIELDS if f != "comments"}
+    content = json.dumps(content, sort_keys=True, default=str)
+
+    return hashlib.md5(content.encode('utf-8')).hexdigest()
+
+
+class SearchIndex:
+    """
+    Inverted index of the cards and their comments, kept in SQLite.
+
+    Every word of a text field has a posting list of the cards it
+    appears in, with its frequency, stored in the order of the primary
+    key so a lookup is a range scan. Cards are ranked by BM25 summed
+    over the fields, weighted by TEXT_FIELDS, and can be narrowed down
+    by their facets. The index is updated in place: a card is only
+    reindexed when its fields changed, and comments, identified by
+    their hash, are only ever added.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.connection = sqlite3.connect(path, timeout=60)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SEARCH_SCHEMA)
+
+    # Indexing
+    # -------------------------------------- #
+    def _doc_id(self, url: str) -> int:
+        """Return the id of the document of a card, creating it."""
+        self.connection.execute(
+            "INSERT OR IGNORE INTO docs (url) VALUES (?)", (url,))
+
+        return self.connection.execute(
+            "SELECT doc_id FROM docs WHERE url = ?", (url,)).fetchone()[0]
+
+    def _add_postings(self, field: str, postings: Counter, lengths: Counter):
+        """
+        Add to the postings and lengths of a field of some cards.
+
+        Postings count the words per (word, doc_id) and lengths the
+        words per doc_id, so many cards are written at once.
+        """
+        self.connection.executemany(
+            "INSERT INTO postings (term, field, doc_id, tf) "
+            "VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (term, field, doc_id) DO UPDATE SET "
+            "tf = tf + excluded.tf",
+            # Sorted rows go into the primary key in order, which is faster
+            sorted((t, field, d, n) for (t, d), n in postings.items()))
+        self.connection.executemany(
+            "INSERT INTO field_lengths (doc_id, field, length) "
+            "VALUES (?, ?, ?) "
+            "ON CONFLICT (doc_id, field) DO UPDATE SET "
+            "length = length + excluded.length",
+            [(d, field, n) for d, n in lengths.items()])
+        self._add_length(field, sum(lengths.values()))
+
+    def _add_length(self, field: str, length: int):
+        """Keep the total length of a field, for its average."""
+        self.connection.execute(
+            "INSERT INTO field_stats (field, total_length) VALUES (?, ?) "
+            "ON CONFLICT (field) DO UPDATE SET "
+            "total_length = total_length + excluded.total_length",
+            (field, length))
+
+    def _add_terms(self, doc_id: int, field: str, tokens: List):
+        """Add words to the postings and length of a field of a card."""
+        if tokens:
+            self._add_postings(
+                field,
+                Counter((t, doc_id) for t in tokens),
+                Counter({doc_id: len(tokens)}))
+
+    def add_cards(self, cards: Iterable[Dict]) -> Dict:
+        """
+        Index new or changed cards, returning how many of each.
+
+        Cards come as records of a card dataset. Their comments, if they
+        still have them, are added too.
+        """
+        counts = {"added": 0, "updated": 0, "unchanged": 0}
+        comments = []
+        with self.connection:
+            for card in cards:
+                url = mrg.normalize_value(card.get("url"))
+                if url is None:
+                    continue
+                # Comments are indexed in batches of cards
+                comments.extend(cmt.iter_comment_records(card))
+                if len(comments) >= COMMENT_BATCH_SIZE // 10:
+                    self._add_comments(comments)
+                    comments = []
+                digest = card_digest(card)
+                row = self.connection.execute(
+                    "SELECT doc_id, digest FROM docs WHERE url = ?",
+                    (url,)).fetchone()
+                if row is not None and row[1] == digest:
+                    counts["unchanged"] += 1
+                    continue
+                counts["updated" if row and row[1] else "added"] += 1
+                doc_id = self._doc_id(url)
+                # The fields of the card are replaced, its comments kept
+                for field, length in self.connection.execute(
+                        "SELECT field, length FROM field_lengths "
+                        "WHERE doc_id = ? AND field != 'comments'",
+                        (doc_id,)).fetchall():
+                    self._add_length(field, -length)
+                self.connection.execute(
+                    "DELETE FROM postings "
+                    "WHERE doc_id = ? AND field != 'comments'", (doc_id,))
+                self.connection.execute(
+                    "DELETE FROM field_lengths "
+                    "WHERE doc_id = ? AND field != 'comments'", (doc_id,))
+                self.connection.execute(
+                    "DELETE FROM facets WHERE doc_id = ?", (doc_id,))
+                for field in TEXT_FIELDS:
+                    if field != "comments":
+                        self._add_terms(
+                            doc_id, field, tokenize(card.get(field)))
+                self.connection.executemany(
+                    "INSERT OR IGNORE INTO facets (facet, value, doc_id) "
+                    "VALUES (?, ?, ?)",
+                    [(f, v, doc_id) for f in FACET_FIELDS
+                     for v in facet_values(card.get(f))])
+                self.connection.execute(
+                    "UPDATE docs SET title = ?, digest = ? WHERE doc_id = ?",
+                    (mrg.normalize_value(card.get("title")), digest, doc_id))
+            self._add_comments(comments)
+
+        return counts
+
+    def add_comments(self, comments: Iterable[Dict]) -> int:
+        """
+        Index the comments not indexed yet, returning how many.
+
+        Comments come as records of a comment store, with the URL of
+        their card, their hash and their text.
+        """
+        with self.connection:
+            return self._add_comments(comments)
+
+    def _add_comments(self, comments: Iterable[Dict]) -> int:
+        """
+        Index comments, within the transaction of the caller.
+
+        Their words are gathered and written in batches of cards.
+        """
+        num_added = 0
+        postings = Counter()
+        lengths = Counter()
+        doc_ids = {}
+        for comment in comments:
+            url = comment["url"]
+            added = self.connection.execute(
+                "INSERT OR IGNORE INTO indexed_comments "
+                "(url, comment_hash) VALUES (?, ?)",
+                (url, comment["comment_hash"])).rowcount
+            if not added:
+                continue
+            num_added += 1
+            if url not in doc_ids:
+                doc_ids[url] = self._doc_id(url)
+            tokens = tokenize(comment["text"])
+            postings.update((t, doc_ids[url]) for t in tokens)
+            lengths[doc_ids[url]] += len(tokens)
+            if len(postings) >= COMMENT_BATCH_SIZE:
+                self._add_postings("comments", postings, lengths)
+                postings, lengths = Counter(), Counter()
+        if postings:
+            self._add_postings("comments", postings, lengths)
+
+        return num_added
+
+    # Searching
+    # -------------------------------------- #
+    def num_docs(self) -> int:
+        """Count the indexed cards."""
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def filter_docs(self, facets: Dict) -> set:
+        """Return the ids of the cards having every given facet value."""
+        doc_ids = None
+        for facet, value in facets.items():
+            rows = self.connection.execute(
+                "SELECT doc_id FROM facets WHERE facet = ? AND value = ?",
+                (facet, str(value)))
+            ids = {row[0] for row in rows}
+            doc_ids = ids if doc_ids is None else doc_ids & ids
+
+        return doc_ids
+
+    def search(
+        self,
+        query: str,
+        fields: List = None,
+        facets: Dict = None,
+        limit: int = 10
+    ) -> pd.DataFrame:
+        """
+        Rank the cards matching any word of a query.
+
+        Only the given text fields are searched, if any, e.g. only the
+        comments, and only the cards with the given facet values, e.g.
+        {"class": "Mage", "mechanics": "Freeze"}. Returns the URL, title
+        and score of the best cards, best first.
+        """
+        fields = list(fields or TEXT_FIELDS)
+        allowed = self.filter_docs(facets) if facets else None
+        num_docs = max(self.num_docs(), 1)
+        # Cards without a field count as empty in its average length
+        total_lengths = dict(self.connection.execute(
+            "SELECT field, total_length FROM field_stats"))
+        scores = Counter()
+        for field in fields:
+            average_length = total_lengths.get(field, 0) / num_docs
+            if not average_length:
+                continue
+            for term in set(tokenize(query)):
+                postings = self.connection.execute(
+                    "SELECT p.doc_id, p.tf, l.length FROM postings AS p "
+                    "JOIN field_lengths AS l "
+                    "ON l.doc_id = p.doc_id AND l.field = p.field "
+                    "WHERE p.term = ? AND p.field = ?",
+                    (term, field)).fetchall()
+                if not postings:
+                    continue
+                num_matches = len(postings)
+                idf = math.log(
+                    1 + (num_docs - num_matches + 0.5) / (num_matches + 0.5))
+                weight = TEXT_FIELDS.get(field, 1.0) * idf
+                for doc_id, tf, length in postings:
+                    if allowed is not None and doc_id not in allowed:
+                        continue
+                    norm = 1 - BM25_B + BM25_B * length / average_length
+                    scores[doc_id] += \
+                        weight * tf * (BM25_K1 + 1) / (tf + BM25_K1 * norm)
+
+        best = scores.most_common(limit)
+        titles = self._titles([doc_id for doc_id, _ in best])
+
+        return pd.DataFrame(
+            [titles[doc_id] + [score] for doc_id, score in best],
+            columns=["url", "title", "score"])
+
+    def _titles(self, doc_ids: List) -> Dict:
+        """Return the URL and title of some cards by their id."""
+        if not doc_ids:
+            return {}
+        rows = self.connection.execute(
+            "SELECT doc_id, url, title FROM docs "
+            f"WHERE doc_id IN ({', '.join('?' * len(doc_ids))})",
+            doc_ids)
+
+        return {row[0]: [row[1], row[2]] for row in rows}
+
+    def facet_counts(self, facet: str, urls: List = None) -> pd.Series:
+        """Count the cards per value of a facet, or only some cards."""
+        if urls is None:
+            rows = self.connection.execute(
+                "SELECT value, COUNT(*) FROM facets WHERE facet = ? "
+                "GROUP BY value ORDER BY COUNT(*) DESC",
+                (facet,)).fetchall()
+        else:
+            rows = self.connection.execute(
+                "SELECT value, COUNT(*) FROM facets "
+                "JOIN docs USING (doc_id) WHERE facet = ? AND url IN "
+                f"({', '.join('?' * len(urls))}) "
+                "GROUP BY value ORDER BY COUNT(*) DESC",
+                [facet] + list(urls)).fetchall()
+
+        return pd.Series(dict(rows), name=facet, dtype="int64")
+
+    def close(self):
+        """Close the index."""
+        self.connection.close()
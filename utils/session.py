@@ -0,0 +1,309 @@
+"""Methods related to the shared HTTP session."""
+
+
+# IMPORTING PACKAGES
+# -------------------------------------- #
+import gzip
+import http.client
+import ssl
+import threading
+import zlib
+from time import sleep
+from typing import Dict, List
+from urllib.parse import urljoin, urlsplit
+from utils import metrics as mtr
+from utils import throttling as thr
+
+try:  # Brotli is optional, only advertised when installed
+    import brotli
+except ImportError:
+    brotli = None
+
+
+DEFAULT_USER_AGENT = (
+    "Mozilla/5.0 (X11; Linux x86_64) hearthstone-topdecks-scraper")
+
+REDIRECT_CODES = {301, 302, 303, 307, 308}
+
+if brotli is not None:
+    ACCEPT_ENCODING = "gzip, deflate, br"
+else:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+# Errors worth another attempt, like timeouts and dropped connections
+RETRY_ERRORS = (OSError, http.client.HTTPException)
+
+# Errors meaning a kept-alive connection was closed by the server
+STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    BrokenPipeError,
+    ConnectionResetError
+)
+
+
+class HttpError(Exception):
+    """Raised when the server answers with an error status."""
+
+    def __init__(self, url: str, status: int, headers: Dict):
+        super().__init__(f"HTTP Error {status} at URL {url}")
+        self.url = url
+        self.status = status
+        self.headers = headers
+
+
+class HttpResponse:
+    """A fully read and decompressed HTTP response."""
+
+    def __init__(self, url: str, status: int, headers: Dict, body: bytes):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+
+def decompress(body: bytes, encoding: str) -> bytes:
+    """Undo the content encoding of a response body."""
+    if encoding == "gzip":
+        return gzip.decompress(body)
+    elif encoding == "deflate":
+        return zlib.decompress(body)
+    elif encoding == "br" and brotli is not None:
+        return brotli.decompress(body)
+    else:
+        return body
+
+
+class HttpSession:
+    """
+    Keep-alive HTTP client with a pool of connections per host.
+
+    Connections are returned to the pool once their response has been
+    read, so consecutive requests to the same host skip the TCP and TLS
+    handshakes. Responses are requested compressed and transparently
+    decompressed. The session is safe to share between threads.
+    """
+
+    def __init__(
+        self,
+        timeout: float = 30,
+        user_agent: str = None,
+        max_connections_per_host: int = 8,
+        max_redirects: int = 5
+    ):
+        self.timeout = timeout
+        self.user_agent = user_agent or DEFAULT_USER_AGENT
+        self.max_connections_per_host = max_connections_per_host
+        self.max_redirects = max_redirects
+        self._lock = threading.Lock()
+        self._idle = {}
+        self._slots = {}
+        self._ssl_context = ssl.create_default_context()
+        # Counters to verify the savings
+        self.connections_opened = 0
+        self.connections_reused = 0
+        self.requests_sent = 0
+        self.bytes_received = 0
+        self.retries = 0
+
+    def _host_state(self, key: tuple) -> List:
+        """Return the idle connections and the slot semaphore of a host."""
+        with self._lock:
+            if key not in self._idle:
+                self._idle[key] = []
+                self._slots[key] = threading.BoundedSemaphore(
+                    self.max_connections_per_host)
+            return [self._idle[key], self._slots[key]]
+
+    def _connect(self, key: tuple) -> List:
+        """Take an idle connection to the host or open a new one."""
+        idle, _ = self._host_state(key)
+        with self._lock:
+            if idle:
+                self.connections_reused += 1
+                return [idle.pop(), True]
+            self.connections_opened += 1
+
+        return [self._open(key), False]
+
+    def _open(self, key: tuple):
+        """Open a new connection to the host."""
+        scheme, host, port = key
+        if scheme == "https":
+            return http.client.HTTPSConnection(
+                host, port, timeout=self.timeout, context=self._ssl_context)
+        else:
+            return http.client.HTTPConnection(
+                host, port, timeout=self.timeout)
+
+    def _release(self, key: tuple, connection, reusable: bool):
+        """Give a connection back to the pool, or close it."""
+        idle, _ = self._host_state(key)
+        if reusable:
+            with self._lock:
+                idle.append(connection)
+        else:
+            connection.close()
+
+    def _send(self, url: str, headers: Dict) -> HttpResponse:
+        """Send a single GET request without following redirects."""
+        parts = urlsplit(url)
+        scheme = parts.scheme or "http"
+        default_port = 443 if scheme == "https" else 80
+        key = (scheme, parts.hostname, parts.port or default_port)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+
+        request_headers = {
+            "User-Agent": self.user_agent,
+            "Accept-Encoding": ACCEPT_ENCODING,
+            "Connection": "keep-alive"
+        }
+        request_headers.update(headers or {})
+
+        _, slots = self._host_state(key)
+        with slots:
+            connection, reused = self._connect(key)
+            try:
+                connection.request("GET", path, headers=request_headers)
+                response = connection.getresponse()
+                body = response.read()
+            except STALE_CONNECTION_ERRORS:
+                connection.close()
+                if not reused:
+                    raise
+                # The server dropped an idle connection, so start afresh
+                with self._lock:
+                    self.connections_reused -= 1
+                    self.connections_opened += 1
+                connection = self._open(key)
+                connection.request("GET", path, headers=request_headers)
+                response = connection.getresponse()
+                body = response.read()
+            except Exception:
+                connection.close()
+                raise
+            self._release(key, connection, not response.will_close)
+
+        with self._lock:
+            self.requests_sent += 1
+            self.bytes_received += len(body)
+        metrics = mtr.get_metrics()
+        metrics.count("http_bytes_received", len(body))
+        metrics.count("http_responses", status=response.status)
+
+        response_headers = {k.lower(): v for k, v in response.getheaders()}
+        body = decompress(body, response_headers.get("content-encoding", ""))
+
+        return HttpResponse(url, response.status, response_headers, body)
+
+    @mtr.timed("http_request")
+    def _follow(self, url: str, headers: Dict) -> HttpResponse:
+        """Send a GET request, following redirects."""
+        for _ in range(self.max_redirects + 1):
+            response = self._send(url, headers)
+            if response.status not in REDIRECT_CODES:
+                return response
+            url = urljoin(url, response.headers["location"])
+
+        raise HttpError(url, response.status, response.headers)
+
+    def request(self, url: str, headers: Dict = None) -> HttpResponse:
+        """
+        Send a GET request, following redirects.
+
+        Every attempt first waits on the shared rate limiter. Network
+        errors and overload statuses are retried with the shared retry
+        policy, and the outcome is fed back to the limiter so that it
+        speeds up while the server is healthy and backs off otherwise.
+        """
+        limiter = thr.get_limiter()
+        policy = thr.get_retry_policy()
+        attempt = 0
+        while True:
+            limiter.wait()
+            try:
+                response = self._follow(url, headers)
+            except RETRY_ERRORS:
+                if attempt >= policy.max_retries:
+                    raise
+                limiter.on_throttle()
+                self._count_retry()
+                sleep(policy.delay(attempt))
+                attempt += 1
+                continue
+
+            if response.status in thr.THROTTLE_STATUSES:
+                retry_after = thr.parse_retry_after(
+                    response.headers.get("retry-after"))
+                limiter.on_throttle(retry_after)
+            else:
+                retry_after = None
+                limiter.on_success()
+            if response.status in thr.RETRY_STATUSES \
+                    and attempt < policy.max_retries:
+                self._count_retry()
+                sleep(policy.delay(attempt, retry_after))
+                attempt += 1
+                continue
+
+            return response
+
+    def _count_retry(self):
+        with self._lock:
+            self.retries += 1
+        mtr.get_metrics().count("http_retries")
+
+    def get(self, url: str) -> bytes:
+        """Return the body of an URL, raising on error statuses."""
+        response = self.request(url)
+        if response.status >= 400:
+            raise HttpError(url, response.status, response.headers)
+
+        return response.body
+
+    def stats(self) -> Dict:
+        """Summarize connection reuse and traffic."""
+        with self._lock:
+            return {
+                "connections_opened": self.connections_opened,
+                "connections_reused": self.connections_reused,
+                "requests_sent": self.requests_sent,
+                "bytes_received": self.bytes_received,
+                "retries": self.retries
+            }
+
+    def close(self):
+        """Close every idle connection."""
+        with self._lock:
+            for idle in self._idle.values():
+                for connection in idle:
+                    connection.close()
+                idle.clear()
+
+
+# The session shared by every fetch
+_session = None
+_session_lock = threading.Lock()
+
+
+def configure_session(**kwargs) -> HttpSession:
+    """Replace the shared session with one using the given options."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = HttpSession(**kwargs)
+
+    return _session
+
+
+def get_session() -> HttpSession:
+    """Return the shared session, creating it on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = HttpSession()
+
+    return _session
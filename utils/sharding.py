@@ -0,0 +1,317 @@
+"""Methods related to sharded crawls over a shared URL frontier."""
+
+
+# IMPORTING PACKAGES
+# -------------------------------------- #
+import hashlib
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+from contextlib import contextmanager
+from time import sleep, time
+from typing import Callable, Dict, Iterator, List, Tuple
+from utils import database as db
+from utils import scraping as scr
+
+
+SHARD_SCHEMA = """
+CREATE TABLE IF NOT EXISTS shards (
+    shard INTEGER PRIMARY KEY,
+    num_shards INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    owner TEXT,
+    expires_at REAL
+);
+"""
+
+
+def shard_of(url: str, num_shards: int) -> int:
+    """Return the shard of a URL, stable across processes and machines."""
+    digest = hashlib.md5(url.encode('utf-8')).hexdigest()
+    return int(digest[:8], 16) % num_shards
+
+
+def worker_name() -> str:
+    """Name the current worker by its machine and process."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class ShardFrontier:
+    """
+    Lease-based partition of the URL frontier of a card store.
+
+    The URLs of the frontier are split into num_shards shards by a hash
+    of the URL. A worker claims a shard by taking its lease, which a
+    heartbeat renews while it scrapes and releases once the shard is
+    done. The
+    lease of a worker which died expires after lease_seconds and the
+    shard is then claimed by another worker, which only scrapes the URLs
+    not done yet. Claims are atomic, so the workers may run in several
+    processes or on several machines sharing the database file.
+    """
+
+    def __init__(
+        self,
+        store: db.CardStore,
+        num_shards: int = 16,
+        lease_seconds: float = 60,
+        owner: str = None
+    ):
+        self.store = store
+        self.connection = store.connection
+        self.num_shards = num_shards
+        self.lease_seconds = lease_seconds
+        self.owner = owner if owner is not None else worker_name()
+        self.connection.create_function(
+            "shard_of", 2, shard_of, deterministic=True)
+        self.connection.executescript(SHARD_SCHEMA)
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO shards (shard, num_shards) "
+                "VALUES (?, ?)",
+                [(shard, num_shards) for shard in range(num_shards)])
+        stored = self.connection.execute(
+            "SELECT DISTINCT num_shards FROM shards").fetchall()
+        if stored != [(num_shards,)]:
+            raise ValueError(
+                f"The frontier is split into {stored[0][0]} shards, "
+                f"not {num_shards}; reset it with reset_shards first")
+
+    def claim(self) -> int:
+        """Take the lease of a shard left to do, None if none is free."""
+        now = time()
+        # Taking the write lock first keeps two workers off one shard
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.connection.execute(
+                "SELECT shard FROM shards WHERE status != 'done' "
+                "AND (owner IS NULL OR expires_at < ?) "
+                "ORDER BY shard LIMIT 1",
+                (now,)).fetchone()
+            if row is not None:
+                self.connection.execute(
+                    "UPDATE shards SET owner = ?, expires_at = ? "
+                    "WHERE shard = ?",
+                    (self.owner, now + self.lease_seconds, row[0]))
+            self.connection.execute("COMMIT")
+        except Exception:
+            self.connection.execute("ROLLBACK")
+            raise
+
+        return None if row is None else row[0]
+
+    def renew(self, shard: int, connection=None) -> bool:
+        """Extend the lease of a shard, False if it was lost meanwhile."""
+        connection = connection or self.connection
+        with connection:
+            cursor = connection.execute(
+                "UPDATE shards SET expires_at = ? "
+                "WHERE shard = ? AND owner = ?",
+                (time() + self.lease_seconds, shard, self.owner))
+
+        return cursor.rowcount == 1
+
+    @contextmanager
+    def keep_leased(self, shard: int) -> Iterator[threading.Event]:
+        """
+        Renew the lease of a shard from a heartbeat thread while it is
+        worked, however long a single card takes, e.g. while its
+        requests back off. The event yielded is set if the lease is lost.
+        """
+        lost = threading.Event()
+        stop = threading.Event()
+
+        def beat():
+            # Connections cannot be shared between threads
+            connection = sqlite3.connect(self.store.path, timeout=60)
+            try:
+                while not stop.wait(self.lease_seconds / 3):
+                    try:
+                        if not self.renew(shard, connection):
+                            lost.set()
+                            return
+                    except sqlite3.OperationalError:
+                        # Retried at the next beat, well before expiry
+                        continue
+            finally:
+                connection.close()
+
+        heartbeat = threading.Thread(target=beat, daemon=True)
+        heartbeat.start()
+        try:
+            yield lost
+        finally:
+            stop.set()
+            heartbeat.join()
+
+    def release(self, shard: int, done: bool = True):
+        """Give up the lease of a shard, marking it done if it is."""
+        with self.connection:
+            self.connection.execute(
+                "UPDATE shards SET owner = NULL, expires_at = NULL, "
+                "status = ? WHERE shard = ? AND owner = ?",
+                ("done" if done else "pending", shard, self.owner))
+
+    def shard_urls(self, shard: int) -> List:
+        """Return the URLs of a shard which are not done yet."""
+        rows = self.connection.execute(
+            "SELECT url FROM urls WHERE status != 'done' "
+            "AND shard_of(url, ?) = ? ORDER BY position",
+            (self.num_shards, shard))
+
+        return [row[0] for row in rows]
+
+    def reopen(self) -> int:
+        """Reopen the done shards which got new URLs, returning how many."""
+        with self.connection:
+            cursor = self.connection.execute(
+                "UPDATE shards SET status = 'pending' "
+                "WHERE status = 'done' AND shard IN ("
+                "SELECT DISTINCT shard_of(url, ?) FROM urls "
+                "WHERE status = 'pending')",
+                (self.num_shards,))
+
+        return cursor.rowcount
+
+    def is_done(self) -> bool:
+        """Check whether every shard is done."""
+        row = self.connection.execute(
+            "SELECT COUNT(*) FROM shards WHERE status != 'done'").fetchone()
+
+        return row[0] == 0
+
+    def progress(self) -> Dict:
+        """Count the shards per status, leased ones apart."""
+        rows = self.connection.execute(
+            "SELECT CASE WHEN owner IS NOT NULL AND expires_at >= ? "
+            "THEN 'leased' ELSE status END, COUNT(*) "
+            "FROM shards GROUP BY 1",
+            (time(),)).fetchall()
+
+        return dict(rows)
+
+
+def reset_shards(store: db.CardStore):
+    """Forget the shards and their leases, to split the frontier anew."""
+    with store.connection:
+        store.connection.execute("DROP TABLE IF EXISTS shards")
+
+
+def crawl_shard(
+    frontier: ShardFrontier,
+    shard: int,
+    mode: str = "thread",
+    max_workers: int = 8,
+    fields: List = None
+) -> List:
+    """
+    Scrape the URLs of a leased shard into the card store.
+
+    The lease is renewed by a heartbeat meanwhile. If it is lost anyway,
+    the shard is left to the worker which took it over. Only the given
+    fields of the cards are scraped and updated, if any. Returns the
+    number of cards scraped and the failed URLs.
+    """
+    store = frontier.store
+    failed = []
+    num_cards = 0
+    flushed_at = time()
+    with frontier.keep_leased(shard) as lost:
+        for url, card in scr.iter_scrape_cards(
+                frontier.shard_urls(shard), 0, mode, max_workers,
+                fields=fields):
+            if card is None:
+                failed.append(url)
+            else:
+                store.write(card)
+                num_cards += 1
+            if lost.is_set():
+                store.flush()
+                print(f"\nLost the lease of shard {shard}, leaving it...")
+                return [num_cards, failed]
+            # Cards are saved as often, so a takeover redoes few of them
+            if time() - flushed_at > frontier.lease_seconds / 3:
+                store.flush()
+                flushed_at = time()
+        store.flush()
+    store.mark_urls(failed, "failed")
+    frontier.release(shard, done=True)
+
+    return [num_cards, failed]
+
+
+def run_worker(
+    database_path: str,
+    num_shards: int = 16,
+    lease_seconds: float = 60,
+    mode: str = "thread",
+    max_workers: int = 8,
+    chunk_size: int = 500,
+    poll_seconds: float = None,
+    fields: List = None
+) -> Dict:
+    """
+    Crawl shards until every shard of the frontier is done.
+
+    When no shard is free but some are leased by other workers, the
+    worker waits for them, so it takes over the shard of a worker which
+    died once its lease expires. Returns the shards, cards and failed
+    URLs it went through.
+    """
+    if poll_seconds is None:
+        poll_seconds = min(lease_seconds / 4, 5)
+    store = db.CardStore(database_path, chunk_size)
+    frontier = ShardFrontier(store, num_shards, lease_seconds)
+    summary = {"shards": 0, "cards": 0, "failed": 0}
+    try:
+        while not frontier.is_done():
+            shard = frontier.claim()
+            if shard is None:
+                sleep(poll_seconds)
+                continue
+            print(f"\n{frontier.owner} crawling shard {shard}...")
+            num_cards, failed = crawl_shard(
+                frontier, shard, mode, max_workers, fields)
+            summary["shards"] += 1
+            summary["cards"] += num_cards
+            summary["failed"] += len(failed)
+    finally:
+        store.close()
+
+    return summary
+
+
+def run_workers(
+    num_workers: int,
+    database_path: str,
+    initializer: Callable = None,
+    initargs: Tuple = (),
+    **kwargs
+) -> List:
+    """
+    Run crawl workers in parallel processes, returning their summaries.
+
+    Worker processes start afresh, so the initializer, called with
+    initargs in each of them, sets up the HTTP session, rate limiter
+    and cache. The options of run_worker are passed through.
+    """
+    # Shards are partitioned up front, so workers agree on their number
+    store = db.CardStore(database_path)
+    frontier = ShardFrontier(
+        store,
+        kwargs.get("num_shards", 16),
+        kwargs.get("lease_seconds", 60))
+    num_reopened = frontier.reopen()
+    if num_reopened:
+        print(f"\nReopened {num_reopened} shards with new URLs...")
+    store.close()
+
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(num_workers, initializer, initargs) as pool:
+        results = [
+            pool.apply_async(run_worker, (database_path,), kwargs)
+            for _ in range(num_workers)]
+
+        return [result.get() for result in results]
@@ -0,0 +1,358 @@
+"""Methods related to finding similar cards."""
+
+
+# IMPORTING PACKAGES
+# -------------------------------------- #
+import hashlib
+import json
+import os
+import zlib
+from typing import Dict, Iterable, List
+import numpy as np
+import pandas as pd
+from utils import caching as cch
+from utils import merging as mrg
+from utils import search as srch
+
+
+# Bumped whenever the layout of the vectors changes, to rebuild them
+SIMILARITY_VERSION = 1
+
+# Buckets the words of the texts and the mechanics are hashed into
+TEXT_DIM = 2048
+MECHANICS_DIM = 128
+
+# Stats compared by how close they are, each spread as a bump over bins
+# of its values so that the dot product of two cards falls off with the
+# gap between their stats; a card without a stat has no bump for it
+STATS_COLUMNS = ["cost", "attack", "health", "durability"]
+STAT_BINS = np.arange(16, dtype=np.float32)
+STAT_SPREAD = 1.0
+
+# Share of each block in the similarity of two cards
+WEIGHTS = {"text": 0.6, "mechanics": 0.25, "stats": 0.15}
+
+# Columns of a card dataset the vectors are built from
+SIMILARITY_COLUMNS = ["url", "title", "text", "summary", "mechanics"] \
+    + STATS_COLUMNS
+
+TEXT_BLOCK = slice(0, TEXT_DIM)
+MECHANICS_BLOCK = slice(TEXT_DIM, TEXT_DIM + MECHANICS_DIM)
+STATS_BLOCK = slice(
+    TEXT_DIM + MECHANICS_DIM,
+    TEXT_DIM + MECHANICS_DIM + len(STATS_COLUMNS) * len(STAT_BINS))
+VECTOR_DIM = STATS_BLOCK.stop
+
+
+def hash_bucket(token: str, dim: int) -> List:
+    """Return the bucket of a token and its sign, the same on any run."""
+    digest = zlib.crc32(token.encode('utf-8'))
+
+    return [digest % dim, 1.0 if digest & (1 << 31) else -1.0]
+
+
+def card_vector(card: Dict) -> np.ndarray:
+    """
+    Turn a card into its raw vector.
+
+    The words of the text and summary are hashed into term frequency
+    buckets, dampened by a logarithm, the mechanics into buckets of
+    their own, and the stats spread over their bins. The IDF, which
+    depends on the whole collection, is applied when querying, so a
+    card never needs rebuilding when others change.
+    """
+    vector = np.zeros(VECTOR_DIM, dtype=np.float32)
+    tokens = srch.tokenize(card.get("text")) \
+        + srch.tokenize(card.get("summary"))
+    text = vector[TEXT_BLOCK]
+    for token in tokens:
+        bucket, sign = hash_bucket(token, TEXT_DIM)
+        text[bucket] += sign
+    np.copysign(np.log1p(np.abs(text)), text, out=text)
+
+    mechanics = mrg.normalize_value(card.get("mechanics")) or []
+    if isinstance(mechanics, str):
+        mechanics = [mechanics]
+    for mechanic in mechanics:
+        bucket, _ = hash_bucket(mechanic, MECHANICS_DIM)
+        vector[MECHANICS_BLOCK][bucket] = 1.0
+
+    stats = vector[STATS_BLOCK].reshape(len(STATS_COLUMNS), len(STAT_BINS))
+    for i, column in enumerate(STATS_COLUMNS):
+        value = mrg.normalize_value(card.get(column))
+        if value is not None:
+            value = min(float(value), STAT_BINS[-1])
+            stats[i] = np.exp(-(STAT_BINS - value) ** 2 / STAT_SPREAD)
+
+    return vector
+
+
+def card_digest(card: Dict) -> str:
+    """Hash the fields of a card its vector is built from."""
+    content = {
+        c: mrg.normalize_value(card.get(c))
+        for c in SIMILARITY_COLUMNS if c not in ["url", "title"]}
+    content = json.dumps(content, sort_keys=True, default=str)
+
+    return hashlib.md5(content.encode('utf-8')).hexdigest()
+
+
+class SimilarityIndex:
+    """
+    Card vectors stored as a memory-mapped matrix, one row per card.
+
+    Rows are only rebuilt for cards which are new or changed, found by
+    the digest of their fields; cards gone from the dataset are left
+    out of the results. Top-k queries run on batches of cards with
+    matrix products over chunks of rows, so the matrix is never loaded
+    whole. Its rows, digests and titles are described in index.json,
+    written last so a matrix is never used half built.
+    """
+
+    def __init__(self, directory: str = "data/similarity"):
+        self.directory = directory
+        self.vectors_path = os.path.join(directory, "vectors.npy")
+        self.index_path = os.path.join(directory, "index.json")
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self.urls = []
+        self.titles = []
+        self.digests = []
+        self.active = []
+        self.vectors = None
+        if os.path.isfile(self.index_path):
+            with open(self.index_path, 'r') as f:
+                index = json.load(f)
+            if index.get("version") == SIMILARITY_VERSION:
+                self.urls = index["urls"]
+                self.titles = index["titles"]
+                self.digests = index["digests"]
+                self.active = index["active"]
+                self.vectors = np.load(self.vectors_path, mmap_mode="r+")
+        self.rows = {url: row for row, url in enumerate(self.urls)}
+
+    def __len__(self) -> int:
+        return sum(self.active)
+
+    def _reserve(self, num_rows: int):
+        """Grow the matrix to hold num_rows rows, doubling its capacity."""
+        capacity = 0 if self.vectors is None else self.vectors.shape[0]
+        if num_rows <= capacity:
+            return
+        capacity = max(num_rows, 2 * capacity, 1024)
+        vectors = np.lib.format.open_memmap(
+            self.vectors_path + ".tmp",
+            mode="w+",
+            dtype=np.float32,
+            shape=(capacity, VECTOR_DIM))
+        if self.vectors is not None:
+            vectors[:len(self.urls)] = self.vectors[:len(self.urls)]
+            del self.vectors
+        vectors.flush()
+        del vectors
+        os.replace(self.vectors_path + ".tmp", self.vectors_path)
+        self.vectors = np.load(self.vectors_path, mmap_mode="r+")
+
+    def update(self, cards: Iterable[Dict], complete: bool = False) -> Dict:
+        """
+        Build the rows of the new and changed cards.
+
+        If the cards are the complete dataset, the cards missing from
+        them are dropped from the results. Returns the number of added,
+        updated, unchanged and removed cards.
+        """
+        counts = {"added": 0, "updated": 0, "unchanged": 0, "removed": 0}
+        seen = set()
+        for card in cards:
+            url = mrg.normalize_value(card.get("url"))
+            if url is None or url in seen:
+                continue
+            seen.add(url)
+            digest = card_digest(card)
+            row = self.rows.get(url)
+            if row is not None and self.digests[row] == digest \
+                    and self.active[row]:
+                counts["unchanged"] += 1
+                continue
+            if row is None:
+                counts["added"] += 1
+                row = len(self.urls)
+                self._reserve(row + 1)
+                self.rows[url] = row
+                self.urls.append(url)
+                self.titles.append(None)
+                self.digests.append(None)
+                self.active.append(True)
+            else:
+                counts["updated"] += 1
+            self.vectors[row] = card_vector(card)
+            self.titles[row] = mrg.normalize_value(card.get("title"))
+            self.digests[row] = digest
+            self.active[row] = True
+
+        if complete:
+            for url, row in self.rows.items():
+                if url not in seen and self.active[row]:
+                    self.active[row] = False
+                    counts["removed"] += 1
+        self.save()
+
+        return counts
+
+    def save(self):
+        """Flush the matrix, then describe its rows."""
+        if self.vectors is not None:
+            self.vectors.flush()
+        index = {
+            "version": SIMILARITY_VERSION,
+            "urls": self.urls,
+            "titles": self.titles,
+            "digests": self.digests,
+            "active": self.active
+        }
+        cch.write_atomically(self.index_path, json.dumps(index).encode())
+
+    def _collection_weights(self, chunk_size: int) -> np.ndarray:
+        """Compute the IDF of the text buckets over the active rows."""
+        num_rows = len(self.urls)
+        active = np.array(self.active, dtype=bool)
+        document_frequency = np.zeros(TEXT_DIM, dtype=np.float64)
+        for start in range(0, num_rows, chunk_size):
+            end = min(start + chunk_size, num_rows)
+            rows = self.vectors[start:end][active[start:end]]
+            document_frequency += (rows[:, TEXT_BLOCK] != 0).sum(axis=0)
+        num_cards = max(active.sum(), 1)
+        idf = np.log((1 + num_cards) / (1 + document_frequency)) + 1
+
+        return idf.astype(np.float32)
+
+    def _weigh(self, rows: np.ndarray, idf: np.ndarray) -> np.ndarray:
+        """
+        Turn raw rows into unit blocks scaled by their weight, so the
+        dot product of two rows is the weighted sum of the cosine
+        similarities of their blocks.
+        """
+        rows = np.array(rows, dtype=np.float32)
+        rows[:, TEXT_BLOCK] *= idf
+        for name, block in [
+                ("text", TEXT_BLOCK),
+                ("mechanics", MECHANICS_BLOCK),
+                ("stats", STATS_BLOCK)]:
+            norms = np.linalg.norm(rows[:, block], axis=1, keepdims=True)
+            norms[norms == 0] = 1
+            rows[:, block] *= np.sqrt(WEIGHTS[name]) / norms
+
+        return rows
+
+    def query(
+        self,
+        vectors: np.ndarray,
+        k: int = 10,
+        chunk_size: int = 4096,
+        exclude: List = None
+    ) -> List:
+        """
+        Find the k most similar cards of each raw vector of a batch.
+
+        The active rows are streamed in chunks, each scored against the
+        whole batch with one matrix product, keeping the best k so far.
+        The rows in exclude, one per vector if given, are skipped, like
+        the card a query was made from. Returns the rows and the scores
+        of the neighbours of each vector, best first.
+        """
+        num_rows = len(self.urls)
+        vectors = np.atleast_2d(vectors)
+        num_queries = len(vectors)
+        if num_rows == 0:
+            empty = np.zeros((num_queries, 0))
+            return [empty.astype(int), empty]
+        idf = self._collection_weights(chunk_size)
+        queries = self._weigh(vectors, idf)
+        active = np.array(self.active, dtype=bool)
+
+        best_rows = np.zeros((num_queries, 0), dtype=np.int64)
+        best_scores = np.zeros((num_queries, 0), dtype=np.float32)
+        for start in range(0, num_rows, chunk_size):
+            end = min(start + chunk_size, num_rows)
+            rows = self._weigh(self.vectors[start:end], idf)
+            scores = queries @ rows.T
+            scores[:, ~active[start:start + len(rows)]] = -np.inf
+            if exclude is not None:
+                for i, row in enumerate(exclude):
+                    if row is not None and start <= row < start + len(rows):
+                        scores[i, row - start] = -np.inf
+            candidates = np.arange(start, start + len(rows))
+            best_rows = np.hstack(
+                [best_rows, np.broadcast_to(candidates, scores.shape)])
+            best_scores = np.hstack([best_scores, scores])
+            # Only the best k of every query are carried over
+            if best_scores.shape[1] > k:
+                top = np.argpartition(-best_scores, k - 1, axis=1)[:, :k]
+                best_rows = np.take_along_axis(best_rows, top, axis=1)
+                best_scores = np.take_along_axis(best_scores, top, axis=1)
+
+        order = np.argsort(-best_scores, axis=1)
+        best_rows = np.take_along_axis(best_rows, order, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+
+        return [best_rows, best_scores]
+
+    def most_similar(self, urls: List, k: int = 10) -> pd.DataFrame:
+        """
+        Find the k cards most like each of some indexed cards.
+
+        Returns one row per card and neighbour, with the rank and the
+        similarity, from 0 to 1 for cards alike in every way.
+        """
+        missing = [url for url in urls if url not in self.rows]
+        if missing:
+            raise KeyError(f"Cards not in the similarity index: {missing}")
+        rows = [self.rows[url] for url in urls]
+        best_rows, best_scores = self.query(
+            self.vectors[rows], k, exclude=rows)
+
+        return self._results(urls, best_rows, best_scores)
+
+    def similar_to_cards(self, cards: List, k: int = 10) -> pd.DataFrame:
+        """Find the k indexed cards most like some cards, indexed or not."""
+        vectors = np.stack([card_vector(card) for card in cards])
+        urls = [card.get("url") for card in cards]
+        exclude = [self.rows.get(url) for url in urls]
+        best_rows, best_scores = self.query(vectors, k, exclude=exclude)
+
+        return self._results(urls, best_rows, best_scores)
+
+    def _results(
+        self,
+        urls: List,
+        best_rows: np.ndarray,
+        best_scores: np.ndarray
+    ) -> pd.DataFrame:
+        """Lay the neighbours of some cards out as a table."""
+        results = []
+        for url, rows, scores in zip(urls, best_rows, best_scores):
+            for rank, (row, score) in enumerate(zip(rows, scores)):
+                if not np.isfinite(score):
+                    continue
+                results.append({
+                    "url": url,
+                    "rank": rank + 1,
+                    "neighbour_url": self.urls[row],
+                    "neighbour_title": self.titles[row],
+                    "similarity": float(score)
+                })
+
+        return pd.DataFrame(
+            results,
+            columns=["url", "rank", "neighbour_url", "neighbour_title",
+                     "similarity"])
+
+    def find_url(self, title: str) -> str:
+        """Return the URL of an active card by its title, None if none."""
+        for url, card_title, active in zip(
+                self.urls, self.titles, self.active):
+            if active and card_title == title:
+                return url
+
+        return None
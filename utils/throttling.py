@@ -0,0 +1,199 @@
+"""Methods related to throttling requests."""
+
+
+# IMPORTING PACKAGES
+# -------------------------------------- #
+import asyncio
+import random
+import threading
+from collections import deque
+from email.utils import parsedate_to_datetime
+from time import monotonic, sleep, time
+
+
+def rate_from_sleep_time(sleep_time: float) -> float:
+    """Translate the legacy per-item SLEEP_TIME into a request rate."""
+    if sleep_time and sleep_time > 0:
+        return 1.0 / sleep_time
+    else:
+        return None
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket shared by every fetch, adapting its rate to the server.
+
+    Tokens refill at rate per second, up to burst of them. Each healthy
+    response nudges the rate up by increase (never above max_rate), while
+    a throttled one multiplies it by decrease (never below min_rate) and
+    may pause every request for the Retry-After delay. A rate of None
+    starts unlimited; the first throttled response then sets the rate
+    from the pace measured over the latest requests.
+    """
+
+    def __init__(
+        self,
+        rate: float = None,
+        max_rate: float = None,
+        min_rate: float = 0.5,
+        burst: float = 1,
+        increase: float = 0.1,
+        decrease: float = 0.5
+    ):
+        self.rate = rate
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.burst = burst
+        self.increase = increase
+        self.decrease = decrease
+        self._lock = threading.Lock()
+        self._tokens = burst
+        self._refilled = monotonic()
+        self._paused_until = 0.0
+        self._recent = deque(maxlen=50)
+
+    def _reserve(self) -> float:
+        """Take a token and return how long to wait until it is ours."""
+        with self._lock:
+            now = monotonic()
+            self._recent.append(now)
+            delay = max(self._paused_until - now, 0.0)
+            if self.rate is None:
+                return delay
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._refilled) * self.rate)
+            self._refilled = now
+            # Going below zero reserves a future token
+            self._tokens -= 1
+            if self._tokens < 0:
+                delay = max(delay, -self._tokens / self.rate)
+
+        return delay
+
+    def wait(self):
+        """Block the calling thread until a token is available."""
+        delay = self._reserve()
+        if delay > 0:
+            sleep(delay)
+
+    async def wait_async(self):
+        """Suspend the calling coroutine until a token is available."""
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def seed(self, rate: float):
+        """Restart from the given rate, within the maximum rate."""
+        with self._lock:
+            self.rate = rate if self.max_rate is None \
+                else min(rate, self.max_rate)
+
+    def measured_rate(self) -> float:
+        """Estimate the pace of the latest requests per second."""
+        with self._lock:
+            if len(self._recent) < 2:
+                return self.min_rate
+            span = self._recent[-1] - self._recent[0]
+            return (len(self._recent) - 1) / span if span > 0 else None
+
+    def on_success(self):
+        """Speed up a little after a healthy response."""
+        with self._lock:
+            if self.rate is not None:
+                self.rate += self.increase
+                if self.max_rate is not None:
+                    self.rate = min(self.rate, self.max_rate)
+
+    def on_throttle(self, retry_after: float = None):
+        """Back off after the server signalled it is under pressure."""
+        rate = self.rate if self.rate is not None else self.measured_rate()
+        with self._lock:
+            if rate is None:
+                rate = self.max_rate or self.min_rate
+            self.rate = max(self.min_rate, rate * self.decrease)
+            if retry_after:
+                self._paused_until = max(
+                    self._paused_until, monotonic() + retry_after)
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, honouring Retry-After."""
+
+    def __init__(
+        self,
+        max_retries: int = 3,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0
+    ):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int, retry_after: float = None) -> float:
+        """Return how long to wait before retrying a failed attempt."""
+        if retry_after is not None:
+            return retry_after
+        backoff = min(self.max_delay, self.base_delay * 2 ** attempt)
+
+        return random.uniform(0, backoff)
+
+
+# Statuses meaning the server is overloaded or briefly unavailable
+THROTTLE_STATUSES = {429, 503}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def parse_retry_after(value: str) -> float:
+    """Parse a Retry-After header, given in seconds or as a date."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+# The limiter and retry policy shared by every fetch
+_limiter = AdaptiveRateLimiter()
+_retry_policy = RetryPolicy()
+
+
+def configure_limiter(**kwargs) -> AdaptiveRateLimiter:
+    """Replace the shared limiter with one using the given options."""
+    global _limiter
+    _limiter = AdaptiveRateLimiter(**kwargs)
+
+    return _limiter
+
+
+def get_limiter() -> AdaptiveRateLimiter:
+    """Return the limiter shared by every fetch."""
+    return _limiter
+
+
+def seed_limiter(requests_per_second: float = None, sleep_time: float = None):
+    """
+    Start the shared limiter at the rate a caller asks for, in requests
+    per second or as the legacy sleep time between requests, keeping its
+    other options. Nothing changes when neither is given.
+    """
+    rate = requests_per_second or rate_from_sleep_time(sleep_time)
+    if rate is not None:
+        _limiter.seed(rate)
+
+
+def configure_retries(**kwargs) -> RetryPolicy:
+    """Replace the shared retry policy with one using the given options."""
+    global _retry_policy
+    _retry_policy = RetryPolicy(**kwargs)
+
+    return _retry_policy
+
+
+def get_retry_policy() -> RetryPolicy:
+    """Return the retry policy shared by every fetch."""
+    return _retry_policy